@@ -1,6 +1,8 @@
 # API package initialization file
-from .routes import api_bp
+# Submodules are imported on demand so that importing one light module (e.g.
+# api.startup) does not pull in pandas and scikit-learn through the routes
 
 def init_app(app):
     """Initialize the API blueprint with the Flask app"""
+    from .routes import api_bp
     app.register_blueprint(api_bp, url_prefix='/api')
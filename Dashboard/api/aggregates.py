@@ -0,0 +1,447 @@
+import math
+import threading
+import numpy as np
+import pandas as pd
+import logging
+
+from . import serialization
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+INF = math.inf
+
+# Bucket definitions as (low, high, closed) where closed is one of
+# 'both', 'left', 'right' or 'neither', matching the boolean masks the
+# endpoints used before the cache existed.
+DATA_AGE_GROUPS = {
+    '18-25': (18, 25, 'both'),
+    '26-35': (26, 35, 'both'),
+    '36-45': (36, 45, 'both'),
+    '46-55': (46, 55, 'both'),
+    '56+': (56, INF, 'left')
+}
+DATA_INCOME_GROUPS = {
+    '<30k': (-INF, 30000, 'neither'),
+    '30k-50k': (30000, 50000, 'left'),
+    '50k-70k': (50000, 70000, 'left'),
+    '70k-100k': (70000, 100000, 'left'),
+    '>100k': (100000, INF, 'left')
+}
+AGE_SEGMENTS = {
+    'Young Adults': (18, 35, 'both'),
+    'Middle-aged': (36, 55, 'both'),
+    'Seniors': (56, 100, 'both')
+}
+INCOME_SEGMENTS = {
+    'Low Income': (0, 30000, 'both'),
+    'Middle Income': (30000, 70000, 'both'),
+    'High Income': (70000, 1000000, 'both')
+}
+DASHBOARD_AGE_GROUPS = {
+    '18-25': (18, 25, 'both'),
+    '26-35': (25, 35, 'right'),
+    '36-45': (35, 45, 'right'),
+    '46+': (45, INF, 'neither')
+}
+
+# Columns whose sum and non-null count are tallied per bucket
+STAT_COLUMNS = ['will_purchase', 'age', 'income', 'time_on_website', 'marketing_engaged']
+
+# Tally layout: [row count, then (sum, non-null count) per STAT_COLUMNS entry]
+N_STATS = 1 + 2 * len(STAT_COLUMNS)
+
+# Values reported when a column holds no numeric data (same fallbacks as /api/data)
+FALLBACK_MEANS = {
+    'age': 35.0,
+    'income': 65000.0,
+    'time_on_website': 18.0
+}
+
+
+def _sum_index(column):
+    return 1 + 2 * STAT_COLUMNS.index(column)
+
+
+class RangeBuckets:
+    """Map values onto disjoint atoms so any set of (possibly overlapping) ranges can be tallied.
+
+    Every finite range endpoint becomes a point; the atoms are the open gaps
+    between points and the points themselves. A value lands in exactly one
+    atom, and each range is a contiguous span of atoms, so a single bincount
+    over atom codes answers all ranges at once, inclusive or exclusive ends.
+    """
+
+    def __init__(self, *range_maps):
+        self.points = np.array(sorted({bound for ranges in range_maps
+                                       for low, high, _ in ranges.values()
+                                       for bound in (low, high) if math.isfinite(bound)}),
+                               dtype=np.float64)
+        self.n_atoms = 2 * len(self.points) + 1
+
+    def codes(self, values):
+        """Return the atom code for each value (NaN maps past the last atom)"""
+        values = np.asarray(values, dtype=np.float64)
+        index = np.searchsorted(self.points, values, side='left')
+        hit = np.zeros(len(values), dtype=bool)
+        inside = index < len(self.points)
+        hit[inside] = self.points[index[inside]] == values[inside]
+        codes = 2 * index + hit
+        codes[np.isnan(values)] = self.n_atoms
+        return codes
+
+    def span(self, low, high, closed):
+        """Return the (first, last) atom codes covered by a range"""
+        if math.isinf(low):
+            first = 0
+        else:
+            j = int(np.searchsorted(self.points, low))
+            first = 2 * j + 1 if closed in ('both', 'left') else 2 * j + 2
+        if math.isinf(high):
+            last = self.n_atoms - 1
+        else:
+            j = int(np.searchsorted(self.points, high))
+            last = 2 * j + 1 if closed in ('both', 'right') else 2 * j
+        return first, last
+
+    def combine(self, tallies, ranges):
+        """Sum atom tallies over each named range"""
+        return {name: tallies[first:last + 1].sum(axis=0)
+                for name, (first, last) in ((name, self.span(*bounds)) for name, bounds in ranges.items())}
+
+
+class SortedRuns:
+    """Exact per-value tallies of one column, kept as a few sorted runs for cheap appends.
+
+    Each run holds sorted distinct values and the running sum of their tally
+    rows. An append adds the batch as a new run and merges only runs of
+    similar size (as in a log-structured merge), so a value is re-sorted
+    O(log n) times over its lifetime instead of on every append. Order
+    statistics and "tally of values <= v" are answered by searching each run.
+    Runs are never modified, so merged instances share them safely.
+    """
+
+    def __init__(self, runs=()):
+        self.runs = tuple(runs)
+
+    @classmethod
+    def from_values(cls, values, stats):
+        present = ~np.isnan(values)
+        if not present.any():
+            return cls()
+        unique, inverse = np.unique(values[present], return_inverse=True)
+        return cls([cls._run(unique, _tally(inverse, len(unique), stats[present]))])
+
+    @staticmethod
+    def _run(values, per_value):
+        cumulative = np.zeros((len(values) + 1, N_STATS), dtype=np.float64)
+        np.cumsum(per_value, axis=0, out=cumulative[1:])
+        return values, cumulative
+
+    @classmethod
+    def _merge_runs(cls, a, b):
+        values, inverse = np.unique(np.concatenate([a[0], b[0]]), return_inverse=True)
+        per_value = np.zeros((len(values), N_STATS), dtype=np.float64)
+        np.add.at(per_value, inverse, np.vstack([np.diff(a[1], axis=0), np.diff(b[1], axis=0)]))
+        return cls._run(values, per_value)
+
+    def merge(self, other):
+        """New instance holding both tallies (inputs are left untouched)"""
+        runs = list(self.runs)
+        for run in other.runs:
+            runs.append(run)
+            # Keep run sizes roughly halving from first to last
+            while len(runs) > 1 and len(runs[-2][0]) <= 2 * len(runs[-1][0]):
+                last = runs.pop()
+                runs[-1] = self._merge_runs(runs[-1], last)
+        return SortedRuns(runs)
+
+    def total(self):
+        return sum((cumulative[-1] for _, cumulative in self.runs), np.zeros(N_STATS))
+
+    def at_or_below(self, value):
+        """Tally of every value <= value"""
+        return sum((cumulative[np.searchsorted(values, value, side='right')] for values, cumulative in self.runs),
+                   np.zeros(N_STATS))
+
+    def kth(self, k):
+        """Smallest value v with at least k rows at or below it (k is 1-based)"""
+        best = math.inf
+        for values, _ in self.runs:
+            # Rows at or below each value of this run, counted over all runs
+            counts = sum(cumulative[np.searchsorted(other, values, side='right'), 0]
+                         for other, cumulative in self.runs)
+            i = int(np.searchsorted(counts, k))
+            if i < len(values):
+                best = min(best, values[i])
+        return best
+
+
+AGE_BUCKETS = RangeBuckets(DATA_AGE_GROUPS, AGE_SEGMENTS, DASHBOARD_AGE_GROUPS)
+INCOME_BUCKETS = RangeBuckets(DATA_INCOME_GROUPS, INCOME_SEGMENTS)
+
+
+def _mean(tally, column):
+    """Mean of a STAT_COLUMNS entry from a tally vector (NaN when there is no data)"""
+    i = _sum_index(column)
+    return float(tally[i] / tally[i + 1]) if tally[i + 1] else float('nan')
+
+
+def _tally(codes, n_codes, stats):
+    """Sum the stat matrix rows per code in one bincount pass per stat column"""
+    keep = (codes >= 0) & (codes < n_codes)
+    codes = codes[keep]
+    stats = stats[keep]
+    out = np.empty((n_codes, N_STATS), dtype=np.float64)
+    for k in range(N_STATS):
+        out[:, k] = np.bincount(codes, weights=stats[:, k], minlength=n_codes)
+    return out
+
+
+def _stat_matrix(df):
+    """Build the per-row stat matrix: row count, then (value, is-present) per column"""
+    stats = np.zeros((len(df), N_STATS), dtype=np.float64)
+    stats[:, 0] = 1.0
+    for column in STAT_COLUMNS:
+        i = _sum_index(column)
+        if column in df.columns:
+            values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)
+            present = ~np.isnan(values)
+            stats[:, i] = np.where(present, values, 0.0)
+            stats[:, i + 1] = present
+    return stats
+
+
+def _numeric(df, column):
+    if column not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64)
+
+
+def _merge_keyed(base, delta):
+    """Add two label -> tally dicts, keeping first-seen label order"""
+    merged = dict(base)
+    for label, tally in delta.items():
+        merged[label] = merged[label] + tally if label in merged else tally
+    return merged
+
+
+def _merge(base, delta):
+    """Combine two tally sets into a new one (inputs are left untouched)"""
+    merged = {name: base[name] + delta[name] for name in ('total', 'age', 'income', 'engaged')}
+    merged['income_values'] = base['income_values'].merge(delta['income_values'])
+
+    for name in ('brand', 'gender'):
+        merged[name] = _merge_keyed(base[name], delta[name])
+    return merged
+
+
+class AggregateCache:
+    """Dataset aggregates behind /api/data, /api/segment_analysis and /api/dashboard_data.
+
+    All buckets are tallied in one pass when the data is loaded and the JSON
+    for each endpoint is serialized once per data version, so serving a
+    dashboard page is a dictionary lookup.
+    """
+
+    def __init__(self, df=None, modified_at=None):
+        self._lock = threading.Lock()
+        self._payloads = {}
+        self.version = 0
+        # Last-Modified: mtime of the newest file the data came from (None sends no date)
+        self.modified_at = None
+        self.rebuild(df, modified_at)
+
+    def rebuild(self, df, modified_at=None):
+        """Recompute every tally from a full DataFrame (read from files last modified at modified_at)"""
+        tallies = self._compute(df) if df is not None else None
+        with self._lock:
+            self._tallies = tallies
+            self.version += 1
+            self.modified_at = modified_at
+            self._payloads = {}
+        if df is not None:
+            logger.info(f"Aggregate cache built for {len(df)} records (version {self.version})")
+
+    def append(self, df, modified_at=None):
+        """Fold new records into the running tallies without rescanning existing data.
+
+        ``modified_at`` is the mtime of the log the records were read from.
+        """
+        if df is None or len(df) == 0:
+            return
+        delta = self._compute(df)
+        with self._lock:
+            self._tallies = delta if self._tallies is None else _merge(self._tallies, delta)
+            self.version += 1
+            stamps = [stamp for stamp in (self.modified_at, modified_at) if stamp is not None]
+            self.modified_at = max(stamps) if stamps else None
+            self._payloads = {}
+        logger.info(f"Aggregate cache updated with {len(df)} records (version {self.version})")
+
+    @property
+    def available(self):
+        return self._tallies is not None
+
+    @property
+    def record_count(self):
+        tallies = self._tallies
+        return int(tallies['total'][0]) if tallies is not None else 0
+
+    def _compute(self, df):
+        stats = _stat_matrix(df)
+        tallies = {
+            'total': stats.sum(axis=0),
+            'age': _tally(AGE_BUCKETS.codes(_numeric(df, 'age')), AGE_BUCKETS.n_atoms, stats),
+            'income': _tally(INCOME_BUCKETS.codes(_numeric(df, 'income')), INCOME_BUCKETS.n_atoms, stats),
+        }
+
+        engaged = _numeric(df, 'marketing_engaged')
+        engaged_codes = np.where(engaged == 1, 1, np.where(engaged == 0, 0, -1))
+        tallies['engaged'] = _tally(engaged_codes, 2, stats)
+
+        # Exact per-value income tallies so the median split stays exact
+        tallies['income_values'] = SortedRuns.from_values(_numeric(df, 'income'), stats)
+
+        for name in ('brand', 'gender'):
+            if name in df.columns:
+                codes, labels = pd.factorize(df[name])
+                tallies[name] = dict(zip(labels.tolist(), _tally(codes, len(labels), stats)))
+            else:
+                tallies[name] = {}
+        return tallies
+
+    def payload(self, name):
+        """Return the JSON bytes for a named payload, serializing once per data version"""
+        with self._lock:
+            cached = self._payloads.get(name)
+            if cached is not None:
+                return cached
+            tallies = self._tallies
+        builders = {
+            'data': self.data_stats,
+            'segment_analysis': self.segment_analysis,
+            'dashboard_data': self.dashboard_data
+        }
+        body = serialization.dumps(builders[name](tallies), sort_keys=True) + b'\n'
+        with self._lock:
+            if self._tallies is tallies:
+                self._payloads[name] = body
+        return body
+
+    def warm(self):
+        """Serialize every payload now, e.g. in the gunicorn master before workers fork"""
+        if self.available:
+            for name in ('data', 'segment_analysis', 'dashboard_data'):
+                self.payload(name)
+
+    @staticmethod
+    def _income_split(tallies):
+        """Return (above-median, at-or-below-median) tallies for the income column"""
+        income = tallies['income_values']
+        total = income.total()
+        n = int(total[0])
+        if n == 0:
+            empty = np.zeros(N_STATS)
+            return empty, empty
+        median = (income.kth((n - 1) // 2 + 1) + income.kth(n // 2 + 1)) / 2.0
+        below = income.at_or_below(median)
+        return total - below, below
+
+    def data_stats(self, tallies=None):
+        """Statistics served by /api/data"""
+        tallies = tallies if tallies is not None else self._tallies
+        total = tallies['total']
+        purchase_rate = _mean(total, 'will_purchase')
+        stats = {
+            'total_records': int(total[0]),
+            'purchase_rate': purchase_rate,
+            'conversion_rate': purchase_rate
+        }
+
+        age_groups = AGE_BUCKETS.combine(tallies['age'], DATA_AGE_GROUPS)
+        stats['avg_age'] = self._mean_or_fallback(total, 'age')
+        stats['age_groups'] = {name: int(tally[0]) for name, tally in age_groups.items()}
+
+        income_groups = INCOME_BUCKETS.combine(tallies['income'], DATA_INCOME_GROUPS)
+        stats['avg_income'] = self._mean_or_fallback(total, 'income')
+        stats['income_groups'] = {name: int(tally[0]) for name, tally in income_groups.items()}
+        high_income, low_income = self._income_split(tallies)
+        stats['high_income_conversion'] = _mean(high_income, 'will_purchase')
+        stats['low_income_conversion'] = _mean(low_income, 'will_purchase')
+
+        stats['avg_time_on_website'] = self._mean_or_fallback(total, 'time_on_website')
+        stats['brand_distribution'] = {brand: int(tally[0]) for brand, tally in tallies['brand'].items()}
+
+        stats['marketing_engagement_rate'] = _mean(total, 'marketing_engaged')
+        stats['engaged_conversion'] = _mean(tallies['engaged'][1], 'will_purchase')
+        stats['non_engaged_conversion'] = _mean(tallies['engaged'][0], 'will_purchase')
+        return stats
+
+    def segment_analysis(self, tallies=None):
+        """Segments served by /api/segment_analysis"""
+        tallies = tallies if tallies is not None else self._tallies
+
+        age_analysis = []
+        for name, tally in AGE_BUCKETS.combine(tallies['age'], AGE_SEGMENTS).items():
+            if tally[0] > 0:
+                age_analysis.append({
+                    'segment': name,
+                    'count': int(tally[0]),
+                    'purchase_rate': _mean(tally, 'will_purchase'),
+                    'avg_income': self._mean_or_fallback(tally, 'income'),
+                    'avg_time_on_website': self._mean_or_fallback(tally, 'time_on_website')
+                })
+
+        income_analysis = []
+        for name, tally in INCOME_BUCKETS.combine(tallies['income'], INCOME_SEGMENTS).items():
+            if tally[0] > 0:
+                income_analysis.append({
+                    'segment': name,
+                    'count': int(tally[0]),
+                    'purchase_rate': _mean(tally, 'will_purchase'),
+                    'avg_age': self._mean_or_fallback(tally, 'age'),
+                    'avg_time_on_website': self._mean_or_fallback(tally, 'time_on_website')
+                })
+
+        brand_analysis = []
+        for brand, tally in tallies['brand'].items():
+            if tally[0] > 0:
+                brand_analysis.append({
+                    'brand': brand,
+                    'count': int(tally[0]),
+                    'purchase_rate': _mean(tally, 'will_purchase'),
+                    'avg_age': self._mean_or_fallback(tally, 'age'),
+                    'avg_income': self._mean_or_fallback(tally, 'income')
+                })
+        brand_analysis.sort(key=lambda x: x['purchase_rate'], reverse=True)
+
+        return {
+            'age_segments': age_analysis,
+            'income_segments': income_analysis,
+            'brand_segments': brand_analysis
+        }
+
+    def dashboard_data(self, tallies=None):
+        """General statistics served by the root app's /api/dashboard_data"""
+        tallies = tallies if tallies is not None else self._tallies
+        total = tallies['total']
+        age_groups = AGE_BUCKETS.combine(tallies['age'], DASHBOARD_AGE_GROUPS)
+        data = {
+            'total_records': int(total[0]),
+            'purchase_rate': _mean(total, 'will_purchase'),
+            'age_distribution': {name: int(tally[0]) for name, tally in age_groups.items()},
+            'purchase_by_age_group': {name: _mean(tally, 'will_purchase') for name, tally in age_groups.items()}
+        }
+        # Gender is only reported when the dataset actually has the column
+        if tallies['gender']:
+            data['gender_distribution'] = {str(g): int(t[0]) for g, t in tallies['gender'].items()}
+            data['purchase_by_gender'] = {str(g): _mean(t, 'will_purchase') for g, t in tallies['gender'].items()}
+        return data
+
+    @staticmethod
+    def _mean_or_fallback(tally, column):
+        i = _sum_index(column)
+        if tally[0] > 0 and tally[i + 1] == 0 and column in FALLBACK_MEANS:
+            return FALLBACK_MEANS[column]
+        return _mean(tally, column)
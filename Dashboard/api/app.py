@@ -4,10 +4,9 @@ import os
 import logging
 import sys
 import pickle
-import pandas as pd
-import numpy as np
 import traceback
-from api import init_app, routes
+from api import bundle, compression, init_app, serialization
+from api.startup import LAZY_LOAD, BackgroundLoader
 
 # Configure logging
 logging.basicConfig(
@@ -47,12 +46,18 @@ def find_file(base_path, alternatives=None):
     logger.warning(f"File not found: {base_path} or alternatives")
     return None
 
-def create_app():
-    """Create and configure the Flask app with all necessary components"""
-    app = Flask(__name__, static_folder='./', template_folder='./')
-    CORS(app)  # Enable CORS for all routes
+def load_resources():
+    """Load the model files and dataset, returning (model, scaler, model_columns, df, model_files).
 
-    logger.info("Starting Smartphone Purchase Prediction Dashboard API")
+    Under gunicorn with preload_app this runs once in the master process and
+    the workers inherit the objects copy-on-write instead of loading their own.
+    pandas and numpy are imported here, so with lazy loading a worker imports
+    neither until the loader thread runs.
+    """
+    import numpy as np
+    import pandas as pd
+    from api import datastore
+    logger.info(f"Loading model and data in process {os.getpid()}")
     logger.info(f"Current working directory: {os.getcwd()}")
 
     # Define path options for model files
@@ -115,7 +120,8 @@ def create_app():
         else:
             logger.error("Columns file not found in any location")
             
-        if model and scaler and model_columns:
+        # model_columns is a pandas Index, which has no truth value
+        if model is not None and scaler is not None and model_columns is not None:
             logger.info("All model files loaded successfully")
         else:
             logger.warning("Some model files could not be loaded - predictions will be unavailable")
@@ -143,12 +149,21 @@ def create_app():
     # Find the data file
     found_data_path = find_file(data_path, alt_data_paths)
     df = None
+    # Files the data comes from; their mtime is the Last-Modified of the data payloads
+    data_files = []
+
+    # A column store written on an earlier boot skips CSV parsing and cleaning entirely
+    stored_df = datastore.load_store()
 
     try:
         # Load the data if found
-        if found_data_path:
+        if stored_df is not None:
+            df = stored_df
+            data_files = [found_data_path or os.path.join(datastore.DEFAULT_STORE_PATH, datastore.META_FILE)]
+        elif found_data_path:
             logger.info(f"Loading data from {found_data_path}")
             df = pd.read_csv(found_data_path)
+            data_files = [found_data_path]
             logger.info(f"Data loaded successfully: {len(df)} rows")
         else:
             logger.warning("No data file found - will create synthetic data")
@@ -170,7 +185,9 @@ def create_app():
             'Target': 'will_purchase'
         }
         
-        if df is not None:
+        if stored_df is not None:
+            logger.info(f"Using memory-mapped column store: {len(df)} rows")
+        elif df is not None:
             # Log data shape before processing
             logger.info(f"Original data shape: {df.shape}")
             
@@ -212,6 +229,19 @@ def create_app():
                     elif col == 'will_purchase':
                         df[col] = np.random.choice([0, 1], len(df))
             
+            # Keep only the columns we need
+            df = df[expected_columns]
+
+            # Convert data types to ensure consistency
+            df['age'] = pd.to_numeric(df['age'], errors='coerce').fillna(30).astype(int)
+            df['income'] = pd.to_numeric(df['income'], errors='coerce').fillna(50000).astype(int)
+            df['time_on_website'] = pd.to_numeric(df['time_on_website'], errors='coerce').fillna(15).astype(float)
+            df['previous_purchases'] = pd.to_numeric(df['previous_purchases'], errors='coerce').fillna(1).astype(int)
+            df['marketing_engaged'] = pd.to_numeric(df['marketing_engaged'], errors='coerce').fillna(0).astype(int)
+            df['search_frequency'] = pd.to_numeric(df['search_frequency'], errors='coerce').fillna(5).astype(int)
+            df['device_age'] = pd.to_numeric(df['device_age'], errors='coerce').fillna(2).astype(float)
+            df['will_purchase'] = pd.to_numeric(df['will_purchase'], errors='coerce').fillna(0).astype(int)
+
             # Log the shape after processing
             logger.info(f"Processed data shape: {df.shape}")
             
@@ -222,6 +252,15 @@ def create_app():
                 logger.info(f"Cleaned and standardized data saved to {cleaned_path}")
             except Exception as save_error:
                 logger.warning(f"Could not save cleaned data: {str(save_error)}")
+
+            # Convert once to the typed column store; later boots (and every worker) memory-map it
+            try:
+                store_path = datastore.write_store(df, source=found_data_path)
+                stored_df = datastore.load_store(store_path)
+                if stored_df is not None:
+                    df = stored_df
+            except Exception as store_error:
+                logger.warning(f"Could not write column store: {str(store_error)}")
         else:
             # Create synthetic data if no data was found
             logger.info("Creating synthetic dataset")
@@ -255,6 +294,7 @@ def create_app():
         
         # Create synthetic data as last resort
         logger.info("Creating synthetic data due to processing error")
+        data_files = []
         n = 1000
         np.random.seed(42)
         
@@ -270,8 +310,30 @@ def create_app():
             'will_purchase': np.random.choice([0, 1], size=n)
         })
 
-    # Initialize the API module with model and data
-    routes.initialize(model, scaler, model_columns, df)
+    model_files = [path for path in (found_model_path, found_scaler_path, found_columns_path) if path]
+    return model, scaler, model_columns, df, model_files, data_files
+
+def create_app(resources=None, lazy=LAZY_LOAD):
+    """Create and configure the Flask app with all necessary components.
+
+    ``resources`` is the tuple returned by load_resources(); it is loaded here
+    when not supplied. With ``lazy`` the loading runs on a background thread
+    and /api/status reports its progress while static routes are served.
+    """
+    app = Flask(__name__, static_folder='./', template_folder='./')
+    CORS(app)  # Enable CORS for all routes
+    serialization.install(app)
+    compression.install(app)
+
+    logger.info("Starting Smartphone Purchase Prediction Dashboard API")
+    from api import routes
+
+    def initialize():
+        # Initialize the API module with model and data
+        routes.initialize(*(resources if resources is not None else load_resources()))
+
+    routes.resource_loader = BackgroundLoader(initialize, name='model and data')
+    routes.resource_loader.start(background=lazy and resources is None)
     
     # Register the API blueprint
     init_app(app)
@@ -281,19 +343,20 @@ def create_app():
     def home():
         """Serve the dashboard HTML"""
         logger.info("Serving dashboard homepage")
-        return render_template('index.html')
+        # The bundled page (python -m api.bundle) loads a few fingerprinted files instead of ~70
+        return render_template(bundle.page_template())
 
     @app.route('/css/<path:path>')
     def send_css(path):
-        return send_from_directory('css', path)
+        return compression.send_asset('css', path)
 
     @app.route('/js/<path:path>')
     def send_js(path):
-        return send_from_directory('js', path)
+        return compression.send_asset('js', path)
 
     @app.route('/assets/<path:path>')
     def send_assets(path):
-        return send_from_directory('assets', path)
+        return compression.send_asset('assets', path)
     
     # Serve documentation files from parent directory (parity with Dashboard/app.py)
     @app.route('/docs/<path:filename>')
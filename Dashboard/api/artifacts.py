@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import shutil
+import numpy as np
+import pandas as pd
+import logging
+
+from .forest import FlatForest, tree_arrays
+from .inference import scaler_parameters
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# Bump when the on-disk layout changes; older artifacts are refused, not misread
+ARTIFACT_VERSION = 2
+
+# Written last: a directory without it is incomplete
+MANIFEST_FILE = 'manifest.json'
+
+
+def linear_model_types():
+    """Linear classes the loader can rebuild, by the model_type a manifest records"""
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    return {'LogisticRegression': LogisticRegression, 'SGDClassifier': SGDClassifier}
+
+
+def model_type(model):
+    """Class name recorded in the manifest (a FlatForest keeps the name of the forest it was flattened from)"""
+    return model.model_type if isinstance(model, FlatForest) else type(model).__name__
+
+
+def model_params(model):
+    """The estimator's JSON-representable hyperparameters, so a rebuilt linear model keeps its settings"""
+    return {name: value for name, value in model.get_params().items()
+            if value is None or isinstance(value, (str, bool, int, float))}
+
+
+def model_arrays(model):
+    """(kind, arrays) for a supported fitted model"""
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    from sklearn.tree import DecisionTreeClassifier
+    if isinstance(model, FlatForest):
+        return 'tree_ensemble', dict(model.arrays)
+    if isinstance(model, (RandomForestClassifier, ExtraTreesClassifier, DecisionTreeClassifier)):
+        return 'tree_ensemble', tree_arrays(model)
+    binary_linear = isinstance(model, LogisticRegression) or (
+        isinstance(model, SGDClassifier) and model.loss == 'log_loss')
+    if binary_linear and model.coef_.shape[0] == 1:
+        return 'linear', {'coef': np.ascontiguousarray(model.coef_, dtype=np.float64),
+                          'intercept': np.ascontiguousarray(model.intercept_, dtype=np.float64)}
+    raise ValueError(f"{type(model).__name__} cannot be exported; use the .pkl files")
+
+
+def export_artifacts(model, scaler, model_columns, path):
+    """Write model, scaler and columns as .npy arrays plus a JSON manifest and swap them into place"""
+    from sklearn.preprocessing import StandardScaler
+    if not isinstance(scaler, StandardScaler):
+        raise ValueError(f"{type(scaler).__name__} cannot be exported; use the .pkl files")
+    kind, arrays = model_arrays(model)
+    mean, scale = scaler_parameters(scaler)
+    var = scaler.var_ if getattr(scaler, 'var_', None) is not None else scale ** 2
+    arrays.update({'classes': np.asarray(model.classes_), 'scaler_mean': mean, 'scaler_scale': scale,
+                   'scaler_var': np.asarray(var, dtype=np.float64),
+                   # A count per feature when the scaler was fitted with NaNs, else one count
+                   'scaler_n_samples_seen': np.asarray(scaler.n_samples_seen_, dtype=np.int64)})
+    feature_names = getattr(scaler, 'feature_names_in_', None)
+
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    manifest = {
+        'version': ARTIFACT_VERSION,
+        'kind': kind,
+        'model_type': model_type(model),
+        'params': model_params(model) if kind == 'linear' else {},
+        'columns': [str(column) for column in model_columns],
+        'n_features': int(scaler.n_features_in_),
+        'scaler': {
+            'feature_names': [str(name) for name in feature_names] if feature_names is not None else None
+        },
+        'arrays': {}
+    }
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), values, allow_pickle=False)
+        manifest['arrays'][name] = {'dtype': values.dtype.str, 'shape': list(values.shape)}
+    with open(os.path.join(tmp_path, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f, indent=1)
+
+    old_path = None
+    if os.path.isdir(path):
+        old_path = f'{path}.old{os.getpid()}'
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    if old_path:
+        shutil.rmtree(old_path, ignore_errors=True)
+    size = sum(values.nbytes for values in arrays.values())
+    logger.info(f"Model artifacts written to {path}: {manifest['model_type']}, {size:,} bytes of arrays")
+    return path
+
+
+def is_artifact_dir(path):
+    return os.path.isfile(os.path.join(path, MANIFEST_FILE))
+
+
+def artifact_files(path):
+    """Files of an artifact directory (the manifest last), for change detection"""
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        names = json.load(f)['arrays']
+    return [os.path.join(path, f'{name}.npy') for name in names] + [os.path.join(path, MANIFEST_FILE)]
+
+
+def load_artifacts(path):
+    """Memory-map an artifact directory; returns (model, scaler, model_columns).
+
+    Arrays are read-only views of the mapped files, so loading reads no array
+    data and every process that loads the same directory shares its pages.
+    Nothing is unpickled.
+    """
+    from sklearn.preprocessing import StandardScaler
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != ARTIFACT_VERSION:
+        raise ValueError(f"{path} has artifact version {manifest.get('version')}, expected {ARTIFACT_VERSION}")
+    arrays = {}
+    for name, spec in manifest['arrays'].items():
+        values = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r', allow_pickle=False)
+        if values.dtype.str != spec['dtype'] or list(values.shape) != spec['shape']:
+            raise ValueError(f"{name}.npy in {path} does not match the manifest")
+        arrays[name] = values
+
+    n_features = manifest['n_features']
+    classes = np.asarray(arrays['classes'])
+    if manifest['kind'] == 'linear':
+        model_class = linear_model_types().get(manifest['model_type'])
+        if model_class is None:
+            raise ValueError(f"{path} holds a {manifest['model_type']}, which cannot be rebuilt from artifacts")
+        model = model_class(**manifest['params'])
+        model.coef_ = arrays['coef']
+        model.intercept_ = arrays['intercept']
+        model.classes_ = classes
+        model.n_features_in_ = n_features
+    elif manifest['kind'] == 'tree_ensemble':
+        model = FlatForest(arrays, classes, n_features, manifest['model_type'])
+    else:
+        raise ValueError(f"{path} holds an unknown model kind {manifest['kind']!r}")
+
+    scaler = StandardScaler()
+    scaler.mean_ = arrays['scaler_mean']
+    scaler.scale_ = arrays['scaler_scale']
+    scaler.var_ = arrays['scaler_var']
+    scaler.n_features_in_ = n_features
+    # Copied: partial_fit() updates the counts in place
+    n_samples_seen = np.array(arrays['scaler_n_samples_seen'])
+    scaler.n_samples_seen_ = n_samples_seen if n_samples_seen.ndim else np.int64(n_samples_seen)
+    if manifest['scaler']['feature_names'] is not None:
+        scaler.feature_names_in_ = np.array(manifest['scaler']['feature_names'], dtype=object)
+    return model, scaler, pd.Index(manifest['columns'])
+
+
+if __name__ == '__main__':
+    # Usage (from Dashboard/): python -m api.artifacts [source_dir] [artifact_dir]
+    # Converts model.pkl, scaler.pkl and model_columns.pkl in source_dir (default Models/)
+    # into an artifact directory. Only registry versions are loaded memory-mapped, so
+    # without artifact_dir they become a new registry version that CURRENT points at.
+    import time
+    import pickle
+    from .registry import ARTIFACT_FILES, ModelRegistry
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    source_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'Models')
+    loaded = []
+    for name in ARTIFACT_FILES:
+        with open(os.path.join(source_dir, name), 'rb') as f:
+            loaded.append(pickle.load(f))
+    if len(sys.argv) > 2:
+        export_artifacts(*loaded, sys.argv[2])
+    else:
+        registry = ModelRegistry()
+        version = time.strftime('%Y%m%d-%H%M%S')
+        export_artifacts(*loaded, os.path.join(registry.root, version))
+        registry.activate(version)
@@ -0,0 +1,269 @@
+"""
+ASGI entry point for the dashboard API.
+
+Wraps the Flask app from api.app:create_app so it can run under an ASGI
+server:
+
+    uvicorn --app-dir Dashboard --factory api.asgi:create_asgi_app --port 8000
+
+The routes stay ordinary (synchronous) Flask views: each /api/* request runs
+its view, and so the model inference, on a bounded thread pool of
+ASGI_WORKER_THREADS. Connections are handled on the event loop. A request
+body up to REQUEST_BUFFER_LIMIT is read there before the view is dispatched,
+so a slow upload holds a socket but no thread; the rest of a larger body, or
+any NDJSON body, is pulled from the loop as the view reads it. Response
+chunks are sent as soon as the view produces them. Static files under /css,
+/js and /assets (or their precompressed .br/.gz versions) are streamed in
+chunks without touching that pool, with the same validators as
+compression.send_asset().
+"""
+
+import io
+import os
+import sys
+import asyncio
+import mimetypes
+import logging
+from zlib import adler32
+from concurrent.futures import ThreadPoolExecutor
+
+from werkzeug.exceptions import ClientDisconnected
+from werkzeug.http import http_date, is_resource_modified, parse_accept_header, quote_etag
+from werkzeug.security import safe_join
+
+from .compression import FINGERPRINTED_ASSET, IMMUTABLE_MAX_AGE, precompressed_variant
+from .startup import LAZY_LOAD
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# Flask views (and the model calls in them) running at once per process
+ASGI_WORKER_THREADS = int(os.environ.get('ASGI_WORKER_THREADS', 8))
+
+# Static files are read and sent in chunks of this size
+STATIC_CHUNK_SIZE = 64 * 1024
+
+# Request bodies up to this size are read on the loop before the view runs;
+# the view pulls the rest of a larger body as it reads
+REQUEST_BUFFER_LIMIT = 1024 * 1024
+
+# Bodies of these types are handed to the view as they arrive (/api/predict_stream)
+STREAMED_CONTENT_TYPES = ('application/x-ndjson',)
+
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIC_PREFIXES = {'/css/': 'css', '/js/': 'js', '/assets/': 'assets'}
+
+
+def wsgi_environ(scope, stream, content_length=None):
+    """Build the WSGI environ for an ASGI http scope reading its body from stream"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': stream,
+        'wsgi.input_terminated': True,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+            continue
+        key = f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    if 'CONTENT_LENGTH' not in environ and content_length is not None:
+        environ['CONTENT_LENGTH'] = str(content_length)
+    return environ
+
+
+class RequestBody(io.RawIOBase):
+    """wsgi.input for a view thread: the buffered start of the body, then the rest pulled from the loop"""
+
+    def __init__(self, buffered, more_body, receive, loop):
+        self.buffered = buffered
+        self.position = 0
+        self.more_body = more_body
+        self.receive = receive
+        self.loop = loop
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self.position == len(self.buffered) and self.more_body:
+            message = asyncio.run_coroutine_threadsafe(self.receive(), self.loop).result()
+            if message['type'] == 'http.disconnect':
+                raise ClientDisconnected()
+            self.buffered, self.position = message.get('body', b''), 0
+            self.more_body = message.get('more_body', False)
+        size = min(len(buffer), len(self.buffered) - self.position)
+        buffer[:size] = self.buffered[self.position:self.position + size]
+        self.position += size
+        return size
+
+
+class DashboardASGI:
+    """ASGI application serving a Flask app's views from a bounded thread pool"""
+
+    def __init__(self, flask_app, threads=ASGI_WORKER_THREADS, static_root=DASHBOARD_DIR):
+        self.flask_app = flask_app
+        self.static_root = static_root
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi-view')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        for prefix, folder in STATIC_PREFIXES.items():
+            if scope['path'].startswith(prefix) and scope['method'] in ('GET', 'HEAD'):
+                await self.serve_static(scope, send, folder, scope['path'][len(prefix):])
+                return
+        await self.serve_view(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, scope, receive):
+        """Read the start of the request body on the loop.
+
+        Returns (body, more_body): the whole body, or its first
+        REQUEST_BUFFER_LIMIT bytes (first message for a streamed type) with
+        more_body set. Returns None if the client went away first.
+        """
+        content_type = dict(scope.get('headers') or []).get(b'content-type', b'').decode('latin1')
+        streamed = content_type.split(';', 1)[0].strip() in STREAMED_CONTENT_TYPES
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            chunks.append(message.get('body', b''))
+            size += len(chunks[-1])
+            if not message.get('more_body', False):
+                return b''.join(chunks), False
+            if streamed or size >= REQUEST_BUFFER_LIMIT:
+                return b''.join(chunks), True
+
+    def run_view(self, environ, send, loop):
+        """Run the Flask app for one request on a pool thread, sending each chunk as it is produced.
+
+        The whole iteration stays on this thread, so a stream_with_context()
+        generator resumes where its request context was pushed. Each message
+        is handed to the loop and sent before the next chunk is produced.
+        """
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['start'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers]
+            }
+
+        def emit(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        iterable = self.flask_app.wsgi_app(environ, start_response)
+        try:
+            for chunk in iterable:
+                if not chunk:
+                    continue
+                # Headers go out with the first non-empty chunk (PEP 3333)
+                if 'start' in response:
+                    emit(response.pop('start'))
+                emit({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            if 'start' in response:
+                emit(response.pop('start'))
+            emit({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(iterable, 'close'):
+                iterable.close()
+
+    async def serve_view(self, scope, receive, send):
+        start = await self.read_body(scope, receive)
+        if start is None:
+            return
+        body, more_body = start
+        loop = asyncio.get_running_loop()
+        stream = io.BufferedReader(RequestBody(body, more_body, receive, loop))
+        environ = wsgi_environ(scope, stream, None if more_body else len(body))
+        await loop.run_in_executor(self.executor, self.run_view, environ, send, loop)
+
+    async def serve_static(self, scope, send, folder, path):
+        file_path = safe_join(os.path.join(self.static_root, folder), path)
+        if file_path is None or not os.path.isfile(file_path):
+            await send({'type': 'http.response.start', 'status': 404,
+                        'headers': [(b'content-type', b'text/plain; charset=utf-8')]})
+            await send({'type': 'http.response.body', 'body': b'Not Found'})
+            return
+        content_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+            content_type += '; charset=utf-8'
+        request_headers = dict(scope.get('headers') or [])
+        accept = parse_accept_header(request_headers.get(b'accept-encoding', b'').decode('latin1'))
+        file_path, encoding = precompressed_variant(file_path, accept)
+        stat = os.stat(file_path)
+
+        # Same validators as send_file() gives compression.send_asset()
+        check = adler32(file_path.encode('utf-8')) & 0xFFFFFFFF
+        etag = quote_etag(f'{stat.st_mtime}-{stat.st_size}-{check}')
+        last_modified = http_date(stat.st_mtime)
+        validators = [
+            (b'etag', etag.encode('latin1')),
+            (b'last-modified', last_modified.encode('latin1')),
+            (b'vary', b'Accept-Encoding')
+        ]
+        if FINGERPRINTED_ASSET.search(path):
+            validators.append((b'cache-control', f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'.encode('latin1')))
+        else:
+            validators.append((b'cache-control', b'no-cache'))
+        if not is_resource_modified(wsgi_environ(scope, io.BytesIO()), etag=etag, last_modified=last_modified):
+            await send({'type': 'http.response.start', 'status': 304, 'headers': validators})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        headers = [
+            (b'content-type', content_type.encode('latin1')),
+            (b'content-length', str(stat.st_size).encode('latin1'))
+        ] + validators
+        if encoding is not None:
+            headers.append((b'content-encoding', encoding.encode('latin1')))
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+        if scope['method'] == 'HEAD':
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        loop = asyncio.get_running_loop()
+        with open(file_path, 'rb') as f:
+            while True:
+                chunk = await loop.run_in_executor(None, f.read, STATIC_CHUNK_SIZE)
+                if not chunk:
+                    break
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+
+
+def create_asgi_app(resources=None, lazy=LAZY_LOAD, threads=ASGI_WORKER_THREADS):
+    """ASGI counterpart of api.app:create_app()"""
+    from .app import create_app
+    logger.info(f"Serving the dashboard API over ASGI with {threads} view threads")
+    return DashboardASGI(create_app(resources, lazy), threads=threads)
@@ -0,0 +1,213 @@
+import logging
+
+from . import serialization
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# Fields every prediction record must provide
+REQUIRED_FIELDS = ['age', 'income', 'time_on_website', 'previous_purchases',
+                   'marketing_engaged', 'search_frequency', 'device_age', 'brand']
+
+# Fields a brand comparison profile must provide (the brand comes from the brand list)
+PROFILE_FIELDS = [field for field in REQUIRED_FIELDS if field != 'brand']
+
+# Default number of rows sent through the scaler and model at once
+DEFAULT_CHUNK_SIZE = 1000
+
+# Upper bound on the number of records accepted by a single batch request
+MAX_BATCH_RECORDS = 50000
+
+
+def extract_records(payload):
+    """Pull the record list and chunk size out of a batch request body.
+
+    Accepts either a bare JSON list of records or an object of the form
+    ``{"records": [...], "chunk_size": 500}``. Raises ValueError with a
+    client-facing message when the body cannot be used.
+    """
+    chunk_size = DEFAULT_CHUNK_SIZE
+    if isinstance(payload, dict):
+        records = payload.get('records')
+        if 'chunk_size' in payload:
+            try:
+                chunk_size = int(payload['chunk_size'])
+            except (TypeError, ValueError):
+                raise ValueError('chunk_size must be an integer')
+            if chunk_size < 1:
+                raise ValueError('chunk_size must be a positive integer')
+    else:
+        records = payload
+
+    if not isinstance(records, list):
+        raise ValueError('Request body must be a list of records or an object with a "records" list')
+    if len(records) > MAX_BATCH_RECORDS:
+        raise ValueError(f'A batch may contain at most {MAX_BATCH_RECORDS} records')
+    return records, chunk_size
+
+
+def validate_records(records, required_fields=REQUIRED_FIELDS):
+    """Split records into valid rows and per-row errors.
+
+    Returns a tuple ``(valid, errors)`` where ``valid`` is a list of
+    ``(index, record)`` pairs and ``errors`` maps the input index to an
+    error dict that can be returned to the client as-is.
+    """
+    valid = []
+    errors = {}
+    for index, record in enumerate(records):
+        if not isinstance(record, dict):
+            errors[index] = {
+                'index': index,
+                'error': 'Invalid record',
+                'message': 'Each record must be a JSON object'
+            }
+            continue
+        missing_fields = [field for field in required_fields if field not in record]
+        if missing_fields:
+            errors[index] = {
+                'index': index,
+                'error': 'Missing required fields',
+                'missing_fields': missing_fields
+            }
+            continue
+        valid.append((index, record))
+    return valid, errors
+
+
+def predict_batch(records, engine, encoder, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Score many records, returning one result per input record in input order.
+
+    Invalid records are reported in place with an ``error`` key and do not
+    stop the rest of the batch from being scored.
+    """
+    valid, errors = validate_records(records)
+    results = [None] * len(records)
+    for index, error in errors.items():
+        results[index] = error
+
+    # A process-pool engine splits one call across its workers, so it gets the whole job
+    if getattr(engine, 'shards_calls', False):
+        chunk_size = max(chunk_size, len(valid))
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        indices = [index for index, _ in chunk]
+        try:
+            features = encoder.encode_many([record for _, record in chunk])
+            labels, probabilities = engine.predict(features)
+        except Exception as chunk_error:
+            logger.error(f"Error scoring batch chunk starting at {start}: {str(chunk_error)}")
+            for index in indices:
+                results[index] = {
+                    'index': index,
+                    'error': 'Prediction error',
+                    'message': str(chunk_error)
+                }
+            continue
+
+        for index, label, probability in zip(indices, labels, probabilities):
+            prediction = int(label)
+            results[index] = {
+                'index': index,
+                'prediction': prediction,
+                'probability': float(probability),
+                'message': 'Likely to purchase' if prediction == 1 else 'Not likely to purchase'
+            }
+
+    return results
+
+
+def compare_brands(profiles, brands, engine, encoder):
+    """Score every profile against every brand with a single engine call.
+
+    Returns ``(labels, probabilities)`` arrays shaped ``(len(profiles), len(brands))``.
+    """
+    features = encoder.encode_brand_grid(profiles, brands)
+    labels, probabilities = engine.predict(features)
+    shape = (len(profiles), len(brands))
+    return labels.reshape(shape), probabilities.reshape(shape)
+
+
+def brand_affinity(profiles, brands, engine, encoder, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Build a profile x brand purchase-probability matrix for many customer profiles.
+
+    Returns one result per input profile in input order; invalid profiles are
+    reported in place with an ``error`` key.
+    """
+    valid, errors = validate_records(profiles, PROFILE_FIELDS)
+    results = [None] * len(profiles)
+    for index, error in errors.items():
+        results[index] = error
+
+    # Keep each engine call at roughly chunk_size rows (the whole job for a process pool)
+    profiles_per_chunk = max(1, chunk_size // max(1, len(brands)))
+    if getattr(engine, 'shards_calls', False):
+        profiles_per_chunk = max(1, len(valid))
+    for start in range(0, len(valid), profiles_per_chunk):
+        chunk = valid[start:start + profiles_per_chunk]
+        indices = [index for index, _ in chunk]
+        try:
+            labels, probabilities = compare_brands([record for _, record in chunk], brands, engine, encoder)
+        except Exception as chunk_error:
+            logger.error(f"Error scoring brand affinity chunk starting at {start}: {str(chunk_error)}")
+            for index in indices:
+                results[index] = {
+                    'index': index,
+                    'error': 'Comparison error',
+                    'message': str(chunk_error)
+                }
+            continue
+
+        for index, row_labels, row_probabilities in zip(indices, labels, probabilities):
+            best = int(row_probabilities.argmax())
+            results[index] = {
+                'index': index,
+                'probabilities': [float(p) for p in row_probabilities],
+                'predictions': [int(label) for label in row_labels],
+                'best_brand': brands[best],
+                'best_probability': float(row_probabilities[best])
+            }
+
+    return results
+
+
+def read_ndjson(lines):
+    """Yield (record, parse_error) for each non-blank line of newline-delimited JSON"""
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield serialization.loads(line), None
+        except ValueError as parse_error:
+            yield None, str(parse_error)
+
+
+def stream_predictions(lines, engine, encoder, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Score newline-delimited JSON records chunk by chunk.
+
+    Yields one list of results per chunk as soon as it is scored, so only
+    ``chunk_size`` records are held at a time. Result indexes count input
+    records across the whole stream; a line that is not valid JSON gets an
+    ``Invalid JSON`` error in place.
+    """
+    offset = 0
+    chunk = []
+    parsed = read_ndjson(lines)
+    while True:
+        chunk.clear()
+        for item in parsed:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                break
+        if not chunk:
+            return
+        results = predict_batch([record for record, _ in chunk], engine, encoder, chunk_size=chunk_size)
+        for i, (_, parse_error) in enumerate(chunk):
+            if parse_error is not None:
+                results[i] = {'index': i, 'error': 'Invalid JSON', 'message': parse_error}
+            results[i]['index'] = offset + i
+        offset += len(chunk)
+        yield results
@@ -0,0 +1,188 @@
+"""
+Front-end bundling for the dashboard page.
+
+    python -m api.bundle              # from the Dashboard folder
+    python -m api.bundle --in-place   # rewrite index.html itself (static hosting)
+
+index.html loads its CSS and JS as dozens of separate files. This build step
+finds each run of consecutive local <link rel="stylesheet"> or <script src>
+tags (only whitespace and comments between them, same script attributes),
+concatenates the files of a run in page order and writes them as one
+fingerprinted bundle, css/bundle.<hash>.css or js/bundle.<hash>.js. Bundles sit
+in the folder of their sources, so relative url() references still resolve.
+The page with each run replaced by a single tag is written to
+index.bundled.html, which the home route serves while it is newer than
+index.html. Bundles are minified with rcssmin/rjsmin when installed and
+precompressed with api.compression.
+
+Files that fail to bundle safely are left as their own tags: missing files,
+and scripts that would redeclare a top-level const/let/class of an earlier
+file in the same bundle (an error that separate scripts confine to one file).
+"""
+
+import os
+import re
+import hashlib
+import argparse
+import logging
+
+from . import compression
+from .compression import FINGERPRINTED_ASSET
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# Optional minifiers; without them bundles are concatenated as-is (compression
+# still removes most of the difference on the wire)
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE = 'index.html'
+BUNDLED_PAGE = 'index.bundled.html'
+
+ASSET_TAG = re.compile(
+    r'<link rel="stylesheet" href="(?P<css>css/[^"]+\.css)"\s*/?>'
+    r'|<script src="(?P<js>js/[^"]+\.js)"(?P<attrs>[^>]*)></script>')
+# Text allowed between two tags of one run: whitespace and whole comments
+RUN_GAP = re.compile(r'(?:\s|<!--(?:(?!-->).)*-->)*', re.S)
+CSS_IMPORT = re.compile(r'@import\s[^;]+;')
+TOP_LEVEL_LEXICAL = re.compile(r'^(?:const|let|class)\s+([A-Za-z_$][\w$]*)', re.M)
+
+
+def find_runs(html, root=DASHBOARD_DIR):
+    """Return [(start, end, kind, attrs, paths)] for each run of bundleable tags in html"""
+    runs = []
+    for match in ASSET_TAG.finditer(html):
+        path = match.group('css') or match.group('js')
+        kind = 'css' if match.group('css') else 'js'
+        attrs = (match.group('attrs') or '').strip()
+        if FINGERPRINTED_ASSET.search(path) or not os.path.isfile(os.path.join(root, path)):
+            if not FINGERPRINTED_ASSET.search(path):
+                logger.warning(f"{path} is referenced by the page but missing; leaving its tag")
+            runs.append(None)
+            continue
+        previous = runs[-1] if runs else None
+        if (previous is not None and previous[2] == kind and previous[3] == attrs
+                and RUN_GAP.fullmatch(html, previous[1], match.start())):
+            runs[-1] = (previous[0], match.end(), kind, attrs, previous[4] + [path])
+        else:
+            runs.append((match.start(), match.end(), kind, attrs, [path]))
+    return [run for run in runs if run is not None]
+
+
+def split_conflicts(paths, sources):
+    """Split a script run wherever a file redeclares a top-level name of an earlier file in its group"""
+    groups, declared = [[]], set()
+    for path in paths:
+        names = set(TOP_LEVEL_LEXICAL.findall(sources[path]))
+        if names & declared:
+            logger.warning(f"{path} redeclares {sorted(names & declared)}; starting a new bundle")
+            groups.append([])
+            declared = set()
+        groups[-1].append(path)
+        declared |= names
+    return groups
+
+
+def bundle_css(paths, sources):
+    # @import is only valid before other rules, so the imports of all files go first
+    imports, bodies = [], []
+    for path in paths:
+        text = sources[path]
+        imports.extend(CSS_IMPORT.findall(text))
+        text = CSS_IMPORT.sub('', text)
+        bodies.append(f"/* {path} */\n" + (rcssmin.cssmin(text) if rcssmin is not None else text))
+    return '\n'.join(imports + bodies) + '\n'
+
+
+def bundle_js(paths, sources):
+    # Each file ends with a ';' so one without a trailing semicolon cannot run into the next
+    return ''.join(f"/* {path} */\n" + (rjsmin.jsmin(sources[path]) if rjsmin is not None else sources[path])
+                   + '\n;\n' for path in paths)
+
+
+def write_bundle(kind, content, root):
+    data = content.encode('utf-8')
+    digest = hashlib.blake2b(data, digest_size=6).hexdigest()
+    path = f"{kind}/bundle.{digest}.{kind}"
+    with open(os.path.join(root, path), 'wb') as f:
+        f.write(data)
+    compression.precompress_file(os.path.join(root, path))
+    return path
+
+
+def build(root=DASHBOARD_DIR, in_place=False):
+    """Write the bundles and the rewritten page; returns {bundle path: source paths}"""
+    with open(os.path.join(root, PAGE), encoding='utf-8') as f:
+        html = f.read()
+    runs = find_runs(html, root)
+    sources = {}
+    for run in runs:
+        for path in run[4]:
+            with open(os.path.join(root, path), encoding='utf-8') as f:
+                sources[path] = f.read()
+
+    bundles = {}
+    # Replace from the end so earlier offsets stay valid
+    for start, end, kind, attrs, paths in reversed(runs):
+        tags = []
+        for group in (split_conflicts(paths, sources) if kind == 'js' else [paths]):
+            content = bundle_css(group, sources) if kind == 'css' else bundle_js(group, sources)
+            path = write_bundle(kind, content, root)
+            bundles[path] = group
+            if kind == 'css':
+                tags.append(f'<link rel="stylesheet" href="{path}">')
+            else:
+                tags.append(f'<script src="{path}"{" " + attrs if attrs else ""}></script>')
+        html = html[:start] + '\n    '.join(tags) + html[end:]
+
+    remove_stale(root, html)
+    with open(os.path.join(root, PAGE if in_place else BUNDLED_PAGE), 'w', encoding='utf-8') as f:
+        f.write(html)
+    files = sum(len(group) for group in bundles.values())
+    logger.info(f"Bundled {files} files into {len(bundles)} bundles"
+                + ('' if rjsmin is not None and rcssmin is not None
+                   else ' (rjsmin/rcssmin not installed; not minified)'))
+    return bundles
+
+
+def remove_stale(root, html):
+    """Delete bundles (and their compressed copies) the page no longer references"""
+    referenced = {match.group('css') or match.group('js') for match in ASSET_TAG.finditer(html)}
+    for folder in ('css', 'js'):
+        for name in os.listdir(os.path.join(root, folder)):
+            path = f"{folder}/{name}"
+            if name.startswith('bundle.') and FINGERPRINTED_ASSET.search(path) and path not in referenced:
+                os.remove(os.path.join(root, path))
+                for _, suffix in compression.ENCODINGS:
+                    if os.path.exists(os.path.join(root, path + suffix)):
+                        os.remove(os.path.join(root, path + suffix))
+
+
+def page_template(root=DASHBOARD_DIR):
+    """index.bundled.html when a build newer than index.html exists, else index.html"""
+    bundled = os.path.join(root, BUNDLED_PAGE)
+    if os.path.isfile(bundled) and os.path.getmtime(bundled) >= os.path.getmtime(os.path.join(root, PAGE)):
+        return BUNDLED_PAGE
+    return PAGE
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Bundle and fingerprint the CSS and JS of the dashboard page')
+    parser.add_argument('--root', default=DASHBOARD_DIR, help='Dashboard folder')
+    parser.add_argument('--in-place', action='store_true',
+                        help=f'rewrite {PAGE} instead of writing {BUNDLED_PAGE} (for static hosts)')
+    args = parser.parse_args(argv)
+    build(args.root, in_place=args.in_place)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,133 @@
+import os
+import time
+import queue
+import threading
+import numpy as np
+import logging
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# Off by default; set PREDICTION_BATCH_WAIT_MS > 0 to coalesce concurrent /predict calls
+DEFAULT_MAX_WAIT_MS = float(os.environ.get('PREDICTION_BATCH_WAIT_MS', 0))
+DEFAULT_MAX_BATCH = int(os.environ.get('PREDICTION_BATCH_SIZE', 32))
+
+
+class _Pending:
+    """One request's rows waiting for the batch they end up in"""
+
+    __slots__ = ('engine', 'features', 'done', 'result', 'error')
+
+    def __init__(self, engine, features):
+        self.engine = engine
+        self.features = features
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Coalesces concurrent predictions into one engine call per batch.
+
+    A request thread queues its encoded rows and blocks. A scorer thread takes
+    the first waiting request, gathers whatever else arrives within
+    ``max_wait_ms`` (or until ``max_batch`` rows), stacks the rows per engine,
+    makes one ``predict`` call and hands each request its slice of the result.
+    Only useful when a worker serves requests concurrently (threaded workers
+    or the development server); a sync worker never has two waiting.
+    """
+
+    def __init__(self, max_wait_ms=DEFAULT_MAX_WAIT_MS, max_batch=DEFAULT_MAX_BATCH):
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.batches = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    @property
+    def enabled(self):
+        return self.max_wait > 0
+
+    def _ensure_thread(self):
+        # Threads do not survive fork, so a preforked worker starts its own
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='prediction-batcher', daemon=True)
+                self._thread.start()
+
+    def predict(self, engine, features):
+        """Drop-in for engine.predict(features) that shares the call with concurrent requests"""
+        if not self.enabled:
+            return engine.predict(features)
+        self._ensure_thread()
+        pending = _Pending(engine, np.asarray(features, dtype=np.float64))
+        self._queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def _collect(self):
+        """Block for one request, then gather more until the wait or size limit"""
+        batch = [self._queue.get()]
+        rows = len(batch[0].features)
+        wait_until = time.monotonic() + self.max_wait
+        while rows < self.max_batch:
+            remaining = wait_until - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                pending = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(pending)
+            rows += len(pending.features)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Requests may be served by different model versions mid-swap; score per engine
+            groups = {}
+            for pending in batch:
+                groups.setdefault(id(pending.engine), []).append(pending)
+            for group in groups.values():
+                self._score(group)
+
+    def _score(self, group):
+        try:
+            features = group[0].features if len(group) == 1 else np.vstack([p.features for p in group])
+            labels, probabilities = group[0].engine.predict(features)
+            self.batches += 1
+            self.rows += len(features)
+            start = 0
+            for pending in group:
+                end = start + len(pending.features)
+                pending.result = (labels[start:end], probabilities[start:end])
+                start = end
+        except Exception as score_error:
+            logger.error(f"Batched prediction failed for {len(group)} requests: {str(score_error)}")
+            for pending in group:
+                pending.error = score_error
+        finally:
+            for pending in group:
+                pending.done.set()
+
+    def stats(self):
+        """Counters for /api/status"""
+        return {
+            'enabled': self.enabled,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'max_batch': self.max_batch,
+            'batches': self.batches,
+            'rows': self.rows,
+            'mean_batch_rows': self.rows / self.batches if self.batches else 0.0
+        }
+
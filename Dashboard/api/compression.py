@@ -0,0 +1,224 @@
+"""
+Response compression for the dashboard.
+
+Static assets are compressed ahead of time by a build step that writes
+``name.br`` (with the brotli package) and ``name.gz`` next to each file:
+
+    python -m api.compression            # from the Dashboard folder
+
+send_asset() then serves the best variant the request's Accept-Encoding
+allows, falling back to the original file. API JSON responses above
+API_COMPRESS_MIN_BYTES are compressed on the fly by an after_request hook.
+"""
+
+import os
+import re
+import gzip
+import argparse
+import threading
+import mimetypes
+import logging
+from collections import OrderedDict
+
+from flask import current_app, request, send_from_directory
+from werkzeug.security import safe_join
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# brotli is optional: it compresses text about 15-20% smaller than gzip.
+# Without it only .gz variants are built and API responses use gzip.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Folders (under Dashboard/) and file types the build step compresses
+ASSET_FOLDERS = ('css', 'js', 'assets', 'data')
+ASSET_SUFFIXES = ('.css', '.js', '.json', '.html', '.svg', '.txt', '.map')
+
+# Smaller files fit in one packet uncompressed; a variant is not worth a lookup
+MIN_ASSET_BYTES = 256
+
+# Content codings with their file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Fingerprinted files (name.<12 hex digits>.css/js, written by api.bundle) never
+# change under the same name, so browsers may keep them for a year unasked
+FINGERPRINTED_ASSET = re.compile(r'\.[0-9a-f]{12}\.(?:css|js)$')
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# API JSON responses at least this large are compressed per request
+API_COMPRESS_MIN_BYTES = int(os.environ.get('API_COMPRESS_MIN_BYTES', 1024))
+
+# Per-request levels trade a little ratio for speed; the build step uses the maximum
+API_BROTLI_QUALITY = 4
+API_GZIP_LEVEL = 6
+
+# Compressed bodies of cached payloads, keyed on (ETag, coding); least recently used first
+_compressed_payloads = OrderedDict()
+_compressed_lock = threading.Lock()
+MAX_COMPRESSED_PAYLOADS = 64
+
+
+def compress(data, encoding, fast=False):
+    """Compress bytes with 'br' or 'gzip' (gzip output has a fixed mtime, so builds are reproducible)"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=API_BROTLI_QUALITY if fast else 11)
+    return gzip.compress(data, compresslevel=API_GZIP_LEVEL if fast else 9, mtime=0)
+
+
+def accepted_encodings(accept, precompressed=False):
+    """Codings the Accept-Encoding header allows, best first.
+
+    br needs the brotli package only when compressing on the fly.
+    """
+    return [encoding for encoding, _ in ENCODINGS
+            if accept[encoding] > 0 and (precompressed or encoding != 'br' or brotli is not None)]
+
+
+def precompressed_variant(path, accept):
+    """(file, coding) to send for path: a fresh .br/.gz variant the client accepts, else (path, None)"""
+    for encoding in accepted_encodings(accept, precompressed=True):
+        variant = path + dict(ENCODINGS)[encoding]
+        # A variant older than its source is stale (the source was edited after the build)
+        if os.path.isfile(variant) and os.path.getmtime(variant) >= os.path.getmtime(path):
+            return variant, encoding
+    return path, None
+
+
+def send_asset(directory, path):
+    """send_from_directory() that prefers a precompressed variant of the file"""
+    folder = os.path.join(current_app.root_path, directory)
+    source = safe_join(folder, path)
+    variant, encoding = None, None
+    if source is not None and os.path.isfile(source):
+        variant, encoding = precompressed_variant(source, request.accept_encodings)
+    if encoding is not None:
+        mimetype = mimetypes.guess_type(source)[0] or 'application/octet-stream'
+        response = send_from_directory(folder, os.path.relpath(variant, folder), mimetype=mimetype)
+        response.headers['Content-Encoding'] = encoding
+    else:
+        response = send_from_directory(folder, path)
+    response.vary.add('Accept-Encoding')
+    if FINGERPRINTED_ASSET.search(path):
+        # send_file() marks files no-cache unless SEND_FILE_MAX_AGE_DEFAULT is set
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+
+def compress_response(response):
+    """after_request hook: compress large JSON responses when the client accepts it"""
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or response.mimetype != 'application/json' or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < API_COMPRESS_MIN_BYTES:
+        return response
+    encodings = accepted_encodings(request.accept_encodings)
+    if not encodings:
+        return response
+    encoding = encodings[0]
+
+    # Cached payloads carry a content-hash ETag, so their compressed form is reused
+    etag, _ = response.get_etag()
+    key = (etag, encoding)
+    compressed = None
+    if etag:
+        with _compressed_lock:
+            compressed = _compressed_payloads.get(key)
+            if compressed is not None:
+                _compressed_payloads.move_to_end(key)
+    if compressed is None:
+        compressed = compress(body, encoding, fast=True)
+        if etag:
+            with _compressed_lock:
+                _compressed_payloads[key] = compressed
+                while len(_compressed_payloads) > MAX_COMPRESSED_PAYLOADS:
+                    _compressed_payloads.popitem(last=False)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    if etag:
+        # The encoded body differs byte for byte from the identity one
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def install(app):
+    """Compress this app's JSON responses on the fly"""
+    app.after_request(compress_response)
+    return app
+
+
+def asset_files(root=DASHBOARD_DIR, folders=ASSET_FOLDERS):
+    """Yield the paths of compressible assets under root/folders"""
+    for folder in folders:
+        for dirpath, _, filenames in os.walk(os.path.join(root, folder)):
+            for filename in sorted(filenames):
+                if filename.endswith(ASSET_SUFFIXES):
+                    yield os.path.join(dirpath, filename)
+
+
+def precompress_file(path):
+    """Write the .br/.gz variants of one file; returns {coding: bytes} including 'identity'"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    stat = os.stat(path)
+    sizes = {'identity': len(data)}
+    for encoding, suffix in ENCODINGS:
+        variant = path + suffix
+        compressed = None
+        if len(data) >= MIN_ASSET_BYTES and (encoding != 'br' or brotli is not None):
+            compressed = compress(data, encoding)
+        if compressed is None or len(compressed) >= len(data):
+            # Not worth sending; drop any variant left from an earlier build
+            if os.path.exists(variant):
+                os.remove(variant)
+            continue
+        with open(variant, 'wb') as f:
+            f.write(compressed)
+        # Same mtime as the source: fresh for precompressed_variant() and the same Last-Modified
+        os.utime(variant, (stat.st_atime, stat.st_mtime))
+        sizes[encoding] = len(compressed)
+    return sizes
+
+
+def build(root=DASHBOARD_DIR, folders=ASSET_FOLDERS):
+    """Precompress every asset; returns {path: sizes}"""
+    results = {path: precompress_file(path) for path in asset_files(root, folders)}
+    totals = {encoding: sum(sizes.get(encoding, sizes['identity']) for sizes in results.values())
+              for encoding in ('identity', 'gzip', 'br')}
+    logger.info(f"Precompressed {len(results)} assets: {totals['identity']:,} bytes, "
+                f"{totals['gzip']:,} gzip, {totals['br']:,} brotli"
+                + ('' if brotli is not None else ' (brotli not installed; no .br files)'))
+    return results
+
+
+def clean(root=DASHBOARD_DIR, folders=ASSET_FOLDERS):
+    """Remove the variants written by build()"""
+    for path in asset_files(root, folders):
+        for _, suffix in ENCODINGS:
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write .br/.gz versions of the dashboard assets')
+    parser.add_argument('--root', default=DASHBOARD_DIR, help='Dashboard folder')
+    parser.add_argument('--clean', action='store_true', help='remove the compressed versions instead')
+    args = parser.parse_args(argv)
+    if args.clean:
+        clean(args.root)
+    else:
+        build(args.root)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
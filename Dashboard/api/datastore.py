@@ -0,0 +1,134 @@
+import os
+import sys
+import json
+import shutil
+import numpy as np
+import pandas as pd
+import logging
+
+from .records import CLEANING_RULES, RECORD_COLUMNS
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# Bump when the on-disk layout changes so old stores are rebuilt
+STORE_VERSION = 1
+
+# Columns stored as integer codes plus a category list instead of strings
+CATEGORICAL_COLUMNS = ['brand']
+
+# Where the typed column store lives; every worker memory-maps the same files
+DEFAULT_STORE_PATH = os.environ.get(
+    'DATA_STORE_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 'Data', 'smartphone_purchased_data.columns')
+)
+
+META_FILE = 'meta.json'
+
+
+def _source_stamp(source):
+    """Identify a source file by path, size and modification time"""
+    info = os.stat(source)
+    return {'path': os.path.abspath(source), 'size': info.st_size, 'mtime_ns': info.st_mtime_ns}
+
+
+def _category_codes(values):
+    """Return (codes, categories) with the smallest integer dtype that fits"""
+    codes, categories = pd.factorize(pd.Series(values).astype(str), sort=True)
+    dtype = np.int8 if len(categories) < 2 ** 7 else np.int16 if len(categories) < 2 ** 15 else np.int32
+    return codes.astype(dtype), [str(category) for category in categories]
+
+
+def write_store(df, path=DEFAULT_STORE_PATH, source=None):
+    """Write a DataFrame as one .npy file per column and swap it into place"""
+    tmp_path = f'{path}.tmp{os.getpid()}'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    meta = {
+        'version': STORE_VERSION,
+        'rows': len(df),
+        'columns': [str(column) for column in df.columns],
+        'categories': {},
+        'source': _source_stamp(source) if source and os.path.exists(source) else None
+    }
+    for column in meta['columns']:
+        if column in CATEGORICAL_COLUMNS:
+            values, meta['categories'][column] = _category_codes(df[column])
+        else:
+            values = np.ascontiguousarray(df[column].to_numpy())
+            if values.dtype == object:
+                raise ValueError(f"Column {column} is not numeric; clean the data before storing it")
+        np.save(os.path.join(tmp_path, f'{column}.npy'), values, allow_pickle=False)
+    # meta.json is written last, so a store without it is incomplete
+    with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+        json.dump(meta, f)
+
+    old_path = None
+    if os.path.isdir(path):
+        old_path = f'{path}.old{os.getpid()}'
+        os.rename(path, old_path)
+    os.rename(tmp_path, path)
+    if old_path:
+        shutil.rmtree(old_path, ignore_errors=True)
+    logger.info(f"Column store written to {path}: {len(df)} rows")
+    return path
+
+
+def load_store(path=DEFAULT_STORE_PATH):
+    """Memory-map a column store as a DataFrame, or return None if missing or stale.
+
+    Numeric columns are read-only views of the mapped files, so every process
+    that loads the store shares the same page-cache pages and load time does
+    not grow with the row count.
+    """
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            logger.info(f"Column store {path} has an old layout; it will be rebuilt")
+            return None
+        source = meta.get('source')
+        if source and os.path.exists(source['path']) and _source_stamp(source['path']) != source:
+            logger.info(f"Column store {path} is older than {source['path']}; it will be rebuilt")
+            return None
+
+        columns = {}
+        for column in meta['columns']:
+            values = np.load(os.path.join(path, f'{column}.npy'), mmap_mode='r', allow_pickle=False)
+            if column in meta['categories']:
+                columns[column] = pd.Categorical.from_codes(np.asarray(values), categories=meta['categories'][column])
+            else:
+                columns[column] = values
+        df = pd.DataFrame(columns, copy=False)
+        if len(df) != meta['rows']:
+            raise ValueError(f"expected {meta['rows']} rows, found {len(df)}")
+        logger.info(f"Column store loaded from {path}: {len(df)} rows (memory-mapped)")
+        return df
+    except Exception as load_error:
+        logger.warning(f"Could not load column store {path}: {str(load_error)}")
+        return None
+
+
+def convert_csv(csv_path, path=DEFAULT_STORE_PATH):
+    """One-time conversion of a cleaned dataset CSV into a column store"""
+    df = pd.read_csv(csv_path)
+    missing_columns = [column for column in RECORD_COLUMNS if column not in df.columns]
+    if missing_columns:
+        raise ValueError(f"{csv_path} is missing columns: {missing_columns}")
+    df = df[RECORD_COLUMNS]
+    for column, (default, dtype) in CLEANING_RULES.items():
+        df[column] = pd.to_numeric(df[column], errors='coerce').fillna(default).astype(dtype)
+    return write_store(df, path, source=csv_path)
+
+
+if __name__ == '__main__':
+    # Usage (from Dashboard/): python -m api.datastore [cleaned.csv] [store_dir]
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(DEFAULT_STORE_PATH), 'smartphone_purchased_data_cleaned.csv')
+    convert_csv(csv_path, sys.argv[2] if len(sys.argv) > 2 else DEFAULT_STORE_PATH)
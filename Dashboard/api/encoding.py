@@ -0,0 +1,144 @@
+import math
+import numpy as np
+import logging
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# Numeric input fields and the value used when a field cannot be parsed.
+# These mirror the pd.to_numeric(..., errors='coerce').fillna(...) calls that
+# /api/predict used before the encoder existed.
+NUMERIC_DEFAULTS = {
+    'age': 30,
+    'income': 50000,
+    'time_on_website': 15,
+    'previous_purchases': 1,
+    'marketing_engaged': 0,
+    'search_frequency': 5,
+    'device_age': 2
+}
+
+# Prefix pd.get_dummies gives the one-hot brand columns
+BRAND_PREFIX = 'brand_'
+
+
+def to_number(value, default):
+    """Coerce a raw JSON value to float the way pd.to_numeric(errors='coerce') does.
+
+    Non-finite results ('1e999', 'inf', integers too large for a float) are
+    invalid too and fall back to the default, so no engine ever sees them.
+    """
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        try:
+            number = float(value)
+        except OverflowError:
+            return float(default)
+    elif isinstance(value, str):
+        # float() also accepts digit separators and non-ASCII digits; pandas does not
+        if '_' in value or not value.isascii():
+            return float(default)
+        try:
+            number = float(value.strip())
+        except ValueError:
+            return float(default)
+    else:
+        return float(default)
+    return number if math.isfinite(number) else float(default)
+
+
+class FeatureEncoder:
+    """Encode raw prediction records straight into model-ready NumPy rows.
+
+    Built once from ``model_columns`` when the app starts. Numeric fields map
+    to fixed column indices and brands map to their one-hot slot, so encoding
+    a request is a handful of array writes instead of a DataFrame build,
+    ``pd.get_dummies`` and ``reindex``. Brands without a column (the reference
+    brand dropped at training time, or unknown brands) encode as all zeros,
+    exactly as ``reindex(..., fill_value=0)`` did.
+    """
+
+    def __init__(self, model_columns):
+        self.columns = [str(col) for col in model_columns]
+        self.n_features = len(self.columns)
+        column_index = {col: i for i, col in enumerate(self.columns)}
+
+        # (field, column index, default) for numeric fields present in the model
+        self.numeric_slots = [(field, column_index[field], default)
+                              for field, default in NUMERIC_DEFAULTS.items()
+                              if field in column_index]
+        # brand name -> one-hot column index
+        self.brand_slots = {col[len(BRAND_PREFIX):]: i for i, col in enumerate(self.columns)
+                            if col.startswith(BRAND_PREFIX)}
+        self.brands = list(self.brand_slots)
+        self.brand_columns = np.array(sorted(self.brand_slots.values()), dtype=np.intp)
+
+        logger.info(f"Feature encoder built: {self.n_features} columns, "
+                    f"{len(self.numeric_slots)} numeric, {len(self.brand_slots)} brand slots")
+
+    def brand_slot(self, brand):
+        """Return the one-hot column index for a brand, or None if it has no column"""
+        return self.brand_slots.get(str(brand))
+
+    def encode_into(self, record, row):
+        """Write one record into a preallocated, zeroed row of length n_features"""
+        for field, index, default in self.numeric_slots:
+            row[index] = to_number(record.get(field), default)
+        slot = self.brand_slot(record.get('brand'))
+        if slot is not None:
+            row[slot] = 1.0
+        return row
+
+    def encode(self, record):
+        """Encode a single record as a 1 x n_features matrix"""
+        matrix = np.zeros((1, self.n_features), dtype=np.float64)
+        self.encode_into(record, matrix[0])
+        return matrix
+
+    def encode_many(self, records):
+        """Encode a sequence of records as a len(records) x n_features matrix"""
+        matrix = np.zeros((len(records), self.n_features), dtype=np.float64)
+        for row, record in zip(matrix, records):
+            self.encode_into(record, row)
+        return matrix
+
+    def encode_frame(self, frame):
+        """Encode a DataFrame of raw records column by column (same result as encode_many)"""
+        import pandas as pd
+        matrix = np.zeros((len(frame), self.n_features), dtype=np.float64)
+        for field, index, default in self.numeric_slots:
+            if field in frame:
+                column = frame[field]
+                if column.dtype == bool:
+                    column = column.astype(np.float64)
+                try:
+                    values = pd.to_numeric(column, errors='coerce').to_numpy(np.float64)
+                except OverflowError:
+                    # Integers beyond float range, which errors='coerce' does not catch
+                    values = column.map(lambda value: to_number(value, np.nan)).to_numpy(np.float64)
+                matrix[:, index] = np.where(np.isfinite(values), values, default)
+            else:
+                matrix[:, index] = default
+        if 'brand' in frame:
+            slots = frame['brand'].astype(str).map(self.brand_slots).to_numpy(np.float64)
+            known = ~np.isnan(slots)
+            matrix[np.flatnonzero(known), slots[known].astype(np.intp)] = 1.0
+        return matrix
+
+    def encode_brand_grid(self, records, brands):
+        """Encode every record once per brand as a (len(records) * len(brands)) x n_features matrix.
+
+        Rows are grouped by record: row ``i * len(brands) + j`` is record ``i``
+        with brand ``j``. The numeric part of each record is encoded once and
+        repeated; only the brand one-hot slots differ between rows.
+        """
+        base = self.encode_many(records)
+        base[:, self.brand_columns] = 0.0
+        grid = np.repeat(base, len(brands), axis=0)
+        cube = grid.reshape(len(records), len(brands), self.n_features)
+        for j, brand in enumerate(brands):
+            slot = self.brand_slot(brand)
+            if slot is not None:
+                cube[:, j, slot] = 1.0
+        return grid
@@ -0,0 +1,160 @@
+import os
+import importlib.util
+import numpy as np
+import logging
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# numba is optional: with it the forest is evaluated by a compiled loop, which
+# walks each row down each tree and skips the per-level NumPy calls. It is only
+# looked up here; importing it (and llvmlite) waits for the first forest that uses it
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
+
+# 'auto' uses numba when it is installed; 'numpy' and 'numba' force one path
+FOREST_BACKEND = os.environ.get('FLAT_FOREST_BACKEND', 'auto')
+
+# The NumPy path beats scikit-learn's compiled trees up to about this many rows;
+# larger batches go to predict_proba when the original model is at hand
+NUMPY_MAX_ROWS = int(os.environ.get('FLAT_FOREST_NUMPY_MAX_ROWS', 64))
+
+# Node arrays of a flattened tree ensemble (all trees end to end) and their dtypes
+TREE_ARRAYS = {
+    'feature': np.int32,
+    'threshold': np.float64,
+    'left': np.int32,
+    'right': np.int32,
+    'value': np.float64,
+    'roots': np.int32,
+    'feature_importances': np.float64
+}
+
+def tree_arrays(model):
+    """Flatten a fitted tree classifier or forest into the TREE_ARRAYS layout"""
+    estimators = getattr(model, 'estimators_', [model])
+    if getattr(model, 'n_outputs_', 1) != 1:
+        raise ValueError('multi-output trees are not supported')
+    parts = {name: [] for name in ('feature', 'threshold', 'left', 'right', 'value')}
+    roots, offset = [], 0
+    for estimator in estimators:
+        tree = estimator.tree_
+        roots.append(offset)
+        parts['feature'].append(tree.feature)
+        parts['threshold'].append(tree.threshold)
+        # Children become global node numbers; leaves keep -1
+        parts['left'].append(np.where(tree.children_left >= 0, tree.children_left + offset, -1))
+        parts['right'].append(np.where(tree.children_right >= 0, tree.children_right + offset, -1))
+        # The per-leaf normalisation DecisionTreeClassifier.predict_proba does per call
+        value = tree.value[:, 0, :].copy()
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        normalizer[normalizer == 0.0] = 1.0
+        parts['value'].append(value / normalizer)
+        offset += tree.node_count
+    arrays = {name: np.concatenate(values) for name, values in parts.items()}
+    arrays['roots'] = np.array(roots)
+    arrays['feature_importances'] = np.asarray(model.feature_importances_)
+    return {name: np.ascontiguousarray(values, dtype=TREE_ARRAYS[name]) for name, values in arrays.items()}
+
+
+def _accumulate_trees(X, feature, threshold, left, right, value, roots, out):
+    # Tree by tree, so one tree's nodes stay in cache for the whole batch and
+    # each row's sum is added in scikit-learn's order, to the last bit
+    for tree in range(roots.shape[0]):
+        for i in range(X.shape[0]):
+            node = roots[tree]
+            while feature[node] >= 0:
+                if X[i, feature[node]] <= threshold[node]:
+                    node = left[node]
+                else:
+                    node = right[node]
+            for c in range(value.shape[1]):
+                out[i, c] += value[node, c]
+
+
+_compiled = None
+
+
+def compiled_kernel():
+    """_accumulate_trees compiled by numba, importing numba on first use.
+
+    Compiled on its first call; cache=True keeps the machine code between runs
+    where the package directory is writable.
+    """
+    global _compiled
+    if _compiled is None:
+        import numba
+        _compiled = numba.njit(cache=True, nogil=True)(_accumulate_trees)
+    return _compiled
+
+
+class FlatForest:
+    """Tree classifier (one tree or a forest) evaluated from flat node arrays.
+
+    All trees are laid end to end as a struct of arrays: ``feature``,
+    ``threshold``, ``left`` and ``right`` are indexed by global node number,
+    ``roots`` holds each tree's first node, and ``value`` holds each node's
+    class probabilities. Leaves have a negative feature. Exposes the parts of
+    the scikit-learn API the dashboard uses (predict_proba, predict, classes_,
+    feature_importances_) and returns the same probabilities bit for bit.
+    """
+
+    def __init__(self, arrays, classes, n_features, model_type='RandomForestClassifier'):
+        self.arrays = arrays
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.roots = arrays['roots']
+        self.feature_importances_ = arrays['feature_importances']
+        self.classes_ = classes
+        self.n_features_in_ = n_features
+        self.n_estimators = len(self.roots)
+        self.model_type = model_type
+
+    @classmethod
+    def from_model(cls, model):
+        """Flatten a fitted scikit-learn tree classifier or forest"""
+        return cls(tree_arrays(model), np.asarray(model.classes_), model.n_features_in_, type(model).__name__)
+
+    @property
+    def backend(self):
+        return 'numba' if NUMBA_AVAILABLE and FOREST_BACKEND != 'numpy' else 'numpy'
+
+    def warm(self):
+        """Compile (or load from cache) the numba kernel now rather than on the first request"""
+        if self.backend == 'numba':
+            self.predict_proba(np.zeros((1, self.n_features_in_)))
+
+    def predict_proba(self, X, backend=None):
+        # scikit-learn compares float32 feature values against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        proba = np.zeros((len(X), len(self.classes_)), dtype=np.float64)
+        if (backend or self.backend) == 'numba':
+            compiled_kernel()(X, self.feature, self.threshold, self.left, self.right, self.value, self.roots, proba)
+        else:
+            self._accumulate_levels(X, proba)
+        proba /= len(self.roots)
+        return proba
+
+    def _accumulate_levels(self, X, proba):
+        """Move every (tree, row) pair down one level per step, all trees and rows at once"""
+        n_rows = len(X)
+        # Pair p is row p % n_rows in tree p // n_rows; pairs drop out as they reach a leaf
+        pair = np.arange(len(self.roots) * n_rows)
+        row = np.tile(np.arange(n_rows), len(self.roots))
+        node = np.repeat(self.roots.astype(np.intp), n_rows)
+        leaf = np.empty(len(pair), dtype=np.intp)
+        while len(pair):
+            feature = self.feature[node]
+            split = feature >= 0
+            leaf[pair[~split]] = node[~split]
+            pair, row, node, feature = pair[split], row[split], node[split], feature[split]
+            go_left = X[row, feature] <= self.threshold[node]
+            node = np.where(go_left, self.left[node], self.right[node])
+        # Add tree by tree, as scikit-learn does, so the sums match to the last bit
+        for tree_leaves in leaf.reshape(len(self.roots), n_rows):
+            proba += self.value[tree_leaves]
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -0,0 +1,49 @@
+import os
+import sys
+
+# smaps_rollup fields reported by worker_memory(), in kB
+SMAPS_FIELDS = {
+    'Rss': 'rss_bytes',
+    'Pss': 'pss_bytes',
+    'Shared_Clean': 'shared_bytes',
+    'Shared_Dirty': 'shared_bytes',
+    'Private_Clean': 'private_bytes',
+    'Private_Dirty': 'private_bytes'
+}
+
+
+def _read_smaps_rollup():
+    """Sum the smaps_rollup counters for this process (Linux 4.14+)"""
+    memory = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            key = SMAPS_FIELDS.get(name)
+            if key:
+                memory[key] = memory.get(key, 0) + int(value.split()[0]) * 1024
+    return memory
+
+
+def worker_memory():
+    """Return the memory footprint of the current worker process.
+
+    ``shared_bytes`` counts pages still shared with the gunicorn master and the
+    other workers (preloaded model, memory-mapped dataset); ``pss_bytes`` splits
+    those pages between the processes sharing them, so summing it over the
+    workers gives the real total.
+    """
+    memory = {'pid': os.getpid(), 'ppid': os.getppid()}
+    try:
+        memory.update(_read_smaps_rollup())
+        memory['source'] = 'smaps_rollup'
+    except (OSError, ValueError):
+        try:
+            import resource  # not available on Windows
+        except ImportError:
+            memory['source'] = 'unavailable'
+            return memory
+        # Peak RSS only: kB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory['max_rss_bytes'] = peak if sys.platform == 'darwin' else peak * 1024
+        memory['source'] = 'getrusage'
+    return memory
@@ -0,0 +1,52 @@
+import os
+import hashlib
+import logging
+
+from flask import request
+
+from . import serialization
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# Seconds browsers may reuse a data/insight payload without asking. The default
+# of 0 sends "no-cache": every load revalidates, and an unchanged payload costs
+# a 304 with an empty body instead of the full JSON.
+CACHE_MAX_AGE = int(os.environ.get('API_CACHE_MAX_AGE', '0'))
+
+
+def files_modified_at(paths):
+    """Newest modification time of the files a payload is built from, or None if there are none.
+
+    Every worker sees the same mtimes, so they all send the same Last-Modified
+    for the same data, unlike the time each worker happened to load it.
+    """
+    stamps = [os.path.getmtime(path) for path in paths or [] if path and os.path.exists(path)]
+    return max(stamps) if stamps else None
+
+
+def payload_etag(body):
+    """Strong ETag for serialized payload bytes.
+
+    Payloads are serialized with sorted keys once per data or model version, so
+    every worker derives the same tag for the same version.
+    """
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def conditional_response(body, last_modified=None):
+    """Response for cached payload bytes with ETag, Last-Modified and Cache-Control.
+
+    Answers 304 Not Modified when the request's If-None-Match (or, without one,
+    If-Modified-Since) shows the client already holds this version.
+    """
+    response = serialization.payload_response(body)
+    response.set_etag(payload_etag(body))
+    if last_modified is not None:
+        response.last_modified = last_modified
+    if CACHE_MAX_AGE > 0:
+        response.cache_control.max_age = CACHE_MAX_AGE
+        response.cache_control.must_revalidate = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
@@ -0,0 +1,145 @@
+import time
+import numpy as np
+import pandas as pd
+import logging
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+
+def scaler_parameters(scaler):
+    """Return (mean, scale) arrays equivalent to StandardScaler.transform"""
+    n_features = scaler.n_features_in_
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+    return np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64)
+
+
+class SklearnEngine:
+    """Fallback engine: scaler.transform followed by a single predict_proba call"""
+
+    kind = 'sklearn'
+
+    def __init__(self, model, scaler):
+        self.model = model
+        self.scaler = scaler
+        self.classes = np.asarray(model.classes_)
+        self.feature_names = getattr(scaler, 'feature_names_in_', None)
+
+    def predict(self, features):
+        """Return (labels, positive-class probabilities) for an encoded matrix"""
+        # Scalers fitted on a DataFrame warn when given a bare array, so label the columns
+        if isinstance(features, np.ndarray) and self.feature_names is not None:
+            features = pd.DataFrame(features, columns=self.feature_names)
+        proba = self.model.predict_proba(self.scaler.transform(features))
+        # predict() is argmax over predict_proba for the supported classifiers,
+        # so derive the label here instead of running the model a second time
+        return self.classes[np.argmax(proba, axis=1)], proba[:, 1]
+
+
+class LinearEngine:
+    """Binary logistic regression with the StandardScaler folded into the weights.
+
+    ``((x - mean) / scale) @ coef + b`` is rewritten once at load time as
+    ``x @ (coef / scale) + (b - sum(coef * mean / scale))`` so a request is a
+    single matrix-vector product and a sigmoid on the raw encoded features.
+    """
+
+    kind = 'linear'
+
+    def __init__(self, model, scaler):
+        from scipy.special import expit
+        self.expit = expit
+        mean, scale = scaler_parameters(scaler)
+        coef = np.asarray(model.coef_[0], dtype=np.float64)
+        self.weights = coef / scale
+        self.intercept = float(model.intercept_[0]) - float(np.dot(coef, mean / scale))
+        self.classes = np.asarray(model.classes_)
+
+    def predict(self, features):
+        """Return (labels, positive-class probabilities) for an encoded matrix"""
+        decision = np.asarray(features, dtype=np.float64) @ self.weights + self.intercept
+        # LogisticRegression.predict() thresholds the decision at 0, i.e. p > 0.5
+        return self.classes[(decision > 0).astype(np.intp)], self.expit(decision)
+
+
+class FlatTreeEngine:
+    """Tree classifier or forest scored by api.forest.FlatForest instead of predict_proba.
+
+    The trees are flattened once at load time into contiguous node arrays
+    (memory-mapped artifacts are used as they are). A request scales its rows
+    with the scaler's mean and scale, exactly as StandardScaler.transform
+    does, and walks all trees in one call: a compiled loop with numba, else
+    one NumPy step per tree level. Results equal scaler.transform followed by
+    predict_proba bit for bit, without scikit-learn's per-call overhead.
+    Without numba, batches above NUMPY_MAX_ROWS go to the model's own
+    predict_proba, which is faster there and returns the same values.
+    """
+
+    kind = 'flat_trees'
+
+    def __init__(self, model, scaler):
+        from .forest import FlatForest, NUMPY_MAX_ROWS
+        self.mean, self.scale = scaler_parameters(scaler)
+        self.forest = model if isinstance(model, FlatForest) else FlatForest.from_model(model)
+        # Memory-mapped forests have no scikit-learn model to fall back to
+        self.model = None if isinstance(model, FlatForest) else model
+        self.feature_names = getattr(model, 'feature_names_in_', None)
+        self.numpy_max_rows = NUMPY_MAX_ROWS
+        self.classes = np.asarray(model.classes_)
+
+    def predict(self, features):
+        """Return (labels, positive-class probabilities) for an encoded matrix"""
+        scaled = (np.asarray(features, dtype=np.float64) - self.mean) / self.scale
+        if self.model is not None and self.forest.backend == 'numpy' and len(scaled) > self.numpy_max_rows:
+            if self.feature_names is not None:
+                scaled = pd.DataFrame(scaled, columns=self.feature_names)
+            proba = self.model.predict_proba(scaled)
+        else:
+            proba = self.forest.predict_proba(scaled)
+        return self.classes[np.argmax(proba, axis=1)], proba[:, 1]
+
+    def warm(self):
+        """Compile the numba kernel up front (a no-op on the NumPy path)"""
+        began = time.perf_counter()
+        self.forest.warm()
+        if self.forest.backend == 'numba':
+            logger.info(f"Inference engine: numba forest kernel ready in {time.perf_counter() - began:.2f}s")
+
+
+def build_engine(model, scaler):
+    """Pick the fastest engine that reproduces scaler + model for this pair"""
+    if model is None or scaler is None:
+        return None
+    # Imported here so importing the API does not load scikit-learn up front;
+    # unpickling the model has already imported these modules
+    from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression, SGDClassifier
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.tree import DecisionTreeClassifier
+    from .forest import FlatForest
+
+    fusable_scaler = isinstance(scaler, StandardScaler)
+    binary = len(getattr(model, 'classes_', [])) == 2
+    try:
+        if fusable_scaler and binary and isinstance(model, LogisticRegression) and model.coef_.shape[0] == 1:
+            multinomial = getattr(model, 'multi_class', 'auto') == 'multinomial' and model.solver != 'liblinear'
+            if not multinomial:
+                engine = LinearEngine(model, scaler)
+                logger.info("Inference engine: scaler folded into logistic regression weights")
+                return engine
+        # The online learner's model: logistic regression trained by SGD, same probabilities
+        if fusable_scaler and binary and isinstance(model, SGDClassifier) and model.loss == 'log_loss':
+            engine = LinearEngine(model, scaler)
+            logger.info("Inference engine: scaler folded into SGD logistic regression weights")
+            return engine
+        if fusable_scaler and binary and isinstance(model, (RandomForestClassifier, ExtraTreesClassifier,
+                                                             DecisionTreeClassifier, FlatForest)):
+            engine = FlatTreeEngine(model, scaler)
+            logger.info(f"Inference engine: flattened trees ({engine.forest.backend})")
+            return engine
+    except Exception as fuse_error:
+        logger.warning(f"Could not fuse scaler into model, using sklearn path: {str(fuse_error)}")
+
+    logger.info(f"Inference engine: sklearn path for {type(model).__name__}")
+    return SklearnEngine(model, scaler)
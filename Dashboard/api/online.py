@@ -0,0 +1,326 @@
+"""
+Online updates of the purchase model from newly labelled records.
+
+    python -m api.online            # from the Dashboard folder; runs until stopped
+    python -m api.online --once     # fold in the waiting records, publish, exit
+
+Records posted to /api/records land in the shared append log. The learner
+reads the new ones in mini-batches and updates a running StandardScaler and
+an SGDClassifier with log loss (logistic regression trained by stochastic
+gradient descent) with partial_fit. It then publishes model, scaler and
+columns to the model registry as a new version, which every serving worker
+swaps in on its next registry poll: no full retrain and no restart.
+
+The learner starts from the serving model when that is a logistic
+regression, whose weights carry over unchanged. A version published by
+someone else (e.g. python -m api.train --publish) replaces its weights the
+same way. When the served model is not linear (a forest, say) the learner
+pauses and leaves the records unread rather than replace it with a logistic
+regression; --refit-nonlinear opts in to that, starting from a logistic
+regression fitted to the cleaned dataset.
+
+Its state, including how far into the append log it has read, is written
+into each version it publishes (and kept in Models/.online), so a restarted
+learner neither skips nor repeats records, even if it stopped between
+publishing and saving. Run one learner per registry, next to the web workers.
+"""
+
+import os
+import copy
+import time
+import pickle
+import argparse
+import threading
+import traceback
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .encoding import FeatureEncoder
+from .inference import scaler_parameters
+from .records import AppendLog, DEFAULT_APPEND_LOG
+from .registry import ARTIFACT_FILES, DEFAULT_REGISTRY_ROOT, ModelRegistry, load_bundle, load_version_dir
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_MODEL_FILES = [os.path.join(BASE_DIR, 'Models', name) for name in ARTIFACT_FILES]
+DEFAULT_STATE_PATH = os.environ.get('ONLINE_STATE_PATH', os.path.join(BASE_DIR, 'Models', '.online', 'state.pkl'))
+
+# Rows per partial_fit call, and seconds between checks of the append log
+ONLINE_BATCH_SIZE = int(os.environ.get('ONLINE_BATCH_SIZE', 64))
+ONLINE_INTERVAL = float(os.environ.get('ONLINE_INTERVAL', 30))
+
+# A constant step keeps later records as influential as earlier ones; the
+# 'optimal' schedule would start with steps large enough to undo a warm start
+ONLINE_LEARNING_RATE = float(os.environ.get('ONLINE_LEARNING_RATE', 0.01))
+ONLINE_ALPHA = 1e-4
+
+# Published versions are named online-<time>-<update>; older ones beyond this many are deleted
+VERSION_PREFIX = 'online-'
+KEEP_VERSIONS = 3
+
+# Learner state written into every published version, next to the model files
+STATE_FILE = 'online_state.pkl'
+
+CLASSES = np.array([0, 1])
+
+
+def make_classifier(seed=0):
+    from sklearn.linear_model import SGDClassifier
+    return SGDClassifier(loss='log_loss', alpha=ONLINE_ALPHA, learning_rate='constant',
+                         eta0=ONLINE_LEARNING_RATE, random_state=seed)
+
+
+def linear_start(model, scaler, model_columns):
+    """SGD classifier and scaler predicting exactly what a fitted binary logistic regression does"""
+    classifier = make_classifier()
+    classifier.classes_ = np.asarray(model.classes_).copy()
+    classifier.n_features_in_ = model.coef_.shape[1]
+    classifier.coef_ = np.array(model.coef_, dtype=np.float64)
+    classifier.intercept_ = np.array(model.intercept_, dtype=np.float64)
+    return classifier, copy.deepcopy(scaler), model_columns
+
+
+def fitted_start(model_columns, data_path):
+    """Fit a logistic regression to the cleaned dataset, for serving models that are not linear"""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+    from .train import clean_stage
+    df = clean_stage([data_path])
+    features = pd.DataFrame(FeatureEncoder(model_columns).encode_frame(df), columns=list(model_columns))
+    scaler = StandardScaler().fit(features)
+    model = LogisticRegression(max_iter=1000).fit(scaler.transform(features), df['will_purchase'].to_numpy())
+    logger.info(f"Online learner: fitted a logistic regression start on {len(df)} rows of {data_path}")
+    return linear_start(model, scaler, model_columns)
+
+
+class OnlineLearner:
+    """Incremental logistic regression fed from the append log and published to the registry"""
+
+    def __init__(self, registry_root=DEFAULT_REGISTRY_ROOT, records_path=DEFAULT_APPEND_LOG,
+                 state_path=DEFAULT_STATE_PATH, model_files=None, data_path=None, batch_size=ONLINE_BATCH_SIZE,
+                 refit_nonlinear=False):
+        from .train import DEFAULT_DATA
+        self.registry = ModelRegistry(registry_root)
+        self.records_log = AppendLog(records_path)
+        self.state_path = state_path
+        self.model_files = list(model_files or DEFAULT_MODEL_FILES)
+        self.data_path = data_path or DEFAULT_DATA
+        self.batch_size = batch_size
+        self.refit_nonlinear = refit_nonlinear
+        # model stays None while the served model is not linear and refit_nonlinear is off
+        self.model = self.scaler = self.model_columns = self.encoder = None
+        # Version the weights descend from (ours or the one we seeded from)
+        self.version = None
+        self.records = 0
+        self.updates = 0
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+        if not self._resume():
+            self._seed(*self._serving())
+
+    @property
+    def paused(self):
+        return self.model is None
+
+    def _serving(self):
+        """(model, scaler, model_columns, version) currently served: the registry's, else Models/"""
+        version = self.registry.published_version()
+        if version:
+            bundle = load_version_dir(os.path.join(self.registry.root, version), version)
+        else:
+            bundle = load_bundle(self.model_files, 'files')
+        return bundle.model, bundle.scaler, bundle.model_columns, version
+
+    def _seed(self, model, scaler, model_columns, version):
+        from sklearn.linear_model import LogisticRegression, SGDClassifier
+        if isinstance(model, (LogisticRegression, SGDClassifier)) and len(model.classes_) == 2:
+            self.model, self.scaler, self.model_columns = linear_start(model, scaler, model_columns)
+            logger.info(f"Online learner: starting from the weights of version {version or 'Models/'}")
+        elif self.refit_nonlinear:
+            self.model, self.scaler, self.model_columns = fitted_start(model_columns, self.data_path)
+        else:
+            self.model = self.scaler = self.model_columns = self.encoder = None
+            self.version = version
+            logger.warning(f"Online learner: version {version or 'Models/'} serves a {type(model).__name__}, "
+                           f"not a logistic regression; pausing updates until a linear model is published "
+                           f"(pass --refit-nonlinear to replace it)")
+            return
+        self.encoder = FeatureEncoder(self.model_columns)
+        self.version = version
+
+    def _resume(self, path=None):
+        """Restore the saved state (by default from state_path); False when there is none or it cannot be read"""
+        path = path or self.state_path
+        if not os.path.exists(path):
+            return False
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except Exception as state_error:
+            logger.warning(f"Online learner: ignoring unreadable state {path}: {str(state_error)}")
+            return False
+        self.model, self.scaler, self.model_columns = state['model'], state['scaler'], state['model_columns']
+        self.encoder = FeatureEncoder(self.model_columns)
+        self.version = state['version']
+        self.records = state['records']
+        self.updates = state['updates']
+        self.records_log.offset = state['offset']
+        logger.info(f"Online learner: resumed at version {self.version}, {self.records} records learned")
+        return True
+
+    def _save(self, path=None):
+        path = path or self.state_path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        state = {'model': self.model, 'scaler': self.scaler, 'model_columns': self.model_columns,
+                 'version': self.version, 'records': self.records, 'updates': self.updates,
+                 'offset': self.records_log.offset}
+        tmp_path = f'{path}.tmp{os.getpid()}'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def update_scaler(self, features):
+        """partial_fit the scaler, re-expressing the weights so predictions do not move.
+
+        With w' = w * scale' / scale and b' = b + sum(w * (mean' - mean) / scale),
+        w' . (x - mean') / scale' + b' equals w . (x - mean) / scale + b for every x.
+        """
+        mean, scale = scaler_parameters(self.scaler)
+        self.scaler.partial_fit(pd.DataFrame(features, columns=list(self.model_columns)))
+        new_mean, new_scale = scaler_parameters(self.scaler)
+        coef = self.model.coef_[0]
+        self.model.intercept_ = self.model.intercept_ + np.dot(coef, (new_mean - mean) / scale)
+        self.model.coef_ = self.model.coef_ * (new_scale / scale)
+
+    def scale(self, features):
+        mean, scale = scaler_parameters(self.scaler)
+        return (features - mean) / scale
+
+    def learn(self, frame):
+        """Update scaler and weights from labelled records, one mini-batch at a time"""
+        features = self.encoder.encode_frame(frame)
+        labels = frame['will_purchase'].to_numpy(dtype=np.int64)
+        for start in range(0, len(frame), self.batch_size):
+            batch = features[start:start + self.batch_size]
+            self.update_scaler(batch)
+            self.model.partial_fit(self.scale(batch), labels[start:start + self.batch_size], classes=CLASSES)
+        self.records += len(frame)
+        return len(frame)
+
+    def publish(self):
+        """Write model, scaler, columns and learner state as a new registry version and make it current.
+
+        The state (with the append log offset) lands in the registry together
+        with the weights that include those records, so the two cannot disagree.
+        """
+        from .train import write_artifacts
+        self.updates += 1
+        version = f"{VERSION_PREFIX}{time.strftime('%Y%m%d-%H%M%S')}-{self.updates}"
+        staging_dir = os.path.join(os.path.dirname(os.path.abspath(self.state_path)), 'export')
+        paths = write_artifacts(self.model, self.scaler, self.model_columns, staging_dir)
+        previous, self.version = self.version, version
+        state_path = os.path.join(staging_dir, STATE_FILE)
+        self._save(state_path)
+        try:
+            self.registry.publish(version, paths, extra_files={STATE_FILE: state_path})
+        except Exception:
+            self.version = previous
+            raise
+        self.prune()
+        return version
+
+    def prune(self):
+        """Delete all but the newest KEEP_VERSIONS online versions (never the current one)"""
+        import shutil
+        current = self.registry.published_version()
+        # online-<time>-<update>: by time, then by update number within the same second
+        versions = sorted((name.rsplit('-', 1) for name in os.listdir(self.registry.root)
+                           if name.startswith(VERSION_PREFIX) and name.rsplit('-', 1)[1].isdigit()),
+                          key=lambda parts: (parts[0], int(parts[1])))
+        versions = ['-'.join(parts) for parts in versions]
+        for name in versions[:-KEEP_VERSIONS]:
+            if name != current:
+                shutil.rmtree(os.path.join(self.registry.root, name), ignore_errors=True)
+
+    def step(self):
+        """Learn from records appended since the last step; returns the new version, or None"""
+        published = self.registry.published_version()
+        if published and published != self.version:
+            if self._resume(os.path.join(self.registry.root, published, STATE_FILE)):
+                # Published by a learner (this one, before a restart) that had not saved its state yet
+                self._save()
+            else:
+                # Someone published a retrained model: continue from its weights
+                logger.info(f"Online learner: version {published} was published elsewhere; reseeding from it")
+                self._seed(*self._serving())
+        if self.paused:
+            return None
+        frame = self.records_log.read_new()
+        if frame is None or len(frame) == 0:
+            return None
+        began = time.perf_counter()
+        learned = self.learn(frame)
+        version = self.publish()
+        self._save()
+        logger.info(f"Online learner: learned {learned} records in {time.perf_counter() - began:.2f}s "
+                    f"({self.records} in total); published version {version}")
+        return version
+
+    def run(self, interval=ONLINE_INTERVAL):
+        """Step every interval seconds until stop() (errors are logged and retried)"""
+        while not self._stop.is_set():
+            try:
+                self.step()
+                self.last_error = None
+            except Exception as step_error:
+                self.last_error = str(step_error)
+                logger.error(f"Online learner update failed: {str(step_error)}")
+                logger.error(traceback.format_exc())
+            self._stop.wait(interval)
+
+    def start(self, interval=ONLINE_INTERVAL):
+        """Run on a daemon thread (for a single-process deployment)"""
+        self._thread = threading.Thread(target=self.run, args=(interval,), name='online-learner', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def status(self):
+        return {'version': self.version, 'paused': self.paused, 'records': self.records, 'updates': self.updates,
+                'offset': self.records_log.offset, 'last_error': self.last_error}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Update the served model from newly appended records')
+    parser.add_argument('--once', action='store_true', help='learn from the waiting records and exit')
+    parser.add_argument('--interval', type=float, default=ONLINE_INTERVAL, help='seconds between checks')
+    parser.add_argument('--batch-size', type=int, default=ONLINE_BATCH_SIZE, help='rows per partial_fit call')
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY_ROOT, help='model registry folder')
+    parser.add_argument('--records', default=DEFAULT_APPEND_LOG, help='append log written by /api/records')
+    parser.add_argument('--state', default=DEFAULT_STATE_PATH, help='learner state file')
+    parser.add_argument('--refit-nonlinear', action='store_true',
+                        help='replace a served non-linear model with an online logistic regression')
+    args = parser.parse_args(argv)
+    learner = OnlineLearner(args.registry, args.records, args.state, batch_size=args.batch_size,
+                            refit_nonlinear=args.refit_nonlinear)
+    if args.once:
+        learner.step()
+        return
+    try:
+        learner.run(args.interval)
+    except KeyboardInterrupt:
+        logger.info(f"Online learner stopped: {learner.status()}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
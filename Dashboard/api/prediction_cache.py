@@ -0,0 +1,149 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+import logging
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# Entries kept (0 disables the cache) and optional time-to-live in seconds
+DEFAULT_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 4096))
+DEFAULT_CACHE_TTL = float(os.environ.get('PREDICTION_CACHE_TTL', 0)) or None
+
+# Requests with more rows than this skip the cache; scoring them in one call is
+# cheaper than a lookup per row
+MAX_CACHED_ROWS = 64
+
+# Minimum seconds between checks of the model files on disk
+FILE_CHECK_INTERVAL = 2.0
+
+
+def file_stamps(paths):
+    """Return a (path, size, mtime_ns) tuple per existing file"""
+    stamps = []
+    for path in paths or []:
+        try:
+            info = os.stat(path)
+            stamps.append((os.path.abspath(path), info.st_size, info.st_mtime_ns))
+        except (OSError, TypeError):
+            stamps.append((path, None, None))
+    return tuple(stamps)
+
+
+class PredictionCache:
+    """Bounded LRU (with optional TTL) of (label, probability) per encoded row.
+
+    Keys are the bytes of the encoded float64 feature vector, so any two
+    requests that normalize to the same model input share an entry however
+    their JSON was spelled. The cache is cleared when the watched model files
+    change on disk.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL, model_files=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.watch(model_files)
+
+    def watch(self, model_files):
+        """Invalidate the cache whenever any of these files changes"""
+        self.model_files = list(model_files or [])
+        self._stamps = file_stamps(self.model_files)
+        self._checked = time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def _check_files(self):
+        now = time.monotonic()
+        if not self.model_files or now - self._checked < FILE_CHECK_INTERVAL:
+            return
+        self._checked = now
+        stamps = file_stamps(self.model_files)
+        if stamps != self._stamps:
+            self._stamps = stamps
+            logger.info("Model files changed on disk; clearing the prediction cache")
+            self.clear()
+
+    def lookup(self, keys):
+        """Return a list with the cached (label, probability) or None per key"""
+        self._check_files()
+        now = time.monotonic()
+        results = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and (self.ttl is None or now - entry[2] < self.ttl):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results.append(entry[:2])
+                else:
+                    if entry is not None:
+                        del self._entries[key]
+                    self.misses += 1
+                    results.append(None)
+        return results
+
+    def store(self, keys, labels, probabilities):
+        now = time.monotonic()
+        with self._lock:
+            for key, label, probability in zip(keys, labels, probabilities):
+                self._entries[key] = (label, probability, now)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """Counters for /api/status"""
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.maxsize > 0,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
+
+
+class CachedEngine:
+    """Inference engine wrapper that answers repeated rows from a PredictionCache"""
+
+    def __init__(self, engine, cache):
+        self.engine = engine
+        self.cache = cache
+        self.kind = engine.kind
+        self.classes = engine.classes
+        self.shards_calls = getattr(engine, 'shards_calls', False)
+
+    def predict(self, features):
+        """Return (labels, positive-class probabilities), scoring only uncached rows"""
+        features = np.asarray(features, dtype=np.float64)
+        if self.cache.maxsize <= 0 or len(features) > MAX_CACHED_ROWS:
+            return self.engine.predict(features)
+
+        keys = [row.tobytes() for row in features]
+        cached = self.cache.lookup(keys)
+        missing = [i for i, entry in enumerate(cached) if entry is None]
+        if missing:
+            labels, probabilities = self.engine.predict(features[missing])
+            self.cache.store([keys[i] for i in missing], labels.tolist(), probabilities.tolist())
+            for i, label, probability in zip(missing, labels.tolist(), probabilities.tolist()):
+                cached[i] = (label, probability)
+
+        labels = np.array([entry[0] for entry in cached], dtype=self.classes.dtype)
+        probabilities = np.array([entry[1] for entry in cached], dtype=np.float64)
+        return labels, probabilities
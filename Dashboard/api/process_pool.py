@@ -0,0 +1,194 @@
+import os
+import time
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+import logging
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# 'local' scores in the request thread; 'process' sends large calls to a worker pool
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'local')
+DEFAULT_POOL_WORKERS = int(os.environ.get('INFERENCE_POOL_WORKERS', 0)) or os.cpu_count() or 1
+
+# Calls with fewer rows than this stay in-process. 'auto' times the engine on
+# CALIBRATION_ROWS rows and uses the crossover point of crossover_rows()
+DEFAULT_MIN_ROWS = os.environ.get('INFERENCE_POOL_MIN_ROWS', 'auto')
+DEFAULT_MIN_ROWS = DEFAULT_MIN_ROWS if DEFAULT_MIN_ROWS == 'auto' else int(DEFAULT_MIN_ROWS)
+CALIBRATION_ROWS = 2000
+
+# Cost of a pooled call beyond the scoring itself, from
+# benchmarks/bench_process_pool.py: a fixed part for the shared memory blocks
+# and task round trips, and a per-row part for copying rows in and out
+POOL_CALL_SECONDS = 0.0006
+POOL_ROW_SECONDS = 2e-7
+
+# Workers are started by a clean forkserver (or spawned) rather than forked
+# from the server process, whose reloader and batcher threads may hold locks
+POOL_START_METHOD = os.environ.get(
+    'INFERENCE_POOL_START_METHOD',
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+# Set in each pool worker by _init_worker
+_worker_engine = None
+
+
+def crossover_rows(engine, scaler, workers):
+    """Fewest rows for which sharding a call over workers beats scoring it in-process, or None if none do"""
+    rng = np.random.default_rng(0)
+    features = rng.normal(scaler.mean_, scaler.scale_, size=(CALIBRATION_ROWS, scaler.n_features_in_))
+    engine.predict(features[:10])
+    began = time.perf_counter()
+    engine.predict(features)
+    row_seconds = (time.perf_counter() - began) / CALIBRATION_ROWS
+    # In-process: rows * row_seconds. Pooled: POOL_CALL_SECONDS + rows * (POOL_ROW_SECONDS + row_seconds / workers)
+    saved_per_row = row_seconds * (1 - 1 / workers) - POOL_ROW_SECONDS
+    if saved_per_row <= 0:
+        return None
+    return int(POOL_CALL_SECONDS / saved_per_row) + 1
+
+
+def _init_worker(model, scaler):
+    """Build the engine once per pool process so tasks carry only row ranges"""
+    global _worker_engine
+    from .inference import build_engine
+    _worker_engine = build_engine(model, scaler)
+    if _worker_engine is not None and _worker_engine.kind == 'flat_trees':
+        _worker_engine.warm()
+
+
+def _ping():
+    return os.getpid()
+
+
+def _score_shard(input_name, output_name, shape, label_dtype, start, end):
+    """Score rows [start, end) of the shared input and write into the shared output"""
+    # The parent created both blocks and unlinks them when the call returns
+    source = shared_memory.SharedMemory(name=input_name)
+    target = shared_memory.SharedMemory(name=output_name)
+    try:
+        features = np.ndarray(shape, dtype=np.float64, buffer=source.buf)
+        probabilities = np.ndarray(shape[0], dtype=np.float64, buffer=target.buf)
+        labels = np.ndarray(shape[0], dtype=label_dtype, buffer=target.buf, offset=shape[0] * 8)
+        labels[start:end], probabilities[start:end] = _worker_engine.predict(features[start:end])
+        # Drop the views before closing, or close() fails with exported buffers
+        del features, probabilities, labels
+    finally:
+        source.close()
+        target.close()
+    return end - start
+
+
+class ProcessPoolEngine:
+    """Engine wrapper that shards large calls across a warm process pool.
+
+    Each worker builds the same engine from the model and scaler when it
+    starts. A large call copies the encoded matrix into a shared memory block
+    once; workers read their row range from it and write labels and
+    probabilities into a second block, so only names and offsets are pickled.
+    Calls below ``min_rows`` (single predictions) stay in the calling thread;
+    with ``min_rows='auto'`` that is the measured crossover point, and an
+    engine the pool can't speed up (a linear model) never starts it.
+    """
+
+    def __init__(self, engine, model, scaler, workers=DEFAULT_POOL_WORKERS, min_rows=DEFAULT_MIN_ROWS):
+        self.engine = engine
+        self.model = model
+        self.scaler = scaler
+        self.kind = engine.kind
+        self.classes = engine.classes
+        self.workers = max(1, workers)
+        if min_rows == 'auto':
+            min_rows = crossover_rows(engine, scaler, self.workers)
+            logger.info(f"Inference pool threshold for the {self.kind} engine: "
+                        f"{min_rows if min_rows is not None else 'never'} rows")
+        self.min_rows = min_rows
+        # Batch endpoints hand this engine a whole job; it shards it over the workers itself
+        self.shards_calls = min_rows is not None
+        self.pooled_calls = 0
+        self.local_calls = 0
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _pool(self):
+        # Pools do not survive a fork, so each (preforked) server process starts its own
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    # Workers must inherit the parent's tracker rather than start their own,
+                    # which would report every block they attached to as leaked
+                    resource_tracker.ensure_running()
+                    self._executor = ProcessPoolExecutor(
+                        self.workers, mp_context=multiprocessing.get_context(POOL_START_METHOD),
+                        initializer=_init_worker, initargs=(self.model, self.scaler))
+                    self._pid = os.getpid()
+                    logger.info(f"Started {self.workers} inference worker processes for the {self.kind} engine")
+        return self._executor
+
+    def warm(self):
+        """Start the worker processes now instead of on the first large call"""
+        pool = self._pool()
+        for future in [pool.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+
+    def predict(self, features):
+        """Return (labels, positive-class probabilities), using the pool for large inputs"""
+        features = np.asarray(features, dtype=np.float64)
+        if (self._closed or self.min_rows is None or len(features) < self.min_rows
+                or self.classes.dtype.kind not in 'biuf'):
+            self.local_calls += 1
+            return self.engine.predict(features)
+        try:
+            return self._predict_pooled(features)
+        except RuntimeError as pool_error:
+            # The pool was shut down by a model swap mid-request, or a worker died
+            logger.warning(f"Inference pool unavailable, scoring in-process: {str(pool_error)}")
+            self.local_calls += 1
+            return self.engine.predict(features)
+
+    def _predict_pooled(self, features):
+        rows = len(features)
+        features = np.ascontiguousarray(features)
+        label_dtype = self.classes.dtype
+        source = shared_memory.SharedMemory(create=True, size=max(1, features.nbytes))
+        target = shared_memory.SharedMemory(create=True, size=rows * (8 + label_dtype.itemsize))
+        try:
+            np.ndarray(features.shape, dtype=np.float64, buffer=source.buf)[:] = features
+            shard = -(-rows // self.workers)
+            futures = [
+                self._pool().submit(_score_shard, source.name, target.name, features.shape, label_dtype,
+                                    start, min(start + shard, rows))
+                for start in range(0, rows, shard)
+            ]
+            for future in futures:
+                future.result()
+            probabilities = np.ndarray(rows, dtype=np.float64, buffer=target.buf).copy()
+            labels = np.ndarray(rows, dtype=label_dtype, buffer=target.buf, offset=rows * 8).copy()
+            self.pooled_calls += 1
+            return labels, probabilities
+        finally:
+            source.close()
+            source.unlink()
+            target.close()
+            target.unlink()
+
+    def close(self, wait=False):
+        """Stop the workers (in-flight calls finish; later ones score in-process)"""
+        self._closed = True
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=wait)
+
+    def stats(self):
+        return {
+            'backend': 'process',
+            'workers': self.workers,
+            'min_rows': self.min_rows,
+            'pooled_calls': self.pooled_calls,
+            'local_calls': self.local_calls
+        }
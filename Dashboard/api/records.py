@@ -0,0 +1,157 @@
+import io
+import os
+import hmac
+import threading
+import pandas as pd
+import logging
+
+from .batch import REQUIRED_FIELDS, validate_records
+from .encoding import to_number
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# Columns of a labelled customer record, in the order used by the cleaned dataset
+RECORD_COLUMNS = REQUIRED_FIELDS + ['will_purchase']
+
+# (fill value, dtype) per numeric column; same cleaning rules as the dataset loader
+CLEANING_RULES = {
+    'age': (30, int),
+    'income': (50000, int),
+    'time_on_website': (15, float),
+    'previous_purchases': (1, int),
+    'marketing_engaged': (0, int),
+    'search_frequency': (5, int),
+    'device_age': (2, float),
+    'will_purchase': (0, int)
+}
+
+# Text answers accepted for marketing_engaged
+YES_NO = {'Yes': 1, 'No': 0, 'yes': 1, 'no': 0}
+
+# Where appended records are persisted so every worker (and the next restart) sees them
+DEFAULT_APPEND_LOG = os.environ.get(
+    'APPENDED_RECORDS_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 'Data', 'smartphone_purchased_data_appended.csv')
+)
+
+# Shared secret for POST /api/records, sent in RECORDS_TOKEN_HEADER. Ingested rows
+# change the served statistics and feed the online learner, so ingestion is off
+# (403) until a token is configured
+RECORDS_API_TOKEN = os.environ.get('RECORDS_API_TOKEN', '')
+RECORDS_TOKEN_HEADER = 'X-Records-Token'
+
+
+def ingestion_allowed(headers):
+    """True when a records token is configured and the request carries it"""
+    if not RECORDS_API_TOKEN:
+        return False
+    supplied = headers.get(RECORDS_TOKEN_HEADER, '')
+    return hmac.compare_digest(supplied.encode('utf-8'), RECORDS_API_TOKEN.encode('utf-8'))
+
+
+def clean_records(records):
+    """Validate labelled records and return (cleaned DataFrame, per-row errors list)"""
+    valid, errors = validate_records(records, RECORD_COLUMNS)
+    rows = []
+    for index, record in valid:
+        label = to_number(record['will_purchase'], float('nan'))
+        if label not in (0.0, 1.0):
+            errors[index] = {
+                'index': index,
+                'error': 'Invalid label',
+                'message': 'will_purchase must be 0 or 1'
+            }
+            continue
+        rows.append(record)
+
+    frame = pd.DataFrame.from_records(rows, columns=RECORD_COLUMNS)
+    if frame['marketing_engaged'].dtype == object:
+        frame['marketing_engaged'] = frame['marketing_engaged'].map(
+            lambda value: YES_NO.get(value, value) if isinstance(value, str) else value)
+    for column, (default, dtype) in CLEANING_RULES.items():
+        frame[column] = pd.to_numeric(frame[column], errors='coerce').fillna(default).astype(dtype)
+    frame['brand'] = frame['brand'].astype(str)
+    return frame, [errors[index] for index in sorted(errors)]
+
+
+class AppendLog:
+    """Append-only CSV of ingested records, read incrementally by byte offset.
+
+    Each process remembers how far into the file it has read, so picking up
+    records written by another gunicorn worker costs an ``os.stat`` when
+    nothing changed and a read of only the new bytes when something did.
+    """
+
+    def __init__(self, path=DEFAULT_APPEND_LOG):
+        self.path = path
+        self.offset = 0
+        # mtime of the log when the rows last returned by read_new() were read
+        self.modified_at = None
+        self._lock = threading.Lock()
+
+    def write(self, frame):
+        """Append cleaned records to the log in a single write"""
+        body = frame.to_csv(index=False, header=False, columns=RECORD_COLUMNS, lineterminator='\n')
+        header = ','.join(RECORD_COLUMNS) + '\n'
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        try:
+            # Only the process that creates the file writes the header
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+            body = header + body
+        except FileExistsError:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        try:
+            os.write(fd, body.encode('utf-8'))
+        finally:
+            os.close(fd)
+
+    def read_new(self):
+        """Return a DataFrame of complete rows added since the last call (or None)"""
+        with self._lock:
+            try:
+                info = os.stat(self.path)
+            except FileNotFoundError:
+                return None
+            size = info.st_size
+            if size < self.offset:
+                logger.warning(f"Append log {self.path} shrank; only new records will be read from now on")
+                self.offset = size
+                return None
+            if size == self.offset:
+                return None
+
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                chunk = f.read(size - self.offset)
+            # A writer may be mid-line; leave any partial row for the next call
+            end = chunk.rfind(b'\n') + 1
+            if end == 0:
+                return None
+
+            # The first read starts at the header line, which names= replaces. The
+            # offset only moves once the rows are parsed, so a failed read is retried
+            lines = chunk[:end].splitlines()
+            header = 1 if self.offset == 0 else 0
+            frame = pd.read_csv(io.BytesIO(chunk[:end]), header=0 if header else None,
+                                names=RECORD_COLUMNS, on_bad_lines='skip')
+            self.offset += end
+            self.modified_at = info.st_mtime
+
+        dropped = sum(1 for line in lines[header:] if line.strip()) - len(frame)
+        if dropped:
+            logger.warning(f"Append log {self.path}: skipped {dropped} malformed rows")
+        return frame
+
+    def sync(self, aggregate_cache):
+        """Fold any records written since the last sync into the aggregate cache"""
+        try:
+            frame = self.read_new()
+        except Exception as read_error:
+            logger.warning(f"Could not read append log {self.path}: {str(read_error)}")
+            return 0
+        if frame is None or len(frame) == 0:
+            return 0
+        aggregate_cache.append(frame, modified_at=self.modified_at)
+        return len(frame)
@@ -0,0 +1,312 @@
+import os
+import sys
+import json
+import time
+import shutil
+import pickle
+import hashlib
+import threading
+import traceback
+import logging
+
+from . import artifacts
+from .encoding import FeatureEncoder
+from .inference import build_engine
+from .prediction_cache import CachedEngine, PredictionCache, file_stamps
+from .process_pool import INFERENCE_BACKEND, ProcessPoolEngine
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# Versioned artifacts live in <root>/<version>/ and <root>/CURRENT names the active one
+DEFAULT_REGISTRY_ROOT = os.environ.get(
+    'MODEL_REGISTRY_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                 'Models', 'registry')
+)
+POINTER_FILE = 'CURRENT'
+ARTIFACT_FILES = ('model.pkl', 'scaler.pkl', 'model_columns.pkl')
+
+# Written by api.train after the plain model files it replaces: the sha256 of
+# each, so a reload between two of its renames sees a set that doesn't match
+ARTIFACT_SET_FILE = 'artifact_set.json'
+
+# Minimum seconds between checks for a new version; each check is a few os.stat calls
+CHECK_INTERVAL = float(os.environ.get('MODEL_RELOAD_INTERVAL', 2.0))
+
+
+def files_version(paths):
+    """Short content hash naming an unversioned set of model files"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return f'files-{digest.hexdigest()[:12]}'
+
+
+class IncompleteArtifactSet(ValueError):
+    """The model files on disk are not all from the same write"""
+
+
+def artifact_set_path(paths):
+    """ARTIFACT_SET_FILE next to a set of model files, or None if they are spread over directories"""
+    folders = {os.path.dirname(os.path.abspath(path)) for path in paths}
+    return os.path.join(folders.pop(), ARTIFACT_SET_FILE) if len(folders) == 1 else None
+
+
+def check_artifact_set(paths, contents):
+    """Raise IncompleteArtifactSet if the files read don't match their ARTIFACT_SET_FILE"""
+    set_path = artifact_set_path(paths)
+    try:
+        with open(set_path) as f:
+            expected = json.load(f)
+    except (TypeError, FileNotFoundError):
+        # Files written before the set file existed, or by hand
+        return
+    for path, data in zip(paths, contents):
+        if expected.get(os.path.basename(path)) != hashlib.sha256(data).hexdigest():
+            raise IncompleteArtifactSet(f"{path} does not match {set_path}; the set is still being replaced")
+
+
+class ModelBundle:
+    """One immutable model version: artifacts plus the request-time helpers built from them.
+
+    Requests take ``registry.active`` once and use only that bundle, so a swap
+    between two lines of a handler can never mix the encoder of one version
+    with the model of another.
+    """
+
+    def __init__(self, model, scaler, model_columns, version, files=None, source='files'):
+        self.model = model
+        self.scaler = scaler
+        self.model_columns = model_columns
+        self.version = version
+        self.files = list(files or [])
+        self.source = source
+        self.feature_encoder = FeatureEncoder(model_columns) if model_columns is not None else None
+        self.prediction_cache = PredictionCache(model_files=self.files)
+        engine = build_engine(model, scaler)
+        # Compile a forest's numba kernel here, on the loading thread, not in the first request
+        if engine is not None and engine.kind == 'flat_trees':
+            engine.warm()
+        # Large scoring calls go to a process pool; the cache only ever sees small ones
+        self.backend = None
+        if engine is not None and INFERENCE_BACKEND == 'process':
+            engine = self.backend = ProcessPoolEngine(engine, model, scaler)
+        self.engine = CachedEngine(engine, self.prediction_cache) if engine is not None else None
+        self.loaded_at = time.time()
+        # Last-Modified for model-derived responses: when the artifacts were written
+        stamps = [os.path.getmtime(path) for path in self.files if os.path.exists(path)]
+        self.modified_at = max(stamps) if stamps else self.loaded_at
+        # Serialized responses that depend only on this version (e.g. feature importance)
+        self.payloads = {}
+
+    @property
+    def ready(self):
+        return self.model is not None and self.scaler is not None and self.model_columns is not None
+
+    def close(self):
+        """Release the inference pool of a bundle that is no longer active"""
+        if self.backend is not None:
+            self.backend.close()
+
+    def describe(self):
+        return {
+            'version': self.version,
+            'source': self.source,
+            'model_type': type(self.model).__name__ if self.model is not None else None,
+            'engine': self.engine.kind if self.engine is not None else None,
+            'backend': self.backend.stats() if self.backend is not None else {'backend': 'local'},
+            'loaded_at': self.loaded_at
+        }
+
+
+def load_bundle(paths, version, source='files'):
+    """Unpickle model, scaler and columns from three paths into a ModelBundle"""
+    contents = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            contents.append(f.read())
+    check_artifact_set(paths, contents)
+    model, scaler, model_columns = [pickle.loads(data) for data in contents]
+    bundle = ModelBundle(model, scaler, model_columns, version, files=paths, source=source)
+    if not bundle.ready:
+        raise ValueError(f"model version {version} is incomplete")
+    return bundle
+
+
+def load_version_dir(path, version, source='registry'):
+    """Load a version directory: memory-mapped artifacts (api.artifacts) if present, else the .pkl files"""
+    if artifacts.is_artifact_dir(path):
+        model, scaler, model_columns = artifacts.load_artifacts(path)
+        bundle = ModelBundle(model, scaler, model_columns, version, files=artifacts.artifact_files(path),
+                             source=source)
+        if not bundle.ready:
+            raise ValueError(f"model version {version} is incomplete")
+        return bundle
+    return load_bundle([os.path.join(path, name) for name in ARTIFACT_FILES], version, source=source)
+
+
+class ModelRegistry:
+    """Holds the active ModelBundle and swaps in new versions without a restart.
+
+    A new version is published by copying its files to ``<root>/<version>/`` and
+    then atomically replacing ``<root>/CURRENT``. Each worker polls the pointer
+    (and, with no registry in use, the plain model files) at most every
+    CHECK_INTERVAL seconds, loads a changed version on a background thread
+    while the old one keeps serving, then swaps the reference.
+    """
+
+    def __init__(self, root=DEFAULT_REGISTRY_ROOT, fallback_files=None):
+        self.root = root
+        self.fallback_files = [path for path in (fallback_files or []) if path]
+        self.active = None
+        self.last_error = None
+        self.reloads = 0
+        self._loading = False
+        self._lock = threading.Lock()
+        self._signature = self._current_signature()
+        self._checked = time.monotonic()
+
+    @property
+    def pointer_path(self):
+        return os.path.join(self.root, POINTER_FILE)
+
+    def published_version(self):
+        """Version named by the CURRENT pointer, or None when nothing is published"""
+        try:
+            with open(self.pointer_path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _current_signature(self):
+        # The set file is renamed in last, so its change triggers the reload of a complete set
+        set_path = artifact_set_path(self.fallback_files) if self.fallback_files else None
+        return file_stamps([self.pointer_path] + self.fallback_files + ([set_path] if set_path else []))
+
+    def _load_target(self):
+        """Load whatever should be active now: the published version, else the plain files"""
+        version = self.published_version()
+        if version:
+            return load_version_dir(os.path.join(self.root, version), version)
+        return load_bundle(self.fallback_files, files_version(self.fallback_files))
+
+    def initialize(self, model, scaler, model_columns):
+        """Activate the published version if there is one, else the already-loaded objects"""
+        if self.published_version():
+            try:
+                self.active = self._load_target()
+                logger.info(f"Serving model version {self.active.version} from {self.root}")
+                return self.active
+            except Exception as load_error:
+                logger.error(f"Could not load published model version: {str(load_error)}")
+                self.last_error = str(load_error)
+        version = files_version(self.fallback_files) if self.fallback_files else 'unversioned'
+        self.active = ModelBundle(model, scaler, model_columns, version, files=self.fallback_files)
+        logger.info(f"Serving model version {version}")
+        return self.active
+
+    def poll(self):
+        """Cheap per-request check; starts a background reload when the artifacts changed"""
+        now = time.monotonic()
+        if now - self._checked < CHECK_INTERVAL:
+            return
+        with self._lock:
+            if self._loading or now - self._checked < CHECK_INTERVAL:
+                return
+            self._checked = now
+            signature = self._current_signature()
+            if signature == self._signature:
+                return
+            self._signature = signature
+            self._loading = True
+        threading.Thread(target=self._reload, name='model-reload', daemon=True).start()
+
+    def _reload(self):
+        try:
+            bundle = self._load_target()
+            if self.active is not None and bundle.version == self.active.version:
+                logger.info(f"Model files touched but version {bundle.version} is unchanged")
+            else:
+                previous_bundle = self.active
+                previous = previous_bundle.version if previous_bundle is not None else None
+                # A single reference assignment: requests see the old or the new bundle
+                self.active = bundle
+                if previous_bundle is not None:
+                    previous_bundle.close()
+                self.reloads += 1
+                self.last_error = None
+                logger.info(f"Model version {previous} replaced by {bundle.version}")
+        except IncompleteArtifactSet as load_error:
+            # Caught between two renames; the set file's own rename triggers the next reload
+            logger.info(f"Model files are still being replaced: {str(load_error)}")
+        except Exception as load_error:
+            # Keep serving the current version; the next change to the files retries
+            self.last_error = str(load_error)
+            logger.error(f"Model reload failed, still serving {self.active.version if self.active else None}: "
+                         f"{str(load_error)}")
+            logger.error(traceback.format_exc())
+        finally:
+            self._loading = False
+
+    def status(self):
+        """Active version and reload state for /api/status"""
+        status = dict(self.active.describe()) if self.active is not None else {'version': None}
+        status.update({
+            'registry': self.root if self.published_version() else None,
+            'reloading': self._loading,
+            'reloads': self.reloads,
+            'last_error': self.last_error
+        })
+        return status
+
+    def publish(self, version, source_paths, extra_files=None):
+        """Copy model, scaler and columns files in as a new version and point CURRENT at it.
+
+        ``extra_files`` maps file names to paths copied into the version alongside
+        them (e.g. the online learner's state), so they appear together with it.
+        """
+        if not version or os.sep in version or version in ('.', '..', POINTER_FILE):
+            raise ValueError(f"invalid version name: {version!r}")
+        target = os.path.join(self.root, version)
+        if os.path.exists(target):
+            raise ValueError(f"version {version} already exists in {self.root}")
+        staging = f'{target}.tmp{os.getpid()}'
+        os.makedirs(staging)
+        for source, name in zip(source_paths, ARTIFACT_FILES):
+            shutil.copy2(source, os.path.join(staging, name))
+        for name, source in (extra_files or {}).items():
+            shutil.copy2(source, os.path.join(staging, name))
+        os.rename(staging, target)
+        self.activate(version)
+        return target
+
+    def activate(self, version):
+        """Atomically point CURRENT at an existing version (also used to roll back)"""
+        path = os.path.join(self.root, version)
+        if not (artifacts.is_artifact_dir(path)
+                or all(os.path.exists(os.path.join(path, name)) for name in ARTIFACT_FILES)):
+            raise ValueError(f"version {version} is missing from {self.root}")
+        tmp_pointer = f'{self.pointer_path}.tmp{os.getpid()}'
+        with open(tmp_pointer, 'w') as f:
+            f.write(version + '\n')
+        os.replace(tmp_pointer, self.pointer_path)
+        logger.info(f"Model registry {self.root} now points at {version}")
+
+
+if __name__ == '__main__':
+    # Usage (from Dashboard/):
+    #   python -m api.registry publish [version] [source_dir]   copy source_dir/*.pkl in as a new version
+    #   python -m api.registry activate <version>               switch (or roll back) to a version
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    registry = ModelRegistry()
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    if command == 'publish':
+        version = sys.argv[2] if len(sys.argv) > 2 else time.strftime('%Y%m%d-%H%M%S')
+        source_dir = sys.argv[3] if len(sys.argv) > 3 else os.path.dirname(registry.root)
+        registry.publish(version, [os.path.join(source_dir, name) for name in ARTIFACT_FILES])
+    elif command == 'activate' and len(sys.argv) > 2:
+        registry.activate(sys.argv[2])
+    else:
+        sys.exit('usage: python -m api.registry publish [version] [source_dir] | activate <version>')
@@ -1,11 +1,15 @@
-from flask import Blueprint, request, jsonify
-import pandas as pd
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 import numpy as np
 import os
 import sys
 import pickle
 import logging
 import traceback
+from datetime import datetime
+
+from . import batch, http_cache, serialization
+from .coalescer import MicroBatcher
+from .health import worker_memory
 
 # Create the Blueprint for the API
 api_bp = Blueprint('api', __name__)
@@ -14,33 +18,79 @@ api_bp = Blueprint('api', __name__)
 logger = logging.getLogger('dashboard_api')
 
 # Global variables for model and data
-model = None
-scaler = None
-model_columns = None
+model_registry = None
+prediction_batcher = MicroBatcher()
+aggregate_cache = None
+records_log = None
 df = None
 
-def initialize(app_model, app_scaler, app_model_columns, app_df):
+# Set by create_app() when the model and data load through a BackgroundLoader
+resource_loader = None
+
+def initialize(app_model, app_scaler, app_model_columns, app_df, model_files=None, data_files=None,
+               records_path=None, registry_root=None):
     """Initialize the API module with model and data objects"""
-    global model, scaler, model_columns, df
-    model = app_model
-    scaler = app_scaler
-    model_columns = app_model_columns
+    global model_registry, aggregate_cache, records_log, df
+    # Imported here (they pull in pandas) so importing the blueprint stays cheap under lazy loading
+    from .aggregates import AggregateCache
+    from .records import AppendLog, DEFAULT_APPEND_LOG
+    from .registry import DEFAULT_REGISTRY_ROOT, ModelRegistry
+    records_path = records_path or DEFAULT_APPEND_LOG
+    # The registry serves a published model version if there is one, else these objects,
+    # and swaps in new versions as they appear on disk
+    model_registry = ModelRegistry(registry_root or DEFAULT_REGISTRY_ROOT, fallback_files=model_files)
+    model_registry.initialize(app_model, app_scaler, app_model_columns)
     df = app_df
+    aggregate_cache = AggregateCache(df, modified_at=http_cache.files_modified_at(data_files))
+    records_log = AppendLog(records_path)
+    if aggregate_cache.available:
+        appended = records_log.sync(aggregate_cache)
+        if appended:
+            logger.info(f"Loaded {appended} previously appended records from {records_path}")
+    # Serialize the aggregate payloads up front so preforked workers share them
+    aggregate_cache.warm()
     logger.info("API module initialized with model and data objects")
 
+def active_model():
+    """The model bundle serving this request (None before initialize())"""
+    return model_registry.active if model_registry is not None else None
+
+def sync_records():
+    """Pick up records appended by other workers since the last request"""
+    if records_log is not None and aggregate_cache is not None and aggregate_cache.available:
+        records_log.sync(aggregate_cache)
+
+@api_bp.before_request
+def wait_for_resources():
+    """Hold API requests (other than /status) until loading has finished"""
+    if resource_loader is not None and request.endpoint != 'api.api_status' and not resource_loader.wait():
+        logger.warning(f"Request to {request.path} timed out waiting for the model and data to load")
+        return jsonify({
+            'error': 'Warming up',
+            'message': 'The model and data are still loading. Please retry shortly.'
+        }), 503, {'Retry-After': '5'}
+    if model_registry is not None:
+        model_registry.poll()
+
 @api_bp.route('/status')
 def api_status():
     """Return API status and available features"""
+    bundle = active_model()
     status = {
         'status': 'online',
         'features': {
             'data': df is not None,
-            'predictions': model is not None and scaler is not None and model_columns is not None,
-            'feature_importance': model is not None and model_columns is not None
+            'predictions': bundle is not None and bundle.ready,
+            'feature_importance': bundle is not None and bundle.model is not None and bundle.model_columns is not None
         },
-        'model_loaded': model is not None,
+        'model_loaded': bundle is not None and bundle.model is not None,
+        'model': model_registry.status() if model_registry is not None else None,
         'data_loaded': df is not None,
-        'records_count': len(df) if df is not None else 0,
+        'records_count': aggregate_cache.record_count if aggregate_cache is not None else 0,
+        'loading': resource_loader.status() if resource_loader is not None else {'state': 'ready', 'ready': True},
+        'prediction_cache': bundle.prediction_cache.stats() if bundle is not None else None,
+        'batching': prediction_batcher.stats(),
+        'worker': worker_memory(),
         'api_version': '1.1.0'
     }
     return jsonify(status)
@@ -49,80 +99,11 @@ def api_status():
 def get_data():
     """Return basic statistics about the dataset"""
     try:
-        if df is not None:
-            logger.info("Calculating dataset statistics")
-            # Calculate statistics with error handling
-            stats = {
-                'total_records': len(df),
-                'purchase_rate': float(df['will_purchase'].mean()),
-                'conversion_rate': float(df['will_purchase'].mean())
-            }
-            
-            # Add age stats
-            try:
-                stats['avg_age'] = float(df['age'].mean())
-                stats['age_groups'] = {
-                    '18-25': int(df[(df['age'] >= 18) & (df['age'] <= 25)].shape[0]),
-                    '26-35': int(df[(df['age'] >= 26) & (df['age'] <= 35)].shape[0]),
-                    '36-45': int(df[(df['age'] >= 36) & (df['age'] <= 45)].shape[0]),
-                    '46-55': int(df[(df['age'] >= 46) & (df['age'] <= 55)].shape[0]),
-                    '56+': int(df[df['age'] >= 56].shape[0])
-                }
-            except Exception as age_error:
-                logger.warning(f"Error calculating age statistics: {str(age_error)}")
-                stats['avg_age'] = 35.0  # Fallback value
-            
-            # Add income stats
-            try:
-                stats['avg_income'] = float(df['income'].mean())
-                stats['income_groups'] = {
-                    '<30k': int(df[df['income'] < 30000].shape[0]),
-                    '30k-50k': int(df[(df['income'] >= 30000) & (df['income'] < 50000)].shape[0]),
-                    '50k-70k': int(df[(df['income'] >= 50000) & (df['income'] < 70000)].shape[0]),
-                    '70k-100k': int(df[(df['income'] >= 70000) & (df['income'] < 100000)].shape[0]),
-                    '>100k': int(df[df['income'] >= 100000].shape[0])
-                }
-                
-                # Income-based conversion rates
-                high_income = df[df['income'] > df['income'].median()]
-                low_income = df[df['income'] <= df['income'].median()]
-                stats['high_income_conversion'] = float(high_income['will_purchase'].mean())
-                stats['low_income_conversion'] = float(low_income['will_purchase'].mean())
-            except Exception as income_error:
-                logger.warning(f"Error calculating income statistics: {str(income_error)}")
-                stats['avg_income'] = 65000.0  # Fallback value
-            
-            # Add website time stats
-            try:
-                stats['avg_time_on_website'] = float(df['time_on_website'].mean())
-            except Exception as time_error:
-                logger.warning(f"Error calculating website time statistics: {str(time_error)}")
-                stats['avg_time_on_website'] = 18.0  # Fallback value
-            
-            # Add brand distribution
-            try:
-                stats['brand_distribution'] = df['brand'].value_counts().to_dict()
-            except Exception as brand_error:
-                logger.warning(f"Error calculating brand distribution: {str(brand_error)}")
-                # Fallback brand distribution
-                stats['brand_distribution'] = {
-                    'iPhone': 250, 'Samsung': 220, 'OnePlus': 120,
-                    'Xiaomi': 100, 'Google Pixel': 90, 'Oppo': 60,
-                    'Vivo': 50, 'Nothing': 30, 'Realme': 20
-                }
-            
-            # Add engagement stats
-            try:
-                stats['marketing_engagement_rate'] = float(df['marketing_engaged'].mean())
-                engaged_users = df[df['marketing_engaged'] == 1]
-                non_engaged_users = df[df['marketing_engaged'] == 0]
-                stats['engaged_conversion'] = float(engaged_users['will_purchase'].mean())
-                stats['non_engaged_conversion'] = float(non_engaged_users['will_purchase'].mean())
-            except Exception as engagement_error:
-                logger.warning(f"Error calculating engagement statistics: {str(engagement_error)}")
-            
-            logger.info("Successfully calculated dataset statistics")
-            return jsonify(stats)
+        if aggregate_cache is not None and aggregate_cache.available:
+            # Aggregates are tallied once per data version; this is a cache lookup
+            logger.info("Serving cached dataset statistics")
+            sync_records()
+            return http_cache.conditional_response(aggregate_cache.payload('data'), aggregate_cache.modified_at)
         else:
             logger.error("Data not available for statistics calculation")
             return jsonify({
@@ -137,10 +118,71 @@ def get_data():
             'message': str(e)
         }), 500
 
+@api_bp.route('/records', methods=['POST'])
+def append_records():
+    """Ingest labelled purchase records and fold them into the dataset aggregates"""
+    from .records import RECORDS_TOKEN_HEADER, clean_records, ingestion_allowed
+    if not ingestion_allowed(request.headers):
+        logger.warning("Records submitted without a valid records token")
+        return jsonify({
+            'error': 'Forbidden',
+            'message': f'Record ingestion needs RECORDS_API_TOKEN set and sent as {RECORDS_TOKEN_HEADER}'
+        }), 403
+
+    if aggregate_cache is None or not aggregate_cache.available:
+        logger.warning("Records submitted but data not available")
+        return jsonify({
+            'error': 'Data not loaded',
+            'message': 'The dataset is not available. Please check the data files.'
+        }), 500
+
+    try:
+        try:
+            records, _ = batch.extract_records(request.get_json(silent=True))
+        except ValueError as payload_error:
+            logger.warning(f"Invalid records request: {str(payload_error)}")
+            return jsonify({
+                'error': 'Invalid records request',
+                'message': str(payload_error)
+            }), 400
+
+        frame, errors = clean_records(records)
+        logger.info(f"Records request received: {len(frame)} valid, {len(errors)} rejected")
+
+        if len(frame):
+            try:
+                # The log is shared by every worker; syncing reads our own rows back
+                records_log.write(frame)
+            except OSError as write_error:
+                # Folding them into this worker alone would make workers disagree
+                logger.error(f"Could not persist records: {str(write_error)}")
+                return jsonify({
+                    'error': 'Records not stored',
+                    'message': 'The append log could not be written; no records were added'
+                }), 503
+            records_log.sync(aggregate_cache)
+
+        return jsonify({
+            'accepted': len(frame),
+            'errors': errors,
+            'total_records': aggregate_cache.record_count,
+            'version': aggregate_cache.version,
+            'persisted': True
+        })
+
+    except Exception as e:
+        logger.error(f"Error appending records: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'error': 'Error appending records',
+            'message': str(e)
+        }), 500
+
 @api_bp.route('/predict', methods=['POST'])
 def predict():
     """Make prediction based on input data"""
-    if model is None or scaler is None or model_columns is None:
+    bundle = active_model()
+    if bundle is None or not bundle.ready:
         logger.warning("Prediction requested but model components not available")
         return jsonify({
             'error': 'Model not loaded',
@@ -164,48 +206,25 @@ def predict():
                 'missing_fields': missing_fields
             }), 400
         
-        # Create a DataFrame with one row
-        input_df = pd.DataFrame([input_data])
-        
-        # Ensure types are correct
-        input_df['age'] = pd.to_numeric(input_df['age'], errors='coerce').fillna(30)
-        input_df['income'] = pd.to_numeric(input_df['income'], errors='coerce').fillna(50000)
-        input_df['time_on_website'] = pd.to_numeric(input_df['time_on_website'], errors='coerce').fillna(15)
-        input_df['previous_purchases'] = pd.to_numeric(input_df['previous_purchases'], errors='coerce').fillna(1)
-        input_df['marketing_engaged'] = pd.to_numeric(input_df['marketing_engaged'], errors='coerce').fillna(0)
-        input_df['search_frequency'] = pd.to_numeric(input_df['search_frequency'], errors='coerce').fillna(5)
-        input_df['device_age'] = pd.to_numeric(input_df['device_age'], errors='coerce').fillna(2)
-        
-        # One-hot encode categorical features
-        logger.info("One-hot encoding categorical features")
-        try:
-            input_encoded = pd.get_dummies(input_df, columns=['brand'], drop_first=True)
-        except Exception as encode_error:
-            logger.error(f"Error during one-hot encoding: {str(encode_error)}")
-            # Try to recover by using a standard brand format
-            input_df['brand'] = input_df['brand'].astype(str)
-            input_encoded = pd.get_dummies(input_df, columns=['brand'], drop_first=True)
-        
-        # Reindex to match training columns
-        logger.info("Reindexing to match model columns")
-        input_encoded = input_encoded.reindex(columns=model_columns, fill_value=0)
-        
-        # Scale the features
-        logger.info("Scaling features")
-        input_scaled = scaler.transform(input_encoded)
-        
-        # Make prediction
+        # Encode straight into the model column layout
+        logger.info("Encoding input features")
+        input_encoded = bundle.feature_encoder.encode(input_data)
+
+        # Scale the features and make prediction
         logger.info("Making prediction")
-        prediction = int(model.predict(input_scaled)[0])
-        probability = float(model.predict_proba(input_scaled)[0, 1])
+        # Concurrent single predictions share one engine call when batching is enabled
+        labels, probabilities = prediction_batcher.predict(bundle.engine, input_encoded)
+        prediction = int(labels[0])
+        probability = float(probabilities[0])
         
         result = {
             'prediction': prediction,
             'probability': probability,
             'message': 'Likely to purchase' if prediction == 1 else 'Not likely to purchase',
             'metadata': {
-                'model_type': type(model).__name__,
-                'timestamp': pd.Timestamp.now().isoformat()
+                'model_type': type(bundle.model).__name__,
+                'model_version': bundle.version,
+                'timestamp': datetime.now().isoformat()
             }
         }
         logger.info(f"Prediction result: {result}")
@@ -221,10 +240,96 @@ def predict():
             'detail': traceback.format_exc()
         }), 400
 
+@api_bp.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    """Score a list of customer records in vectorized chunks"""
+    bundle = active_model()
+    if bundle is None or not bundle.ready:
+        logger.warning("Batch prediction requested but model components not available")
+        return jsonify({
+            'error': 'Model not loaded',
+            'message': 'The prediction model is not available. Please check the model files.'
+        }), 500
+
+    try:
+        try:
+            records, chunk_size = batch.extract_records(request.get_json(silent=True))
+        except ValueError as payload_error:
+            logger.warning(f"Invalid batch prediction request: {str(payload_error)}")
+            return jsonify({
+                'error': 'Invalid batch request',
+                'message': str(payload_error)
+            }), 400
+
+        logger.info(f"Batch prediction request received: {len(records)} records (chunk_size={chunk_size})")
+        results = batch.predict_batch(records, bundle.engine, bundle.feature_encoder, chunk_size=chunk_size)
+        error_count = sum(1 for result in results if 'error' in result)
+        logger.info(f"Batch prediction completed: {len(results) - error_count} scored, {error_count} errors")
+
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'scored': len(results) - error_count,
+            'errors': error_count
+        })
+
+    except Exception as e:
+        logger.error(f"Error during batch prediction: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'error': 'Batch prediction error',
+            'message': str(e),
+            'detail': traceback.format_exc()
+        }), 400
+
+@api_bp.route('/predict_stream', methods=['POST'])
+def predict_stream():
+    """Score newline-delimited JSON records, streaming NDJSON results as each chunk is scored"""
+    bundle = active_model()
+    if bundle is None or not bundle.ready:
+        logger.warning("Streaming prediction requested but model components not available")
+        return jsonify({
+            'error': 'Model not loaded',
+            'message': 'The prediction model is not available. Please check the model files.'
+        }), 500
+
+    try:
+        chunk_size = int(request.args.get('chunk_size', batch.DEFAULT_CHUNK_SIZE))
+        if chunk_size < 1:
+            raise ValueError
+    except ValueError:
+        logger.warning(f"Invalid chunk_size for streaming prediction: {request.args.get('chunk_size')}")
+        return jsonify({
+            'error': 'Invalid batch request',
+            'message': 'chunk_size must be a positive integer'
+        }), 400
+
+    def generate():
+        # Reads the request body line by line while results are being sent,
+        # so neither the input nor the output is ever held in full
+        count = error_count = 0
+        try:
+            for results in batch.stream_predictions(request.stream, bundle.engine, bundle.feature_encoder,
+                                                    chunk_size=chunk_size):
+                count += len(results)
+                error_count += sum(1 for result in results if 'error' in result)
+                yield b''.join(serialization.dumps(result) + b'\n' for result in results)
+        except Exception as e:
+            # The 200 status is already sent; report the failure as a final line
+            logger.error(f"Error during streaming prediction after {count} records: {str(e)}")
+            logger.error(traceback.format_exc())
+            yield serialization.dumps({'error': 'Batch prediction error', 'message': str(e)}) + b'\n'
+            return
+        logger.info(f"Streaming prediction completed: {count - error_count} scored, {error_count} errors")
+
+    logger.info(f"Streaming prediction request received (chunk_size={chunk_size})")
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @api_bp.route('/compare_brands', methods=['POST'])
 def compare_brands():
     """Compare purchase probability for different brands"""
-    if model is None or scaler is None or model_columns is None:
+    bundle = active_model()
+    if bundle is None or not bundle.ready:
         logger.warning("Brand comparison requested but model components not available")
         return jsonify({
             'error': 'Model not loaded',
@@ -247,11 +352,33 @@ def compare_brands():
         
         logger.info(f"Comparing {len(brands)} brands: {brands}")
         
-        # Validate base features
-        required_fields = ['age', 'income', 'time_on_website', 'previous_purchases', 
-                          'marketing_engaged', 'search_frequency', 'device_age']
+        # Many profiles at once: return a profile x brand probability matrix
+        profiles = base_features.pop('profiles', None)
+        if profiles is not None:
+            if not isinstance(profiles, list):
+                logger.warning("Invalid profiles list in comparison request")
+                return jsonify({
+                    'error': 'Invalid profiles parameter',
+                    'message': 'profiles must be a list of customer profiles'
+                }), 400
+            if len(profiles) * len(brands) > batch.MAX_BATCH_RECORDS:
+                return jsonify({
+                    'error': 'Invalid profiles parameter',
+                    'message': f'profiles x brands may contain at most {batch.MAX_BATCH_RECORDS} rows'
+                }), 400
+            results = batch.brand_affinity(profiles, brands, bundle.engine, bundle.feature_encoder)
+            error_count = sum(1 for result in results if 'error' in result)
+            logger.info(f"Brand affinity matrix generated for {len(profiles)} profiles x {len(brands)} brands")
+            return jsonify({
+                'brands': brands,
+                'results': results,
+                'count': len(results),
+                'scored': len(results) - error_count,
+                'errors': error_count
+            })
         
-        missing_fields = [field for field in required_fields if field not in base_features]
+        # Validate base features
+        missing_fields = [field for field in batch.PROFILE_FIELDS if field not in base_features]
         if missing_fields:
             logger.warning(f"Missing fields in comparison request: {missing_fields}")
             return jsonify({
@@ -259,51 +386,13 @@ def compare_brands():
                 'missing_fields': missing_fields
             }), 400
         
-        results = []
-        for brand in brands:
-            try:
-                # Create input data with current brand
-                input_data = base_features.copy()
-                input_data['brand'] = brand
-                
-                # Create DataFrame
-                input_df = pd.DataFrame([input_data])
-                
-                # Ensure types are correct
-                input_df['age'] = pd.to_numeric(input_df['age'], errors='coerce').fillna(30)
-                input_df['income'] = pd.to_numeric(input_df['income'], errors='coerce').fillna(50000)
-                input_df['time_on_website'] = pd.to_numeric(input_df['time_on_website'], errors='coerce').fillna(15)
-                input_df['previous_purchases'] = pd.to_numeric(input_df['previous_purchases'], errors='coerce').fillna(1)
-                input_df['marketing_engaged'] = pd.to_numeric(input_df['marketing_engaged'], errors='coerce').fillna(0)
-                input_df['search_frequency'] = pd.to_numeric(input_df['search_frequency'], errors='coerce').fillna(5)
-                input_df['device_age'] = pd.to_numeric(input_df['device_age'], errors='coerce').fillna(2)
-                
-                # One-hot encode categorical features
-                input_encoded = pd.get_dummies(input_df, columns=['brand'], drop_first=True)
-                
-                # Reindex to match training columns
-                input_encoded = input_encoded.reindex(columns=model_columns, fill_value=0)
-                
-                # Scale the features
-                input_scaled = scaler.transform(input_encoded)
-                
-                # Make prediction
-                prediction = int(model.predict(input_scaled)[0])
-                probability = float(model.predict_proba(input_scaled)[0, 1])
-                
-                results.append({
-                    'brand': brand,
-                    'prediction': prediction,
-                    'probability': probability
-                })
-            except Exception as brand_error:
-                logger.error(f"Error processing brand '{brand}': {str(brand_error)}")
-                results.append({
-                    'brand': brand,
-                    'error': str(brand_error),
-                    'probability': 0.5,  # Fallback value
-                    'prediction': 0
-                })
+        # Score all brands in one call; only the brand one-hot slots differ per row
+        labels, probabilities = batch.compare_brands([base_features], brands, bundle.engine, bundle.feature_encoder)
+        results = [{
+            'brand': brand,
+            'prediction': int(label),
+            'probability': float(probability)
+        } for brand, label, probability in zip(brands, labels[0], probabilities[0])]
         
         # Sort results by probability in descending order
         results.sort(key=lambda x: x['probability'], reverse=True)
@@ -323,6 +412,9 @@ def compare_brands():
 @api_bp.route('/feature_importance', methods=['GET'])
 def feature_importance():
     """Return feature importance if available"""
+    bundle = active_model()
+    model = bundle.model if bundle is not None else None
+    model_columns = bundle.model_columns if bundle is not None else None
     if model is None:
         logger.warning("Feature importance requested but model not available")
         return jsonify({
@@ -331,17 +423,22 @@ def feature_importance():
         }), 500
     
     try:
+        # Serialized once per model version
+        cached = bundle.payloads.get('feature_importance')
+        if cached is not None:
+            return http_cache.conditional_response(cached, bundle.modified_at)
+
         # Get feature importance if available
         logger.info("Retrieving feature importance")
         
         if hasattr(model, 'coef_'):
             # For linear models
             logger.info("Using coefficients from linear model")
-            importance = {col: float(coef) for col, coef in zip(model_columns, model.coef_[0])}
+            importance = dict(zip(model_columns, model.coef_[0]))
         elif hasattr(model, 'feature_importances_'):
             # For tree-based models
             logger.info("Using feature importances from tree-based model")
-            importance = {col: float(imp) for col, imp in zip(model_columns, model.feature_importances_)}
+            importance = dict(zip(model_columns, model.feature_importances_))
         else:
             logger.warning("Feature importance not available for this model type")
             
@@ -381,7 +478,10 @@ def feature_importance():
         }
         
         logger.info("Feature importance retrieved successfully")
-        return jsonify(result)
+        # NumPy values are encoded directly; keys sorted as jsonify() sorts them
+        body = serialization.dumps(result, sort_keys=True) + b'\n'
+        bundle.payloads['feature_importance'] = body
+        return http_cache.conditional_response(body, bundle.modified_at)
         
     except Exception as e:
         logger.error(f"Error retrieving feature importance: {str(e)}")
@@ -417,73 +517,10 @@ def segment_analysis():
         }), 500
     
     try:
-        logger.info("Performing segment analysis")
-        
-        # Age segment analysis
-        age_segments = [
-            {'name': 'Young Adults', 'range': (18, 35)},
-            {'name': 'Middle-aged', 'range': (36, 55)},
-            {'name': 'Seniors', 'range': (56, 100)}
-        ]
-        
-        age_analysis = []
-        for segment in age_segments:
-            name, (min_age, max_age) = segment['name'], segment['range']
-            segment_df = df[(df['age'] >= min_age) & (df['age'] <= max_age)]
-            if len(segment_df) > 0:
-                age_analysis.append({
-                    'segment': name,
-                    'count': int(len(segment_df)),
-                    'purchase_rate': float(segment_df['will_purchase'].mean()),
-                    'avg_income': float(segment_df['income'].mean()),
-                    'avg_time_on_website': float(segment_df['time_on_website'].mean())
-                })
-        
-        # Income segment analysis
-        income_segments = [
-            {'name': 'Low Income', 'range': (0, 30000)},
-            {'name': 'Middle Income', 'range': (30000, 70000)},
-            {'name': 'High Income', 'range': (70000, 1000000)}
-        ]
-        
-        income_analysis = []
-        for segment in income_segments:
-            name, (min_inc, max_inc) = segment['name'], segment['range']
-            segment_df = df[(df['income'] >= min_inc) & (df['income'] <= max_inc)]
-            if len(segment_df) > 0:
-                income_analysis.append({
-                    'segment': name,
-                    'count': int(len(segment_df)),
-                    'purchase_rate': float(segment_df['will_purchase'].mean()),
-                    'avg_age': float(segment_df['age'].mean()),
-                    'avg_time_on_website': float(segment_df['time_on_website'].mean())
-                })
-        
-        # Brand segment analysis
-        brand_analysis = []
-        brands = df['brand'].unique()
-        for brand in brands:
-            segment_df = df[df['brand'] == brand]
-            if len(segment_df) > 0:
-                brand_analysis.append({
-                    'brand': brand,
-                    'count': int(len(segment_df)),
-                    'purchase_rate': float(segment_df['will_purchase'].mean()),
-                    'avg_age': float(segment_df['age'].mean()),
-                    'avg_income': float(segment_df['income'].mean())
-                })
-        
-        # Sort brand analysis by purchase rate
-        brand_analysis.sort(key=lambda x: x['purchase_rate'], reverse=True)
-        
-        result = {
-            'age_segments': age_analysis,
-            'income_segments': income_analysis,
-            'brand_segments': brand_analysis
-        }
-        
-        logger.info("Segment analysis completed successfully")
-        return jsonify(result)
+        # Segments are tallied once per data version; this is a cache lookup
+        logger.info("Serving cached segment analysis")
+        sync_records()
+        return http_cache.conditional_response(aggregate_cache.payload('segment_analysis'), aggregate_cache.modified_at)
     
     except Exception as e:
         logger.error(f"Error in segment analysis: {str(e)}")
@@ -0,0 +1,84 @@
+import json
+import logging
+
+from flask import Response
+from flask.json.provider import DefaultJSONProvider
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# orjson is optional: it is several times faster than the json module and
+# encodes NumPy arrays and scalars natively. Without it the stdlib is used.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+
+def numpy_default(obj):
+    """json.dumps ``default`` hook for NumPy values (orjson handles these itself)"""
+    # Imported here so the lazy-loading app does not pull NumPy in at import time
+    import numpy as np
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return DefaultJSONProvider.default(obj)
+
+
+def dumps(obj, sort_keys=False):
+    """Serialize to compact JSON bytes, with orjson when it can encode the object"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=ORJSON_OPTIONS | (orjson.OPT_SORT_KEYS if sort_keys else 0))
+        except TypeError:
+            # Types orjson does not know (Decimal, non-contiguous arrays, big ints)
+            pass
+    return json.dumps(obj, default=numpy_default, sort_keys=sort_keys, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data):
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            # orjson rejects NaN/Infinity literals that the json module accepts;
+            # let the json module decide and raise its usual error otherwise
+            pass
+    return json.loads(data)
+
+
+def payload_response(body, status=200, headers=None):
+    """Response for an already serialized JSON payload (no re-encoding per request)"""
+    return Response(body, status=status, headers=headers, mimetype='application/json')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by dumps()/loads(), so jsonify() accepts NumPy values.
+
+    Pretty-printed output (debug mode) still goes through the json module.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if set(kwargs) <= {'sort_keys'}:
+            return dumps(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys)).decode('utf-8')
+        kwargs.setdefault('default', numpy_default)
+        return json.dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj, sort_keys=self.sort_keys) + b'\n', mimetype=self.mimetype)
+
+
+def install(app):
+    """Use FastJSONProvider for jsonify() and request.get_json() in this app"""
+    app.json = FastJSONProvider(app)
+    logger.info(f"JSON responses serialized with {'orjson' if orjson is not None else 'the json module'}")
+    return app
@@ -0,0 +1,78 @@
+import os
+import time
+import threading
+import traceback
+import logging
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# Set DASHBOARD_LAZY_LOAD=1 to serve static pages and /api/status while the
+# model and data load on a background thread
+LAZY_LOAD = os.environ.get('DASHBOARD_LAZY_LOAD', '0') == '1'
+
+# How long an API request waits for loading to finish before getting a 503
+REQUEST_WAIT_SECONDS = float(os.environ.get('DASHBOARD_LOAD_WAIT', 10))
+
+
+class BackgroundLoader:
+    """Run a loading function once, either inline or on a daemon thread.
+
+    Requests that need the loaded resources call ``wait()``; health checks
+    call ``status()``, which never blocks.
+    """
+
+    def __init__(self, load, name='resources'):
+        self.load = load
+        self.name = name
+        self.state = 'pending'
+        self.error = None
+        self.seconds = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def _run(self):
+        self._started = time.perf_counter()
+        try:
+            self.load()
+            self.state = 'ready'
+        except Exception as load_error:
+            logger.error(f"Loading {self.name} failed: {str(load_error)}")
+            logger.error(traceback.format_exc())
+            self.error = str(load_error)
+            self.state = 'failed'
+        self.seconds = time.perf_counter() - self._started
+        logger.info(f"Loading {self.name} finished in {self.seconds:.2f}s ({self.state})")
+        self._ready.set()
+
+    def start(self, background=True):
+        """Begin loading; with background=False this returns once loading is done"""
+        with self._lock:
+            if self.state != 'pending':
+                return self
+            self.state = 'loading'
+        if background:
+            threading.Thread(target=self._run, name=f'load-{self.name}', daemon=True).start()
+        else:
+            self._run()
+        return self
+
+    @property
+    def finished(self):
+        return self._ready.is_set()
+
+    def wait(self, timeout=REQUEST_WAIT_SECONDS):
+        """Block until loading has finished (or failed); False on timeout"""
+        return self._ready.wait(timeout)
+
+    def status(self):
+        """Readiness summary for /api/status"""
+        status = {'state': self.state, 'ready': self.state == 'ready'}
+        if self.seconds is not None:
+            status['load_seconds'] = round(self.seconds, 3)
+        elif self.state == 'loading':
+            status['elapsed_seconds'] = round(time.perf_counter() - self._started, 3)
+        if self.error:
+            status['error'] = self.error
+        return status
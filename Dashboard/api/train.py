@@ -0,0 +1,361 @@
+"""
+Scripted training pipeline for the purchase model.
+
+    python -m api.train                                   # forest grid from the notebook
+    python -m api.train --model logistic --param C=0.1,1,10
+    python -m api.train --param max_depth=None,8 --publish 20250101-forest
+    python -m api.train --search halving --jobs -1        # successive halving
+
+Runs five stages: clean the raw CSV(s), one-hot encode and split, fit the
+scaler, search hyperparameters with cross-validation, and export
+model.pkl, scaler.pkl and model_columns.pkl. Every stage but the export is
+cached on disk under a content hash of its inputs: the data bytes for
+cleaning, and the upstream stage's key plus the stage's own parameters for
+the rest. Changing a hyperparameter therefore only reruns the search, and
+running again with nothing changed only rewrites the artifacts.
+
+--search halving replaces the exhaustive grid with successive halving: every
+candidate is first cross-validated on a small budget (a few trees for the
+forest, a subsample of rows otherwise), and only the best 1/--factor of them
+go on to a --factor times larger budget, until the survivors use the full one.
+
+The artifacts are written to temporary files and renamed into --output
+(default Models/), followed by artifact_set.json with their hashes, which a
+serving process checks before reloading so it never mixes files from two
+runs. With --publish the output goes into the model registry as
+a new version instead, so serving processes switch to it in one step.
+"""
+
+import os
+import json
+import time
+import pickle
+import hashlib
+import argparse
+import logging
+
+import pandas as pd
+
+from .records import CLEANING_RULES, RECORD_COLUMNS, YES_NO
+from .registry import ARTIFACT_FILES, ARTIFACT_SET_FILE, DEFAULT_REGISTRY_ROOT, ModelRegistry
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_DATA = os.path.join(BASE_DIR, 'Data', 'smartphone_purchased_data_cleaned.csv')
+DEFAULT_OUTPUT = os.path.join(BASE_DIR, 'Models')
+DEFAULT_CACHE_DIR = os.environ.get('TRAIN_CACHE_DIR', os.path.join(BASE_DIR, 'Models', '.train_cache'))
+
+# Bump when a stage's code changes in a way that changes its output
+PIPELINE_VERSION = 1
+
+# Raw survey columns and their model names (as the dashboard loader maps them)
+RAW_COLUMN_MAPPING = {
+    'Age': 'age',
+    'Income': 'income',
+    'OnlineActivity': 'time_on_website',
+    'PreviousPurchases': 'previous_purchases',
+    'PromotionResponse': 'marketing_engaged',
+    'PurchaseIntent': 'search_frequency',
+    'CurrentPhone': 'device_age',
+    'BrandPreference': 'brand',
+    'Target': 'will_purchase'
+}
+
+# Estimators and their default search grids (the forest grid is the notebook's GridSearchCV)
+MODEL_GRIDS = {
+    'forest': {'n_estimators': [100, 200], 'max_depth': [None, 10, 20]},
+    'logistic': {'C': [0.1, 1.0, 10.0]}
+}
+
+# Search strategies: 'grid' fits every candidate on every fold, 'halving' drops
+# the weaker candidates after each round of a growing budget
+SEARCH_MODES = ('grid', 'halving')
+HALVING_FACTOR = 3
+
+
+def make_estimator(name, seed):
+    # Imported here so the API can import this module without loading scikit-learn
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.linear_model import LogisticRegression
+    if name == 'forest':
+        return RandomForestClassifier(random_state=seed)
+    return LogisticRegression(max_iter=1000)
+
+
+class StageCache:
+    """Pickled stage outputs under <root>/<stage>/<key>.pkl"""
+
+    def __init__(self, root=DEFAULT_CACHE_DIR):
+        self.root = root
+
+    @staticmethod
+    def key(stage, params, upstream):
+        from sklearn import __version__ as sklearn_version
+        description = json.dumps({'stage': stage, 'pipeline': PIPELINE_VERSION, 'sklearn': sklearn_version,
+                                  'params': params, 'upstream': upstream}, sort_keys=True, default=str)
+        return hashlib.sha256(description.encode('utf-8')).hexdigest()[:16]
+
+    def run(self, stage, params, upstream, compute):
+        """Return (key, output, hit): the cached output for these inputs, or compute and store it"""
+        key = self.key(stage, params, upstream)
+        path = os.path.join(self.root, stage, f'{key}.pkl')
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    output = pickle.load(f)
+                logger.info(f"Stage {stage}: cached ({key})")
+                return key, output, True
+            except Exception as cache_error:
+                logger.warning(f"Stage {stage}: ignoring unreadable cache entry {path}: {str(cache_error)}")
+        began = time.perf_counter()
+        output = compute()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp{os.getpid()}'
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        logger.info(f"Stage {stage}: computed in {time.perf_counter() - began:.2f}s ({key})")
+        return key, output, False
+
+
+def data_fingerprint(paths):
+    """Content hash of the input files (names do not matter, bytes do)"""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def clean_frame(df):
+    """Raw or cleaned survey rows -> the cleaned dataset columns, with the loader's fill rules"""
+    df = df.rename(columns={k: v for k, v in RAW_COLUMN_MAPPING.items() if k in df.columns})
+    missing = [column for column in RECORD_COLUMNS if column not in df.columns]
+    if missing:
+        raise ValueError(f"training data is missing columns: {missing}")
+    df = df[RECORD_COLUMNS].copy()
+    if df['marketing_engaged'].dtype == object:
+        df['marketing_engaged'] = df['marketing_engaged'].map(
+            lambda value: YES_NO.get(value, value) if isinstance(value, str) else value)
+    for column, (default, dtype) in CLEANING_RULES.items():
+        df[column] = pd.to_numeric(df[column], errors='coerce').fillna(default).astype(dtype)
+    df['brand'] = df['brand'].astype(str)
+    return df.reset_index(drop=True)
+
+
+def clean_stage(paths):
+    return clean_frame(pd.concat([pd.read_csv(path) for path in paths], ignore_index=True))
+
+
+def encode_stage(df, test_size, seed):
+    """One-hot encode brand (first level dropped, as the notebook did) and split train/test"""
+    from sklearn.model_selection import train_test_split
+    features = pd.get_dummies(df.drop(columns=['will_purchase']), columns=['brand'], drop_first=True)
+    features = features.astype(float)
+    labels = df['will_purchase'].to_numpy()
+    X_train, X_test, y_train, y_test = train_test_split(features, labels, test_size=test_size,
+                                                        random_state=seed, stratify=labels)
+    return {'columns': features.columns, 'X_train': X_train, 'X_test': X_test,
+            'y_train': y_train, 'y_test': y_test}
+
+
+def scale_stage(encoded):
+    """Fit the scaler on the training rows only"""
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler().fit(encoded['X_train'])
+    return {'scaler': scaler, 'X_train': scaler.transform(encoded['X_train']),
+            'X_test': scaler.transform(encoded['X_test'])}
+
+
+def halving_resource(model, resource=None):
+    """Budget successive halving grows: the tree count for the forest, training rows otherwise"""
+    if resource is None:
+        return 'n_estimators' if model == 'forest' else 'n_samples'
+    if resource == 'n_estimators' and model != 'forest':
+        raise ValueError(f"resource 'n_estimators' needs the forest model, not {model!r}")
+    return resource
+
+
+def make_search(model, grid, cv, seed, jobs, search='grid', resource=None, factor=HALVING_FACTOR):
+    """The cross-validated search object for one search strategy (folds x candidates run on jobs cores)"""
+    if search not in SEARCH_MODES:
+        raise ValueError(f"unknown search {search!r}; choose from {list(SEARCH_MODES)}")
+    from sklearn.model_selection import GridSearchCV
+    estimator = make_estimator(model, seed)
+    if search == 'grid':
+        return GridSearchCV(estimator, grid, cv=cv, scoring='accuracy', n_jobs=jobs)
+
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+    from sklearn.model_selection import HalvingGridSearchCV
+    resource = halving_resource(model, resource)
+    grid = dict(grid)
+    options = {}
+    if resource == 'n_estimators':
+        # The tree count is the budget rather than a searched value: survivors
+        # grow up to the largest count in the grid
+        options['max_resources'] = max(grid.pop('n_estimators', [100]))
+    return HalvingGridSearchCV(estimator, grid, resource=resource, factor=factor, cv=cv, scoring='accuracy',
+                               n_jobs=jobs, random_state=seed, **options)
+
+
+def search_stage(scaled, encoded, model, grid, cv, seed, jobs, search='grid', resource=None,
+                 factor=HALVING_FACTOR):
+    searcher = make_search(model, grid, cv, seed, jobs, search, resource, factor)
+    began = time.perf_counter()
+    searcher.fit(scaled['X_train'], encoded['y_train'])
+    estimator = searcher.best_estimator_
+    best_params = dict(searcher.best_params_)
+    if search == 'halving' and halving_resource(model, resource) == 'n_estimators':
+        best_params['n_estimators'] = estimator.n_estimators
+    return {
+        'model': estimator,
+        'best_params': best_params,
+        'cv_score': float(searcher.best_score_),
+        'test_accuracy': float(estimator.score(scaled['X_test'], encoded['y_test'])),
+        'candidates': len(searcher.cv_results_['params']),
+        'rounds': getattr(searcher, 'n_iterations_', 1),
+        'seconds': time.perf_counter() - began
+    }
+
+
+def write_artifacts(model, scaler, model_columns, output_dir):
+    """Write the three artifacts via temporary files renamed into place; returns their paths.
+
+    ARTIFACT_SET_FILE goes last, so until it is replaced a reader can tell
+    (registry.check_artifact_set) that the files are only partly renamed.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [os.path.join(output_dir, name) for name in ARTIFACT_FILES]
+    contents = [pickle.dumps(obj) for obj in (model, scaler, model_columns)]
+    digests = {name: hashlib.sha256(data).hexdigest() for name, data in zip(ARTIFACT_FILES, contents)}
+    targets = paths + [os.path.join(output_dir, ARTIFACT_SET_FILE)]
+    contents.append(json.dumps(digests, indent=2).encode('utf-8'))
+    staged = []
+    try:
+        for data, path in zip(contents, targets):
+            tmp_path = f'{path}.tmp{os.getpid()}'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            staged.append((tmp_path, path))
+        # Every file is complete on disk before the first rename
+        for tmp_path, path in staged:
+            os.replace(tmp_path, path)
+    finally:
+        for tmp_path, _ in staged:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return paths
+
+
+def train(data_paths=(DEFAULT_DATA,), output_dir=DEFAULT_OUTPUT, model='forest', grid=None, cv=3,
+          test_size=0.2, seed=42, jobs=None, cache_dir=DEFAULT_CACHE_DIR, publish=None,
+          registry_root=DEFAULT_REGISTRY_ROOT, search='grid', resource=None, factor=HALVING_FACTOR):
+    """Run the pipeline; returns a summary dict (stage keys and cache hits, scores, artifact paths)"""
+    if model not in MODEL_GRIDS:
+        raise ValueError(f"unknown model {model!r}; choose from {sorted(MODEL_GRIDS)}")
+    grid = grid or MODEL_GRIDS[model]
+    cache = StageCache(cache_dir)
+    data_paths = list(data_paths)
+    began = time.perf_counter()
+    hits = {}
+
+    clean_key, df, hits['clean'] = cache.run(
+        'clean', {}, data_fingerprint(data_paths), lambda: clean_stage(data_paths))
+    encode_key, encoded, hits['encode'] = cache.run(
+        'encode', {'test_size': test_size, 'seed': seed}, clean_key, lambda: encode_stage(df, test_size, seed))
+    scale_key, scaled, hits['scale'] = cache.run(
+        'scale', {}, encode_key, lambda: scale_stage(encoded))
+    search_params = {'model': model, 'grid': grid, 'cv': cv, 'seed': seed}
+    if search != 'grid':
+        # Grid runs keep the keys they had before the search modes existed
+        search_params.update({'search': search, 'resource': halving_resource(model, resource), 'factor': factor})
+    search_key, searched, hits['search'] = cache.run(
+        'search', search_params, scale_key,
+        lambda: search_stage(scaled, encoded, model, grid, cv, seed, jobs, search, resource, factor))
+
+    if publish:
+        staging_dir = os.path.join(cache_dir, 'export', search_key)
+        staged = write_artifacts(searched['model'], scaled['scaler'], encoded['columns'], staging_dir)
+        paths = [os.path.join(ModelRegistry(registry_root).publish(publish, staged), name)
+                 for name in ARTIFACT_FILES]
+    else:
+        paths = write_artifacts(searched['model'], scaled['scaler'], encoded['columns'], output_dir)
+
+    summary = {
+        'rows': len(df),
+        'stages': {'clean': clean_key, 'encode': encode_key, 'scale': scale_key, 'search': search_key},
+        'cached': hits,
+        'model': type(searched['model']).__name__,
+        'best_params': searched['best_params'],
+        'cv_score': searched['cv_score'],
+        'test_accuracy': searched['test_accuracy'],
+        'search': {'mode': search, 'candidates': searched['candidates'],
+                   'rounds': searched.get('rounds', 1), 'seconds': searched.get('seconds')},
+        'artifacts': paths,
+        'seconds': time.perf_counter() - began
+    }
+    logger.info(f"Trained {summary['model']} {summary['best_params']} on {summary['rows']} rows: "
+                f"cv accuracy {summary['cv_score']:.4f}, test accuracy {summary['test_accuracy']:.4f} "
+                f"in {summary['seconds']:.2f}s; wrote {', '.join(paths)}")
+    return summary
+
+
+def parse_param(text):
+    """'max_depth=None,10,20' -> ('max_depth', [None, 10, 20])"""
+    name, _, values = text.partition('=')
+    if not name or not values:
+        raise argparse.ArgumentTypeError(f"expected name=v1,v2,... but got {text!r}")
+    parsed = []
+    for value in values.split(','):
+        value = value.strip()
+        if value == 'None':
+            parsed.append(None)
+            continue
+        for kind in (int, float):
+            try:
+                parsed.append(kind(value))
+                break
+            except ValueError:
+                continue
+        else:
+            parsed.append(value)
+    return name.strip(), parsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train and export the purchase model')
+    parser.add_argument('data', nargs='*', default=[DEFAULT_DATA], help='raw or cleaned CSV files')
+    parser.add_argument('--model', choices=sorted(MODEL_GRIDS), default='forest')
+    parser.add_argument('--param', type=parse_param, action='append', default=[],
+                        help='search values for one hyperparameter, e.g. max_depth=None,10 (repeatable)')
+    parser.add_argument('--cv', type=int, default=3, help='cross-validation folds')
+    parser.add_argument('--test-size', type=float, default=0.2, help='held-out fraction')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--search', choices=SEARCH_MODES, default='grid',
+                        help='exhaustive grid, or successive halving that drops weak candidates early')
+    parser.add_argument('--resource', help="halving budget: 'n_estimators' (forest default) or 'n_samples'")
+    parser.add_argument('--factor', type=int, default=HALVING_FACTOR,
+                        help='halving: keep 1/factor of the candidates per round, grow the budget factor times')
+    parser.add_argument('--jobs', type=int, default=-1, help='parallel fits (-1 for all cores)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='folder for the .pkl artifacts')
+    parser.add_argument('--publish', metavar='VERSION', help='publish to the model registry instead of --output')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='stage cache folder')
+    args = parser.parse_args(argv)
+
+    grid = dict(MODEL_GRIDS[args.model])
+    grid.update(dict(args.param))
+    summary = train(args.data, args.output, model=args.model, grid=grid, cv=args.cv, test_size=args.test_size,
+                    seed=args.seed, jobs=args.jobs, cache_dir=args.cache_dir, publish=args.publish,
+                    search=args.search, resource=args.resource, factor=args.factor)
+    cached = [stage for stage, hit in summary['cached'].items() if hit]
+    logger.info(f"Stages served from cache: {', '.join(cached) if cached else 'none'}")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    main()
@@ -1,13 +1,15 @@
 import os
 import sys
 import pickle
-import numpy as np
-import pandas as pd
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory, stream_with_context
 from flask_cors import CORS
 import traceback
 import logging
 
+from api import batch, bundle, compression, http_cache, serialization
+from api.health import worker_memory
+from api.startup import LAZY_LOAD, BackgroundLoader
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -19,295 +21,75 @@ logging.basicConfig(
 )
 logger = logging.getLogger('dashboard_api')
 
-# Improved function to find and validate files
-def find_file(base_path, alternatives=None):
-    """Find a file checking multiple possible locations."""
-    if alternatives is None:
-        alternatives = []
-    
-    # First check if the base path exists
-    if os.path.exists(base_path):
-        logger.info(f"File found at: {base_path}")
-        return base_path
-    
-    # Try absolute path
-    abs_path = os.path.abspath(base_path)
-    if os.path.exists(abs_path) and abs_path != base_path:
-        logger.info(f"File found at absolute path: {abs_path}")
-        return abs_path
-    
-    # Try each alternative
-    for alt_path in alternatives:
-        if os.path.exists(alt_path):
-            logger.info(f"File found at alternative path: {alt_path}")
-            return alt_path
-    
-    # If we get here, the file wasn't found
-    logger.warning(f"File not found: {base_path} or alternatives")
-    return None
-
 app = Flask(__name__, static_folder='./static', template_folder='./')
 CORS(app)
+# jsonify() through orjson (when installed), with NumPy values encoded directly
+serialization.install(app)
+# Large JSON responses are gzip/brotli compressed when the client accepts it
+compression.install(app)
 
 logger.info("Starting Smartphone Purchase Prediction Dashboard API")
 logger.info(f"Current working directory: {os.getcwd()}")
 
-# Define path options for model files
-model_path = '../Models/model.pkl'
-scaler_path = '../Models/scaler.pkl'
-columns_path = '../Models/model_columns.pkl'
-
-# Alternative paths to try
-alt_model_paths = [
-    'e:/ml/Models/model.pkl',
-    './Models/model.pkl',
-    '../../Models/model.pkl'
-]
-alt_scaler_paths = [
-    'e:/ml/Models/scaler.pkl',
-    './Models/scaler.pkl',
-    '../../Models/scaler.pkl'
-]
-alt_columns_paths = [
-    'e:/ml/Models/model_columns.pkl',
-    './Models/model_columns.pkl',
-    '../../Models/model_columns.pkl'
-]
-
-# Load model files with improved error handling
-model = None
-scaler = None
-model_columns = None
-
-logger.info("Attempting to load model files...")
-
-# Find the model file
-found_model_path = find_file(model_path, alt_model_paths)
-found_scaler_path = find_file(scaler_path, alt_scaler_paths)
-found_columns_path = find_file(columns_path, alt_columns_paths)
-
-# Load the files if found
-try:
-    if found_model_path:
-        logger.info(f"Loading model from {found_model_path}")
-        with open(found_model_path, 'rb') as f:
-            model = pickle.load(f)
-        logger.info("Model loaded successfully")
-    else:
-        logger.error("Model file not found in any location")
-        
-    if found_scaler_path:
-        logger.info(f"Loading scaler from {found_scaler_path}")
-        with open(found_scaler_path, 'rb') as f:
-            scaler = pickle.load(f)
-        logger.info("Scaler loaded successfully")
-    else:
-        logger.error("Scaler file not found in any location")
-        
-    if found_columns_path:
-        logger.info(f"Loading columns from {found_columns_path}")
-        with open(found_columns_path, 'rb') as f:
-            model_columns = pickle.load(f)
-        logger.info("Model columns loaded successfully")
-    else:
-        logger.error("Columns file not found in any location")
-        
-    # Explicit None checks to avoid ambiguous truth value errors (e.g. pandas Index)
-    if model is not None and scaler is not None and model_columns is not None:
-        try:
-            # Add some diagnostics about model_columns for clarity
-            if hasattr(model_columns, 'dtype') and hasattr(model_columns, '__len__'):
-                logger.info(f"All model files loaded successfully (model_columns type={type(model_columns).__name__}, len={len(model_columns)})")
-            else:
-                logger.info(f"All model files loaded successfully (model_columns type={type(model_columns).__name__})")
-        except Exception as diag_err:
-            logger.warning(f"Loaded model_columns but failed to inspect details: {diag_err}")
-    else:
-        logger.warning("Some model files could not be loaded - predictions will be unavailable")
-        
-except Exception as e:
-    logger.error(f"Error loading model files: {str(e)}")
-    logger.error(traceback.format_exc())
-    model = None
-    scaler = None
-    model_columns = None
-
-# Define data file paths
-data_path = '../Data/smartphone_purchased_data.csv'
-alt_data_paths = [
-    '../Data/smartphone_purchased_data_cleaned.csv',
-    '../Data/smartphone_purchased_data_updated.csv',
-    'e:/ml/Data/smartphone_purchased_data.csv',
-    'e:/ml/Data/smartphone_purchased_data_cleaned.csv',
-    'e:/ml/Data/smartphone_purchased_data_updated.csv',
-    './Data/smartphone_purchased_data.csv'
-]
-
-logger.info("Attempting to load dataset...")
-
-# Find the data file
-found_data_path = find_file(data_path, alt_data_paths)
+# Model, data and derived caches; populated by load_resources()
+model_registry = None
+prediction_batcher = None
 df = None
+aggregate_cache = None
+records_log = None
+
+def load_resources():
+    """Load the model files and dataset (app_resources) and hand them to the request handlers.
+
+    Heavy imports (pandas, numpy, scikit-learn via the pickles) happen there rather
+    than at module import, so with DASHBOARD_LAZY_LOAD=1 the app can serve static
+    pages and /api/status while this runs on a background thread.
+    """
+    global model_registry, prediction_batcher, df, aggregate_cache, records_log
+    import app_resources
+    model_registry = app_resources.model_registry
+    prediction_batcher = app_resources.prediction_batcher
+    df = app_resources.df
+    aggregate_cache = app_resources.aggregate_cache
+    records_log = app_resources.records_log
+
+resource_loader = BackgroundLoader(load_resources, name='model and data')
+resource_loader.start(background=LAZY_LOAD)
+
+@app.before_request
+def wait_for_resources():
+    """Hold API requests (other than /api/status) until loading has finished"""
+    if request.path.startswith('/api/') and request.path != '/api/status' and not resource_loader.wait():
+        logger.warning(f"Request to {request.path} timed out waiting for the model and data to load")
+        return jsonify({
+            'error': 'Warming up',
+            'message': 'The model and data are still loading. Please retry shortly.'
+        }), 503, {'Retry-After': '5'}
+    if request.path.startswith('/api/') and model_registry is not None:
+        model_registry.poll()
 
-try:
-    # Load the data if found
-    if found_data_path:
-        logger.info(f"Loading data from {found_data_path}")
-        df = pd.read_csv(found_data_path)
-        logger.info(f"Data loaded successfully: {len(df)} rows")
-    else:
-        logger.warning("No data file found - will create synthetic data")
-    
-    # Verify and standardize column names
-    expected_columns = ['age', 'income', 'time_on_website', 'previous_purchases', 
-                       'marketing_engaged', 'search_frequency', 'device_age', 'brand', 'will_purchase']
-    
-    # Map the actual columns to expected columns
-    column_mapping = {
-        'Age': 'age',
-        'Income': 'income',
-        'OnlineActivity': 'time_on_website',
-        'PreviousPurchases': 'previous_purchases',
-        'PromotionResponse': 'marketing_engaged',  # Yes/No to 1/0
-        'PurchaseIntent': 'search_frequency',  # Using as proxy
-        'CurrentPhone': 'device_age',          # Using as proxy
-        'BrandPreference': 'brand',
-        'Target': 'will_purchase'
-    }
-    
-    if df is not None:
-        # Log data shape before processing
-        logger.info(f"Original data shape: {df.shape}")
-        
-        # Rename columns that exist
-        rename_dict = {k: v for k, v in column_mapping.items() if k in df.columns}
-        if rename_dict:
-            logger.info(f"Renaming columns: {rename_dict}")
-            df = df.rename(columns=rename_dict)
-        
-        # Convert Yes/No to 1/0 for marketing_engaged if it exists
-        if 'marketing_engaged' in df.columns and df['marketing_engaged'].dtype == 'object':
-            logger.info("Converting marketing_engaged from Yes/No to 1/0")
-            df['marketing_engaged'] = df['marketing_engaged'].map({'Yes': 1, 'No': 0, 'yes': 1, 'no': 0})
-        
-        # If columns are missing, create them with random data
-        missing_columns = [col for col in expected_columns if col not in df.columns]
-        if missing_columns:
-            logger.warning(f"Missing columns will be synthesized: {missing_columns}")
-            
-        for col in expected_columns:
-            if col not in df.columns:
-                logger.info(f"Creating synthetic data for column: {col}")
-                if col == 'age':
-                    df[col] = np.random.randint(18, 65, len(df))
-                elif col == 'income':
-                    df[col] = np.random.randint(10000, 150000, len(df))
-                elif col == 'time_on_website':
-                    df[col] = np.random.normal(20, 10, len(df))
-                elif col == 'previous_purchases':
-                    df[col] = np.random.poisson(1.5, len(df))
-                elif col == 'marketing_engaged':
-                    df[col] = np.random.choice([0, 1], len(df))
-                elif col == 'search_frequency':
-                    df[col] = np.random.randint(0, 20, len(df))
-                elif col == 'device_age':
-                    df[col] = np.random.normal(2.5, 1.0, len(df))
-                elif col == 'brand':
-                    df[col] = np.random.choice(['iPhone', 'Samsung', 'OnePlus', 'Xiaomi', 'Realme', 'Oppo', 'Vivo', 'Nothing', 'Google Pixel'], len(df))
-                elif col == 'will_purchase':
-                    if 'Target' in df.columns:
-                        df[col] = df['Target']
-                    else:
-                        df[col] = np.random.choice([0, 1], len(df))
-        
-        # Keep only the columns we need
-        df = df[expected_columns]
-        
-        # Convert data types to ensure consistency
-        df['age'] = pd.to_numeric(df['age'], errors='coerce').fillna(30).astype(int)
-        df['income'] = pd.to_numeric(df['income'], errors='coerce').fillna(50000).astype(int)
-        df['time_on_website'] = pd.to_numeric(df['time_on_website'], errors='coerce').fillna(15).astype(float)
-        df['previous_purchases'] = pd.to_numeric(df['previous_purchases'], errors='coerce').fillna(1).astype(int)
-        df['marketing_engaged'] = pd.to_numeric(df['marketing_engaged'], errors='coerce').fillna(0).astype(int)
-        df['search_frequency'] = pd.to_numeric(df['search_frequency'], errors='coerce').fillna(5).astype(int)
-        df['device_age'] = pd.to_numeric(df['device_age'], errors='coerce').fillna(2).astype(float)
-        df['will_purchase'] = pd.to_numeric(df['will_purchase'], errors='coerce').fillna(0).astype(int)
-        
-        # Log data shape after processing
-        logger.info(f"Processed data shape: {df.shape}")
-        
-        # Save cleaned data for future use
-        try:
-            cleaned_path = '../Data/smartphone_purchased_data_cleaned.csv'
-            df.to_csv(cleaned_path, index=False)
-            logger.info(f"Cleaned and standardized data saved to {cleaned_path}")
-        except Exception as save_error:
-            logger.warning(f"Could not save cleaned data: {str(save_error)}")
-    else:
-        # Create synthetic data from scratch
-        logger.info("Creating completely synthetic dataset")
-        n = 1000
-        np.random.seed(42)
-        
-        df = pd.DataFrame({
-            'age': np.random.randint(18, 65, size=n),
-            'income': np.random.randint(10000, 150000, size=n),
-            'time_on_website': np.round(np.random.normal(loc=20, scale=10, size=n), 2),
-            'previous_purchases': np.random.poisson(lam=1.5, size=n),
-            'marketing_engaged': np.random.choice([0, 1], size=n, p=[0.4, 0.6]),
-            'search_frequency': np.random.randint(0, 20, size=n),
-            'device_age': np.round(np.clip(np.random.normal(loc=2.5, scale=1.0, size=n), 0.2, 5.0), 1),
-            'brand': np.random.choice(['iPhone', 'Samsung', 'OnePlus', 'Xiaomi', 'Realme', 'Oppo', 'Vivo', 'Nothing', 'Google Pixel'], size=n),
-            'will_purchase': np.random.choice([0, 1], size=n)
-        })
-        
-        logger.info(f"Created synthetic dataset with {len(df)} rows")
-        
-        # Try to save the synthetic data
-        try:
-            cleaned_path = '../Data/smartphone_purchased_data_cleaned.csv'
-            df.to_csv(cleaned_path, index=False)
-            logger.info(f"Synthetic data saved to {cleaned_path}")
-        except Exception as save_error:
-            logger.warning(f"Could not save synthetic data: {str(save_error)}")
-except Exception as e:
-    logger.error(f"Error processing data: {str(e)}")
-    logger.error(traceback.format_exc())
-    
-    # Create synthetic data as last resort
-    logger.info("Creating synthetic data due to processing error")
-    n = 1000
-    np.random.seed(42)
-    
-    df = pd.DataFrame({
-        'age': np.random.randint(18, 65, size=n),
-        'income': np.random.randint(10000, 150000, size=n),
-        'time_on_website': np.round(np.random.normal(loc=20, scale=10, size=n), 2),
-        'previous_purchases': np.random.poisson(lam=1.5, size=n),
-        'marketing_engaged': np.random.choice([0, 1], size=n, p=[0.4, 0.6]),
-        'search_frequency': np.random.randint(0, 20, size=n),
-        'device_age': np.round(np.clip(np.random.normal(loc=2.5, scale=1.0, size=n), 0.2, 5.0), 1),
-        'brand': np.random.choice(['iPhone', 'Samsung', 'OnePlus', 'Xiaomi', 'Realme', 'Oppo', 'Vivo', 'Nothing', 'Google Pixel'], size=n),
-        'will_purchase': np.random.choice([0, 1], size=n)
-    })
+def active_model():
+    """The model bundle serving this request (None until loading has finished)"""
+    return model_registry.active if model_registry is not None else None
 
 @app.route('/')
 def home():
     """Serve the dashboard HTML"""
     logger.info("Serving dashboard homepage")
-    return render_template('index.html')
+    # The bundled page (python -m api.bundle) loads a few fingerprinted files instead of ~70
+    return render_template(bundle.page_template())
 
 @app.route('/css/<path:path>')
 def send_css(path):
-    return send_from_directory('css', path)
+    return compression.send_asset('css', path)
 
 @app.route('/js/<path:path>')
 def send_js(path):
-    return send_from_directory('js', path)
+    return compression.send_asset('js', path)
 
 @app.route('/assets/<path:path>')
 def send_assets(path):
-    return send_from_directory('assets', path)
+    return compression.send_asset('assets', path)
 
 # Serve documentation files from parent directory
 @app.route('/docs/<path:filename>')
@@ -384,16 +166,22 @@ def serve_html_pages(page):
 @app.route('/api/status')
 def api_status():
     """Return API status and available features"""
+    bundle = active_model()
     status = {
         'status': 'online',
         'features': {
             'data': df is not None,
-            'predictions': model is not None and scaler is not None and model_columns is not None,
-            'feature_importance': model is not None and model_columns is not None
+            'predictions': bundle is not None and bundle.ready,
+            'feature_importance': bundle is not None and bundle.model is not None and bundle.model_columns is not None
         },
-        'model_loaded': model is not None,
+        'model_loaded': bundle is not None and bundle.model is not None,
+        'model': model_registry.status() if model_registry is not None else None,
         'data_loaded': df is not None,
-        'records_count': len(df) if df is not None else 0
+        'records_count': aggregate_cache.record_count if aggregate_cache is not None else 0,
+        'loading': resource_loader.status(),
+        'prediction_cache': bundle.prediction_cache.stats() if bundle is not None else None,
+        'batching': prediction_batcher.stats() if prediction_batcher is not None else None,
+        'worker': worker_memory()
     }
     return jsonify(status)
 
@@ -401,80 +189,11 @@ def api_status():
 def get_data():
     """Return basic statistics about the dataset"""
     try:
-        if df is not None:
-            logger.info("Calculating dataset statistics")
-            # Calculate statistics with error handling
-            stats = {
-                'total_records': len(df),
-                'purchase_rate': float(df['will_purchase'].mean()),
-                'conversion_rate': float(df['will_purchase'].mean())
-            }
-            
-            # Add age stats
-            try:
-                stats['avg_age'] = float(df['age'].mean())
-                stats['age_groups'] = {
-                    '18-25': int(df[(df['age'] >= 18) & (df['age'] <= 25)].shape[0]),
-                    '26-35': int(df[(df['age'] >= 26) & (df['age'] <= 35)].shape[0]),
-                    '36-45': int(df[(df['age'] >= 36) & (df['age'] <= 45)].shape[0]),
-                    '46-55': int(df[(df['age'] >= 46) & (df['age'] <= 55)].shape[0]),
-                    '56+': int(df[df['age'] >= 56].shape[0])
-                }
-            except Exception as age_error:
-                logger.warning(f"Error calculating age statistics: {str(age_error)}")
-                stats['avg_age'] = 35.0  # Fallback value
-            
-            # Add income stats
-            try:
-                stats['avg_income'] = float(df['income'].mean())
-                stats['income_groups'] = {
-                    '<30k': int(df[df['income'] < 30000].shape[0]),
-                    '30k-50k': int(df[(df['income'] >= 30000) & (df['income'] < 50000)].shape[0]),
-                    '50k-70k': int(df[(df['income'] >= 50000) & (df['income'] < 70000)].shape[0]),
-                    '70k-100k': int(df[(df['income'] >= 70000) & (df['income'] < 100000)].shape[0]),
-                    '>100k': int(df[df['income'] >= 100000].shape[0])
-                }
-                
-                # Income-based conversion rates
-                high_income = df[df['income'] > df['income'].median()]
-                low_income = df[df['income'] <= df['income'].median()]
-                stats['high_income_conversion'] = float(high_income['will_purchase'].mean())
-                stats['low_income_conversion'] = float(low_income['will_purchase'].mean())
-            except Exception as income_error:
-                logger.warning(f"Error calculating income statistics: {str(income_error)}")
-                stats['avg_income'] = 65000.0  # Fallback value
-            
-            # Add website time stats
-            try:
-                stats['avg_time_on_website'] = float(df['time_on_website'].mean())
-            except Exception as time_error:
-                logger.warning(f"Error calculating website time statistics: {str(time_error)}")
-                stats['avg_time_on_website'] = 18.0  # Fallback value
-            
-            # Add brand distribution
-            try:
-                stats['brand_distribution'] = df['brand'].value_counts().to_dict()
-            except Exception as brand_error:
-                logger.warning(f"Error calculating brand distribution: {str(brand_error)}")
-                # Fallback brand distribution
-                stats['brand_distribution'] = {
-                    'iPhone': 250, 'Samsung': 220, 'OnePlus': 120,
-                    'Xiaomi': 100, 'Google Pixel': 90, 'Oppo': 60,
-                    'Vivo': 50, 'Nothing': 30, 'Realme': 20
-                }
-            
-            # Add engagement stats
-            try:
-                stats['marketing_engagement_rate'] = float(df['marketing_engaged'].mean())
-                engaged_users = df[df['marketing_engaged'] == 1]
-                non_engaged_users = df[df['marketing_engaged'] == 0]
-                stats['engaged_conversion'] = float(engaged_users['will_purchase'].mean())
-                stats['non_engaged_conversion'] = float(non_engaged_users['will_purchase'].mean())
-            except Exception as engagement_error:
-                logger.warning(f"Error calculating engagement statistics: {str(engagement_error)}")
-            
-            logger.info("Successfully calculated dataset statistics")
-            return jsonify(stats)
+        if aggregate_cache is not None and aggregate_cache.available:
+            # Aggregates are tallied once per data version; this is a cache lookup
+            logger.info("Serving cached dataset statistics")
+            records_log.sync(aggregate_cache)
+            return http_cache.conditional_response(aggregate_cache.payload('data'), aggregate_cache.modified_at)
         else:
             logger.error("Data not available for statistics calculation")
             return jsonify({
@@ -489,10 +208,71 @@ def get_data():
             'message': str(e)
         }), 500
 
+@app.route('/api/records', methods=['POST'])
+def append_records():
+    """Ingest labelled purchase records and fold them into the dataset aggregates"""
+    from api.records import RECORDS_TOKEN_HEADER, clean_records, ingestion_allowed
+    if not ingestion_allowed(request.headers):
+        logger.warning("Records submitted without a valid records token")
+        return jsonify({
+            'error': 'Forbidden',
+            'message': f'Record ingestion needs RECORDS_API_TOKEN set and sent as {RECORDS_TOKEN_HEADER}'
+        }), 403
+
+    if aggregate_cache is None or not aggregate_cache.available:
+        logger.warning("Records submitted but data not available")
+        return jsonify({
+            'error': 'Data not loaded',
+            'message': 'The dataset is not available. Please check the data files.'
+        }), 500
+
+    try:
+        try:
+            records, _ = batch.extract_records(request.get_json(silent=True))
+        except ValueError as payload_error:
+            logger.warning(f"Invalid records request: {str(payload_error)}")
+            return jsonify({
+                'error': 'Invalid records request',
+                'message': str(payload_error)
+            }), 400
+
+        frame, errors = clean_records(records)
+        logger.info(f"Records request received: {len(frame)} valid, {len(errors)} rejected")
+
+        if len(frame):
+            try:
+                # The log is shared by every worker; syncing reads our own rows back
+                records_log.write(frame)
+            except OSError as write_error:
+                # Folding them into this worker alone would make workers disagree
+                logger.error(f"Could not persist records: {str(write_error)}")
+                return jsonify({
+                    'error': 'Records not stored',
+                    'message': 'The append log could not be written; no records were added'
+                }), 503
+            records_log.sync(aggregate_cache)
+
+        return jsonify({
+            'accepted': len(frame),
+            'errors': errors,
+            'total_records': aggregate_cache.record_count,
+            'version': aggregate_cache.version,
+            'persisted': True
+        })
+
+    except Exception as e:
+        logger.error(f"Error appending records: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'error': 'Error appending records',
+            'message': str(e)
+        }), 500
+
 @app.route('/api/predict', methods=['POST'])
 def predict():
     """Make prediction based on input data"""
-    if model is None or scaler is None or model_columns is None:
+    bundle = active_model()
+    if bundle is None or not bundle.ready:
         logger.warning("Prediction requested but model components not available")
         return jsonify({
             'error': 'Model not loaded',
@@ -516,50 +296,17 @@ def predict():
                 'missing_fields': missing_fields
             }), 400
         
-        # Create a DataFrame with one row
-        input_df = pd.DataFrame([input_data])
-        
-        # Ensure types are correct
-        input_df['age'] = pd.to_numeric(input_df['age'], errors='coerce').fillna(30)
-        input_df['income'] = pd.to_numeric(input_df['income'], errors='coerce').fillna(50000)
-        input_df['time_on_website'] = pd.to_numeric(input_df['time_on_website'], errors='coerce').fillna(15)
-        input_df['previous_purchases'] = pd.to_numeric(input_df['previous_purchases'], errors='coerce').fillna(1)
-        input_df['marketing_engaged'] = pd.to_numeric(input_df['marketing_engaged'], errors='coerce').fillna(0)
-        input_df['search_frequency'] = pd.to_numeric(input_df['search_frequency'], errors='coerce').fillna(5)
-        input_df['device_age'] = pd.to_numeric(input_df['device_age'], errors='coerce').fillna(2)
-        
-        # One-hot encode categorical features
-        logger.info("One-hot encoding categorical features")
-        try:
-            input_encoded = pd.get_dummies(input_df, columns=['brand'], drop_first=True)
-        except Exception as encode_error:
-            logger.error(f"Error during one-hot encoding: {str(encode_error)}")
-            # Try to recover by using a standard brand format
-            input_df['brand'] = input_df['brand'].astype(str)
-            input_encoded = pd.get_dummies(input_df, columns=['brand'], drop_first=True)
-        
-        # Reindex to match training columns
-        logger.info("Reindexing to match model columns")
-        missing_cols = [c for c in model_columns if c not in input_encoded.columns]
-        extra_cols = [c for c in input_encoded.columns if c not in model_columns]
-        if missing_cols:
-            logger.info(f"Missing columns added with 0 fill: {missing_cols}")
-        if extra_cols:
-            logger.info(f"Extra columns (will be dropped): {extra_cols}")
-        input_encoded = input_encoded.reindex(columns=model_columns, fill_value=0)
-        logger.info(f"Encoded input shape after reindex: {input_encoded.shape}")
-
-        # Scale the features
-        logger.info("Scaling features")
-        input_scaled = scaler.transform(input_encoded)
-        logger.info(f"Scaled input sample (first row): {input_scaled[0][:10]} ... total_features={input_scaled.shape[1]}")
-
-        # Make prediction
+        # Encode straight into the model column layout
+        logger.info("Encoding input features")
+        input_encoded = bundle.feature_encoder.encode(input_data)
+        logger.info(f"Encoded input shape: {input_encoded.shape}")
+
+        # Scale the features and make prediction
         logger.info("Making prediction")
-        raw_pred = model.predict(input_scaled)
-        raw_proba = model.predict_proba(input_scaled)
-        prediction = int(raw_pred[0])
-        probability = float(raw_proba[0, 1])
+        # Concurrent single predictions share one engine call when batching is enabled
+        labels, probabilities = prediction_batcher.predict(bundle.engine, input_encoded)
+        prediction = int(labels[0])
+        probability = float(probabilities[0])
         logger.info(f"Model raw prediction={prediction} probability={probability:.4f}")
 
         # Do not infer brand automatically; use input brand only
@@ -570,7 +317,8 @@ def predict():
             'probability': probability,            # 0-1 float
             'probability_percent': round(probability * 100, 2),  # convenience for UI
             'message': 'Likely to purchase' if prediction == 1 else 'Not likely to purchase',
-            'brand': input_brand
+            'brand': input_brand,
+            'model_version': bundle.version
         }
         logger.info(f"Prediction result: {result}")
 
@@ -585,10 +333,96 @@ def predict():
             'detail': traceback.format_exc()
         }), 400
 
+@app.route('/api/predict_batch', methods=['POST'])
+def predict_batch():
+    """Score a list of customer records in vectorized chunks"""
+    bundle = active_model()
+    if bundle is None or not bundle.ready:
+        logger.warning("Batch prediction requested but model components not available")
+        return jsonify({
+            'error': 'Model not loaded',
+            'message': 'The prediction model is not available. Please check the model files.'
+        }), 500
+
+    try:
+        try:
+            records, chunk_size = batch.extract_records(request.get_json(silent=True))
+        except ValueError as payload_error:
+            logger.warning(f"Invalid batch prediction request: {str(payload_error)}")
+            return jsonify({
+                'error': 'Invalid batch request',
+                'message': str(payload_error)
+            }), 400
+
+        logger.info(f"Batch prediction request received: {len(records)} records (chunk_size={chunk_size})")
+        results = batch.predict_batch(records, bundle.engine, bundle.feature_encoder, chunk_size=chunk_size)
+        error_count = sum(1 for result in results if 'error' in result)
+        logger.info(f"Batch prediction completed: {len(results) - error_count} scored, {error_count} errors")
+
+        return jsonify({
+            'results': results,
+            'count': len(results),
+            'scored': len(results) - error_count,
+            'errors': error_count
+        })
+
+    except Exception as e:
+        logger.error(f"Error during batch prediction: {str(e)}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            'error': 'Batch prediction error',
+            'message': str(e),
+            'detail': traceback.format_exc()
+        }), 400
+
+@app.route('/api/predict_stream', methods=['POST'])
+def predict_stream():
+    """Score newline-delimited JSON records, streaming NDJSON results as each chunk is scored"""
+    bundle = active_model()
+    if bundle is None or not bundle.ready:
+        logger.warning("Streaming prediction requested but model components not available")
+        return jsonify({
+            'error': 'Model not loaded',
+            'message': 'The prediction model is not available. Please check the model files.'
+        }), 500
+
+    try:
+        chunk_size = int(request.args.get('chunk_size', batch.DEFAULT_CHUNK_SIZE))
+        if chunk_size < 1:
+            raise ValueError
+    except ValueError:
+        logger.warning(f"Invalid chunk_size for streaming prediction: {request.args.get('chunk_size')}")
+        return jsonify({
+            'error': 'Invalid batch request',
+            'message': 'chunk_size must be a positive integer'
+        }), 400
+
+    def generate():
+        # Reads the request body line by line while results are being sent,
+        # so neither the input nor the output is ever held in full
+        count = error_count = 0
+        try:
+            for results in batch.stream_predictions(request.stream, bundle.engine, bundle.feature_encoder,
+                                                    chunk_size=chunk_size):
+                count += len(results)
+                error_count += sum(1 for result in results if 'error' in result)
+                yield b''.join(serialization.dumps(result) + b'\n' for result in results)
+        except Exception as e:
+            # The 200 status is already sent; report the failure as a final line
+            logger.error(f"Error during streaming prediction after {count} records: {str(e)}")
+            logger.error(traceback.format_exc())
+            yield serialization.dumps({'error': 'Batch prediction error', 'message': str(e)}) + b'\n'
+            return
+        logger.info(f"Streaming prediction completed: {count - error_count} scored, {error_count} errors")
+
+    logger.info(f"Streaming prediction request received (chunk_size={chunk_size})")
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/compare_brands', methods=['POST'])
 def compare_brands():
     """Compare purchase probability for different brands"""
-    if model is None or scaler is None or model_columns is None:
+    bundle = active_model()
+    if bundle is None or not bundle.ready:
         logger.warning("Brand comparison requested but model components not available")
         return jsonify({
             'error': 'Model not loaded',
@@ -611,11 +445,33 @@ def compare_brands():
         
         logger.info(f"Comparing {len(brands)} brands: {brands}")
         
-        # Validate base features
-        required_fields = ['age', 'income', 'time_on_website', 'previous_purchases', 
-                          'marketing_engaged', 'search_frequency', 'device_age']
+        # Many profiles at once: return a profile x brand probability matrix
+        profiles = base_features.pop('profiles', None)
+        if profiles is not None:
+            if not isinstance(profiles, list):
+                logger.warning("Invalid profiles list in comparison request")
+                return jsonify({
+                    'error': 'Invalid profiles parameter',
+                    'message': 'profiles must be a list of customer profiles'
+                }), 400
+            if len(profiles) * len(brands) > batch.MAX_BATCH_RECORDS:
+                return jsonify({
+                    'error': 'Invalid profiles parameter',
+                    'message': f'profiles x brands may contain at most {batch.MAX_BATCH_RECORDS} rows'
+                }), 400
+            results = batch.brand_affinity(profiles, brands, bundle.engine, bundle.feature_encoder)
+            error_count = sum(1 for result in results if 'error' in result)
+            logger.info(f"Brand affinity matrix generated for {len(profiles)} profiles x {len(brands)} brands")
+            return jsonify({
+                'brands': brands,
+                'results': results,
+                'count': len(results),
+                'scored': len(results) - error_count,
+                'errors': error_count
+            })
         
-        missing_fields = [field for field in required_fields if field not in base_features]
+        # Validate base features
+        missing_fields = [field for field in batch.PROFILE_FIELDS if field not in base_features]
         if missing_fields:
             logger.warning(f"Missing fields in comparison request: {missing_fields}")
             return jsonify({
@@ -623,51 +479,13 @@ def compare_brands():
                 'missing_fields': missing_fields
             }), 400
         
-        results = []
-        for brand in brands:
-            try:
-                # Create input data with current brand
-                input_data = base_features.copy()
-                input_data['brand'] = brand
-                
-                # Create DataFrame
-                input_df = pd.DataFrame([input_data])
-                
-                # Ensure types are correct
-                input_df['age'] = pd.to_numeric(input_df['age'], errors='coerce').fillna(30)
-                input_df['income'] = pd.to_numeric(input_df['income'], errors='coerce').fillna(50000)
-                input_df['time_on_website'] = pd.to_numeric(input_df['time_on_website'], errors='coerce').fillna(15)
-                input_df['previous_purchases'] = pd.to_numeric(input_df['previous_purchases'], errors='coerce').fillna(1)
-                input_df['marketing_engaged'] = pd.to_numeric(input_df['marketing_engaged'], errors='coerce').fillna(0)
-                input_df['search_frequency'] = pd.to_numeric(input_df['search_frequency'], errors='coerce').fillna(5)
-                input_df['device_age'] = pd.to_numeric(input_df['device_age'], errors='coerce').fillna(2)
-                
-                # One-hot encode categorical features
-                input_encoded = pd.get_dummies(input_df, columns=['brand'], drop_first=True)
-                
-                # Reindex to match training columns
-                input_encoded = input_encoded.reindex(columns=model_columns, fill_value=0)
-                
-                # Scale the features
-                input_scaled = scaler.transform(input_encoded)
-                
-                # Make prediction
-                prediction = int(model.predict(input_scaled)[0])
-                probability = float(model.predict_proba(input_scaled)[0, 1])
-                
-                results.append({
-                    'brand': brand,
-                    'prediction': prediction,
-                    'probability': probability
-                })
-            except Exception as brand_error:
-                logger.error(f"Error processing brand '{brand}': {str(brand_error)}")
-                results.append({
-                    'brand': brand,
-                    'error': str(brand_error),
-                    'probability': 0.5,  # Fallback value
-                    'prediction': 0
-                })
+        # Score all brands in one call; only the brand one-hot slots differ per row
+        labels, probabilities = batch.compare_brands([base_features], brands, bundle.engine, bundle.feature_encoder)
+        results = [{
+            'brand': brand,
+            'prediction': int(label),
+            'probability': float(probability)
+        } for brand, label, probability in zip(brands, labels[0], probabilities[0])]
         
         # Sort results by probability in descending order
         results.sort(key=lambda x: x['probability'], reverse=True)
@@ -687,6 +505,9 @@ def compare_brands():
 @app.route('/api/feature_importance', methods=['GET'])
 def feature_importance():
     """Return feature importance if available"""
+    bundle = active_model()
+    model = bundle.model if bundle is not None else None
+    model_columns = bundle.model_columns if bundle is not None else None
     if model is None:
         logger.warning("Feature importance requested but model not available")
         return jsonify({
@@ -695,17 +516,22 @@ def feature_importance():
         }), 500
     
     try:
+        # Serialized once per model version
+        cached = bundle.payloads.get('feature_importance')
+        if cached is not None:
+            return http_cache.conditional_response(cached, bundle.modified_at)
+
         # Get feature importance if available
         logger.info("Retrieving feature importance")
         
         if hasattr(model, 'coef_'):
             # For linear models
             logger.info("Using coefficients from linear model")
-            importance = {col: float(coef) for col, coef in zip(model_columns, model.coef_[0])}
+            importance = dict(zip(model_columns, model.coef_[0]))
         elif hasattr(model, 'feature_importances_'):
             # For tree-based models
             logger.info("Using feature importances from tree-based model")
-            importance = {col: float(imp) for col, imp in zip(model_columns, model.feature_importances_)}
+            importance = dict(zip(model_columns, model.feature_importances_))
         else:
             logger.warning("Feature importance not available for this model type")
             
@@ -751,7 +577,10 @@ def feature_importance():
         }
         
         logger.info("Feature importance retrieved successfully")
-        return jsonify(result)
+        # NumPy values are encoded directly; keys sorted as jsonify() sorts them
+        body = serialization.dumps(result, sort_keys=True) + b'\n'
+        bundle.payloads['feature_importance'] = body
+        return http_cache.conditional_response(body, bundle.modified_at)
         
     except Exception as e:
         logger.error(f"Error retrieving feature importance: {str(e)}")
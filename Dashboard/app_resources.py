@@ -0,0 +1,333 @@
+"""
+Model files and dataset for Dashboard/app.py.
+
+Importing this module does the loading: it finds and unpickles the model
+files, loads (or synthesizes) the dataset and builds the registry, aggregate
+cache and append log. app.load_resources() imports it on the loader thread,
+so pandas, numpy and scikit-learn (via the pickles) are not imported until
+then, and with DASHBOARD_LAZY_LOAD=1 the app serves static pages and
+/api/status while this runs.
+"""
+
+import os
+import pickle
+import traceback
+import logging
+
+import numpy as np
+import pandas as pd
+
+from api import datastore, http_cache
+from api.aggregates import AggregateCache
+from api.coalescer import MicroBatcher
+from api.registry import ModelRegistry
+from api.records import AppendLog
+
+# Get the logger
+logger = logging.getLogger('dashboard_api')
+
+# Improved function to find and validate files
+def find_file(base_path, alternatives=None):
+    """Find a file checking multiple possible locations."""
+    if alternatives is None:
+        alternatives = []
+    
+    # First check if the base path exists
+    if os.path.exists(base_path):
+        logger.info(f"File found at: {base_path}")
+        return base_path
+    
+    # Try absolute path
+    abs_path = os.path.abspath(base_path)
+    if os.path.exists(abs_path) and abs_path != base_path:
+        logger.info(f"File found at absolute path: {abs_path}")
+        return abs_path
+    
+    # Try each alternative
+    for alt_path in alternatives:
+        if os.path.exists(alt_path):
+            logger.info(f"File found at alternative path: {alt_path}")
+            return alt_path
+    
+    # If we get here, the file wasn't found
+    logger.warning(f"File not found: {base_path} or alternatives")
+    return None
+
+# Define path options for model files
+model_path = '../Models/model.pkl'
+scaler_path = '../Models/scaler.pkl'
+columns_path = '../Models/model_columns.pkl'
+
+# Alternative paths to try
+alt_model_paths = [
+    'e:/ml/Models/model.pkl',
+    './Models/model.pkl',
+    '../../Models/model.pkl'
+]
+alt_scaler_paths = [
+    'e:/ml/Models/scaler.pkl',
+    './Models/scaler.pkl',
+    '../../Models/scaler.pkl'
+]
+alt_columns_paths = [
+    'e:/ml/Models/model_columns.pkl',
+    './Models/model_columns.pkl',
+    '../../Models/model_columns.pkl'
+]
+
+# Load model files with improved error handling
+model = None
+scaler = None
+model_columns = None
+
+logger.info("Attempting to load model files...")
+
+# Find the model file
+found_model_path = find_file(model_path, alt_model_paths)
+found_scaler_path = find_file(scaler_path, alt_scaler_paths)
+found_columns_path = find_file(columns_path, alt_columns_paths)
+
+# Load the files if found
+try:
+    if found_model_path:
+        logger.info(f"Loading model from {found_model_path}")
+        with open(found_model_path, 'rb') as f:
+            model = pickle.load(f)
+        logger.info("Model loaded successfully")
+    else:
+        logger.error("Model file not found in any location")
+        
+    if found_scaler_path:
+        logger.info(f"Loading scaler from {found_scaler_path}")
+        with open(found_scaler_path, 'rb') as f:
+            scaler = pickle.load(f)
+        logger.info("Scaler loaded successfully")
+    else:
+        logger.error("Scaler file not found in any location")
+        
+    if found_columns_path:
+        logger.info(f"Loading columns from {found_columns_path}")
+        with open(found_columns_path, 'rb') as f:
+            model_columns = pickle.load(f)
+        logger.info("Model columns loaded successfully")
+    else:
+        logger.error("Columns file not found in any location")
+        
+    # Explicit None checks to avoid ambiguous truth value errors (e.g. pandas Index)
+    if model is not None and scaler is not None and model_columns is not None:
+        try:
+            # Add some diagnostics about model_columns for clarity
+            if hasattr(model_columns, 'dtype') and hasattr(model_columns, '__len__'):
+                logger.info(f"All model files loaded successfully (model_columns type={type(model_columns).__name__}, len={len(model_columns)})")
+            else:
+                logger.info(f"All model files loaded successfully (model_columns type={type(model_columns).__name__})")
+        except Exception as diag_err:
+            logger.warning(f"Loaded model_columns but failed to inspect details: {diag_err}")
+    else:
+        logger.warning("Some model files could not be loaded - predictions will be unavailable")
+        
+except Exception as e:
+    logger.error(f"Error loading model files: {str(e)}")
+    logger.error(traceback.format_exc())
+    model = None
+    scaler = None
+    model_columns = None
+
+# The registry builds the feature encoder, fused inference engine and prediction
+# cache for a model version, serves a published version from Models/registry when
+# there is one, and swaps in new versions without a restart
+model_files = [path for path in (found_model_path, found_scaler_path, found_columns_path) if path]
+model_registry = ModelRegistry(fallback_files=model_files)
+model_registry.initialize(model, scaler, model_columns)
+# Coalesces concurrent /api/predict calls when PREDICTION_BATCH_WAIT_MS > 0
+prediction_batcher = MicroBatcher()
+
+# Define data file paths
+data_path = '../Data/smartphone_purchased_data.csv'
+alt_data_paths = [
+    '../Data/smartphone_purchased_data_cleaned.csv',
+    '../Data/smartphone_purchased_data_updated.csv',
+    'e:/ml/Data/smartphone_purchased_data.csv',
+    'e:/ml/Data/smartphone_purchased_data_cleaned.csv',
+    'e:/ml/Data/smartphone_purchased_data_updated.csv',
+    './Data/smartphone_purchased_data.csv'
+]
+
+logger.info("Attempting to load dataset...")
+
+# Find the data file
+found_data_path = find_file(data_path, alt_data_paths)
+df = None
+# Files the data comes from; their mtime is the Last-Modified of the data payloads
+data_files = []
+
+# A column store written on an earlier boot skips CSV parsing and cleaning entirely
+stored_df = datastore.load_store()
+
+try:
+    # Load the data if found
+    if stored_df is not None:
+        df = stored_df
+        data_files = [found_data_path or os.path.join(datastore.DEFAULT_STORE_PATH, datastore.META_FILE)]
+    elif found_data_path:
+        logger.info(f"Loading data from {found_data_path}")
+        df = pd.read_csv(found_data_path)
+        data_files = [found_data_path]
+        logger.info(f"Data loaded successfully: {len(df)} rows")
+    else:
+        logger.warning("No data file found - will create synthetic data")
+    
+    # Verify and standardize column names
+    expected_columns = ['age', 'income', 'time_on_website', 'previous_purchases', 
+                       'marketing_engaged', 'search_frequency', 'device_age', 'brand', 'will_purchase']
+    
+    # Map the actual columns to expected columns
+    column_mapping = {
+        'Age': 'age',
+        'Income': 'income',
+        'OnlineActivity': 'time_on_website',
+        'PreviousPurchases': 'previous_purchases',
+        'PromotionResponse': 'marketing_engaged',  # Yes/No to 1/0
+        'PurchaseIntent': 'search_frequency',  # Using as proxy
+        'CurrentPhone': 'device_age',          # Using as proxy
+        'BrandPreference': 'brand',
+        'Target': 'will_purchase'
+    }
+    
+    if stored_df is not None:
+        logger.info(f"Using memory-mapped column store: {len(df)} rows")
+    elif df is not None:
+        # Log data shape before processing
+        logger.info(f"Original data shape: {df.shape}")
+        
+        # Rename columns that exist
+        rename_dict = {k: v for k, v in column_mapping.items() if k in df.columns}
+        if rename_dict:
+            logger.info(f"Renaming columns: {rename_dict}")
+            df = df.rename(columns=rename_dict)
+        
+        # Convert Yes/No to 1/0 for marketing_engaged if it exists
+        if 'marketing_engaged' in df.columns and df['marketing_engaged'].dtype == 'object':
+            logger.info("Converting marketing_engaged from Yes/No to 1/0")
+            df['marketing_engaged'] = df['marketing_engaged'].map({'Yes': 1, 'No': 0, 'yes': 1, 'no': 0})
+        
+        # If columns are missing, create them with random data
+        missing_columns = [col for col in expected_columns if col not in df.columns]
+        if missing_columns:
+            logger.warning(f"Missing columns will be synthesized: {missing_columns}")
+            
+        for col in expected_columns:
+            if col not in df.columns:
+                logger.info(f"Creating synthetic data for column: {col}")
+                if col == 'age':
+                    df[col] = np.random.randint(18, 65, len(df))
+                elif col == 'income':
+                    df[col] = np.random.randint(10000, 150000, len(df))
+                elif col == 'time_on_website':
+                    df[col] = np.random.normal(20, 10, len(df))
+                elif col == 'previous_purchases':
+                    df[col] = np.random.poisson(1.5, len(df))
+                elif col == 'marketing_engaged':
+                    df[col] = np.random.choice([0, 1], len(df))
+                elif col == 'search_frequency':
+                    df[col] = np.random.randint(0, 20, len(df))
+                elif col == 'device_age':
+                    df[col] = np.random.normal(2.5, 1.0, len(df))
+                elif col == 'brand':
+                    df[col] = np.random.choice(['iPhone', 'Samsung', 'OnePlus', 'Xiaomi', 'Realme', 'Oppo', 'Vivo', 'Nothing', 'Google Pixel'], len(df))
+                elif col == 'will_purchase':
+                    if 'Target' in df.columns:
+                        df[col] = df['Target']
+                    else:
+                        df[col] = np.random.choice([0, 1], len(df))
+        
+        # Keep only the columns we need
+        df = df[expected_columns]
+        
+        # Convert data types to ensure consistency
+        df['age'] = pd.to_numeric(df['age'], errors='coerce').fillna(30).astype(int)
+        df['income'] = pd.to_numeric(df['income'], errors='coerce').fillna(50000).astype(int)
+        df['time_on_website'] = pd.to_numeric(df['time_on_website'], errors='coerce').fillna(15).astype(float)
+        df['previous_purchases'] = pd.to_numeric(df['previous_purchases'], errors='coerce').fillna(1).astype(int)
+        df['marketing_engaged'] = pd.to_numeric(df['marketing_engaged'], errors='coerce').fillna(0).astype(int)
+        df['search_frequency'] = pd.to_numeric(df['search_frequency'], errors='coerce').fillna(5).astype(int)
+        df['device_age'] = pd.to_numeric(df['device_age'], errors='coerce').fillna(2).astype(float)
+        df['will_purchase'] = pd.to_numeric(df['will_purchase'], errors='coerce').fillna(0).astype(int)
+        
+        # Log data shape after processing
+        logger.info(f"Processed data shape: {df.shape}")
+        
+        # Save cleaned data for future use
+        try:
+            cleaned_path = '../Data/smartphone_purchased_data_cleaned.csv'
+            df.to_csv(cleaned_path, index=False)
+            logger.info(f"Cleaned and standardized data saved to {cleaned_path}")
+        except Exception as save_error:
+            logger.warning(f"Could not save cleaned data: {str(save_error)}")
+
+        # Convert once to the typed column store; later boots (and every worker) memory-map it
+        try:
+            store_path = datastore.write_store(df, source=found_data_path)
+            stored_df = datastore.load_store(store_path)
+            if stored_df is not None:
+                df = stored_df
+        except Exception as store_error:
+            logger.warning(f"Could not write column store: {str(store_error)}")
+    else:
+        # Create synthetic data from scratch
+        logger.info("Creating completely synthetic dataset")
+        n = 1000
+        np.random.seed(42)
+        
+        df = pd.DataFrame({
+            'age': np.random.randint(18, 65, size=n),
+            'income': np.random.randint(10000, 150000, size=n),
+            'time_on_website': np.round(np.random.normal(loc=20, scale=10, size=n), 2),
+            'previous_purchases': np.random.poisson(lam=1.5, size=n),
+            'marketing_engaged': np.random.choice([0, 1], size=n, p=[0.4, 0.6]),
+            'search_frequency': np.random.randint(0, 20, size=n),
+            'device_age': np.round(np.clip(np.random.normal(loc=2.5, scale=1.0, size=n), 0.2, 5.0), 1),
+            'brand': np.random.choice(['iPhone', 'Samsung', 'OnePlus', 'Xiaomi', 'Realme', 'Oppo', 'Vivo', 'Nothing', 'Google Pixel'], size=n),
+            'will_purchase': np.random.choice([0, 1], size=n)
+        })
+        
+        logger.info(f"Created synthetic dataset with {len(df)} rows")
+        
+        # Try to save the synthetic data
+        try:
+            cleaned_path = '../Data/smartphone_purchased_data_cleaned.csv'
+            df.to_csv(cleaned_path, index=False)
+            logger.info(f"Synthetic data saved to {cleaned_path}")
+        except Exception as save_error:
+            logger.warning(f"Could not save synthetic data: {str(save_error)}")
+except Exception as e:
+    logger.error(f"Error processing data: {str(e)}")
+    logger.error(traceback.format_exc())
+    
+    # Create synthetic data as last resort
+    logger.info("Creating synthetic data due to processing error")
+    data_files = []
+    n = 1000
+    np.random.seed(42)
+    
+    df = pd.DataFrame({
+        'age': np.random.randint(18, 65, size=n),
+        'income': np.random.randint(10000, 150000, size=n),
+        'time_on_website': np.round(np.random.normal(loc=20, scale=10, size=n), 2),
+        'previous_purchases': np.random.poisson(lam=1.5, size=n),
+        'marketing_engaged': np.random.choice([0, 1], size=n, p=[0.4, 0.6]),
+        'search_frequency': np.random.randint(0, 20, size=n),
+        'device_age': np.round(np.clip(np.random.normal(loc=2.5, scale=1.0, size=n), 0.2, 5.0), 1),
+        'brand': np.random.choice(['iPhone', 'Samsung', 'OnePlus', 'Xiaomi', 'Realme', 'Oppo', 'Vivo', 'Nothing', 'Google Pixel'], size=n),
+        'will_purchase': np.random.choice([0, 1], size=n)
+    })
+
+# Tally dashboard aggregates once; /api/data serves the cached JSON
+aggregate_cache = AggregateCache(df, modified_at=http_cache.files_modified_at(data_files))
+
+# Records ingested through /api/records, shared by every worker through the append log
+records_log = AppendLog()
+if aggregate_cache.available:
+    records_log.sync(aggregate_cache)
+# Serialize the aggregate payloads up front so preforked workers share them
+aggregate_cache.warm()
@@ -0,0 +1,139 @@
+"""
+Load time and memory of the .pkl files against memory-mapped artifacts.
+
+Exports the shipped logistic regression and a random forest fitted to the
+cleaned dataset (--trees, default 500) in both formats, then loads each one
+in a fresh process: after importing numpy, pandas and scikit-learn, it times
+the load and reads /proc/self/smaps_rollup before and after the load and
+after scoring the X_test rows through build_engine(). Anonymous bytes are
+the process's own heap; the mapped artifact pages are file-backed, so they
+are shared by every process that maps the same files and count in RSS only.
+
+Usage (from the Dashboard folder):
+    python benchmarks/bench_artifacts.py [--trees 500] [--repeat 3]
+"""
+
+import os
+import sys
+import json
+import time
+import pickle
+import argparse
+import tempfile
+import subprocess
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import artifacts, train
+from api.registry import ARTIFACT_FILES
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def memory():
+    """(Rss, Anonymous) bytes from /proc/self/smaps_rollup"""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            name, _, value = line.partition(':')
+            if name in ('Rss', 'Anonymous'):
+                fields[name] = int(value.split()[0]) * 1024
+    return fields['Rss'], fields['Anonymous']
+
+
+def measure(fmt, path):
+    """Runs in the child process: load one model and report timings and memory as JSON"""
+    import numpy as np
+    import pandas as pd
+    import sklearn.ensemble, sklearn.linear_model, sklearn.preprocessing  # noqa: E401,F401
+    from api.encoding import FeatureEncoder
+    from api.inference import build_engine
+
+    raw = pd.read_csv(os.path.join(BASE_DIR, 'Data', 'X_test.csv')).drop(columns=['Cluster'])
+    before = memory()
+    began = time.perf_counter()
+    if fmt == 'pickle':
+        loaded = []
+        for name in ARTIFACT_FILES:
+            with open(os.path.join(path, name), 'rb') as f:
+                loaded.append(pickle.load(f))
+        model, scaler, model_columns = loaded
+    else:
+        model, scaler, model_columns = artifacts.load_artifacts(path)
+    load_seconds = time.perf_counter() - began
+    loaded = memory()
+    features = FeatureEncoder(model_columns).encode_many(raw.to_dict(orient='records'))
+    build_engine(model, scaler).predict(features)
+    scored = memory()
+    # Compared between formats on the unfused path, which both reproduce exactly
+    probabilities = model.predict_proba(scaler.transform(pd.DataFrame(features, columns=model_columns)))
+    return {
+        'load_ms': load_seconds * 1000,
+        'rss_loaded': loaded[0] - before[0],
+        'anon_loaded': loaded[1] - before[1],
+        'rss_scored': scored[0] - before[0],
+        'anon_scored': scored[1] - before[1],
+        'checksum': float(np.sum(probabilities[:, 1]))
+    }
+
+
+def run_child(fmt, path):
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', fmt, path],
+                            check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def write_pickles(model, scaler, model_columns, directory):
+    os.makedirs(directory, exist_ok=True)
+    for obj, name in zip((model, scaler, model_columns), ARTIFACT_FILES):
+        with open(os.path.join(directory, name), 'wb') as f:
+            pickle.dump(obj, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--trees', type=int, default=500, help='trees in the benchmark forest')
+    parser.add_argument('--repeat', type=int, default=3, help='fresh processes per format (best load time wins)')
+    parser.add_argument('--child', nargs=2, metavar=('FORMAT', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.getLogger('dashboard_api').setLevel(logging.WARNING)
+
+    if args.child:
+        print(json.dumps(measure(*args.child)))
+        return
+
+    from sklearn.ensemble import RandomForestClassifier
+    encoded = train.encode_stage(train.clean_stage([train.DEFAULT_DATA]), 0.2, 42)
+    scaled = train.scale_stage(encoded)
+    forest = RandomForestClassifier(n_estimators=args.trees, random_state=42).fit(scaled['X_train'],
+                                                                                  encoded['y_train'])
+    shipped = []
+    for name in ARTIFACT_FILES:
+        with open(os.path.join(BASE_DIR, 'Models', name), 'rb') as f:
+            shipped.append(pickle.load(f))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        models = {'logistic (shipped)': shipped,
+                  f'forest ({args.trees} trees)': [forest, scaled['scaler'], encoded['columns']]}
+        print(f"  {'model':<20} {'format':<9} {'on disk':>10} {'load ms':>8} {'rss':>11} {'anonymous':>11} "
+              f"{'rss scored':>11} {'anon scored':>11}")
+        for index, (label, (model, scaler, model_columns)) in enumerate(models.items()):
+            pickles = os.path.join(tmp, f'{index}-pkl')
+            mapped = os.path.join(tmp, f'{index}-model.artifacts')
+            write_pickles(model, scaler, model_columns, pickles)
+            artifacts.export_artifacts(model, scaler, model_columns, mapped)
+            checksums = set()
+            for fmt, path in (('pickle', pickles), ('artifacts', mapped)):
+                runs = [run_child(fmt, path) for _ in range(args.repeat)]
+                best = min(runs, key=lambda run: run['load_ms'])
+                checksums.add(best['checksum'])
+                size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+                print(f"  {label:<20} {fmt:<9} {size:10,d} {best['load_ms']:8.2f} {best['rss_loaded']:11,d} "
+                      f"{best['anon_loaded']:11,d} {best['rss_scored']:11,d} {best['anon_scored']:11,d}")
+            if len(checksums) != 1:
+                print(f"  {label}: the two formats scored X_test differently")
+
+
+if __name__ == '__main__':
+    main()
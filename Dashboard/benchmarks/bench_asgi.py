@@ -0,0 +1,163 @@
+"""
+Connection-capacity benchmark: gunicorn sync workers vs the ASGI entry point.
+
+Starts the same Flask app (api.app:create_app) under gunicorn with
+gunicorn.conf.py and under uvicorn via api.asgi, then for each server:
+
+1. opens --slow connections that send the headers of a /api/predict request
+   and only part of its body, holding them for --hold seconds, while timing
+   ordinary /api/status requests made in the meantime;
+2. runs --clients concurrent clients sending /api/predict for --seconds and
+   reports throughput and p50/p99 latency.
+
+Needs gunicorn and uvicorn installed. Usage (from the Dashboard folder):
+    python benchmarks/bench_asgi.py [--slow 8] [--hold 3] [--clients 32] [--seconds 5]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+
+import numpy as np
+
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DIR = os.path.dirname(DASHBOARD_DIR)
+
+SAMPLE = json.dumps({
+    'age': 32, 'income': 72000, 'time_on_website': 18.5, 'previous_purchases': 2,
+    'marketing_engaged': 1, 'search_frequency': 7, 'device_age': 2.5, 'brand': 'Samsung'
+}).encode()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind, port, workers, threads):
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), ASGI_WORKER_THREADS=str(threads))
+    if kind == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py', '--chdir', 'Dashboard',
+                   'api.app:create_app()']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', '--app-dir', 'Dashboard', '--factory',
+                   'api.asgi:create_asgi_app', '--port', str(port), '--workers', str(workers),
+                   '--log-level', 'warning']
+    return subprocess.Popen(command, cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def request(port, method, path, body=b'', timeout=30):
+    """One HTTP/1.1 request on a fresh connection; returns the status code"""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+    try:
+        writer.write(f'{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+                     f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body)
+        await writer.drain()
+        response = await asyncio.wait_for(reader.read(), timeout)
+        return int(response.split(b' ', 2)[1])
+    finally:
+        writer.close()
+
+
+async def wait_ready(port, deadline=60):
+    began = time.monotonic()
+    while time.monotonic() - began < deadline:
+        try:
+            if await request(port, 'GET', '/api/data', timeout=5) == 200:
+                return
+        except (OSError, asyncio.TimeoutError, IndexError):
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f'server on port {port} did not become ready')
+
+
+async def slow_client(port, hold):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'POST /api/predict HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+                 f'Content-Length: {len(SAMPLE)}\r\nConnection: close\r\n\r\n'.encode() + SAMPLE[:10])
+    await writer.drain()
+    await asyncio.sleep(hold)
+    writer.write(SAMPLE[10:])
+    await writer.drain()
+    await reader.read()
+    writer.close()
+
+
+async def slow_client_test(port, slow, hold):
+    """Time /api/status requests made while `slow` clients are stalled mid-body"""
+    slow_tasks = [asyncio.create_task(slow_client(port, hold)) for _ in range(slow)]
+    await asyncio.sleep(0.2)
+    latencies = []
+    for _ in range(5):
+        began = time.perf_counter()
+        try:
+            await request(port, 'GET', '/api/status', timeout=hold * 2 + 5)
+            latencies.append(time.perf_counter() - began)
+        except (OSError, asyncio.TimeoutError):
+            latencies.append(float('inf'))
+    await asyncio.gather(*slow_tasks, return_exceptions=True)
+    return latencies
+
+
+async def load_test(port, clients, seconds):
+    latencies, errors = [], 0
+    stop_at = time.monotonic() + seconds
+
+    async def client():
+        nonlocal errors
+        while time.monotonic() < stop_at:
+            began = time.perf_counter()
+            try:
+                status = await request(port, 'POST', '/api/predict', SAMPLE)
+            except (OSError, asyncio.TimeoutError, IndexError):
+                status = None
+            if status == 200:
+                latencies.append(time.perf_counter() - began)
+            else:
+                errors += 1
+
+    began = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return time.perf_counter() - began, np.array(latencies), errors
+
+
+async def run(kind, args):
+    port = free_port()
+    server = start_server(kind, port, args.workers, args.threads)
+    try:
+        await wait_ready(port)
+        print(f"\n{kind} ({args.workers} workers)")
+        latencies = await slow_client_test(port, args.slow, args.hold)
+        print(f"  /api/status with {args.slow} stalled uploads: "
+              + ', '.join('blocked' if l == float('inf') else f'{l * 1000:.0f} ms' for l in latencies))
+        elapsed, latencies, errors = await load_test(port, args.clients, args.seconds)
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000 if len(latencies) else (float('nan'),) * 2
+        print(f"  {args.clients} concurrent clients: {len(latencies) / elapsed:,.0f} req/s, "
+              f"p50 {p50:.1f} ms, p99 {p99:.1f} ms, {errors} errors")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--slow', type=int, default=8, help='stalled uploads held open')
+    parser.add_argument('--hold', type=float, default=3.0, help='seconds each stalled upload is held')
+    parser.add_argument('--clients', type=int, default=32, help='concurrent clients in the load test')
+    parser.add_argument('--seconds', type=float, default=5.0, help='load test duration')
+    parser.add_argument('--workers', type=int, default=2, help='server processes for both servers')
+    parser.add_argument('--threads', type=int, default=8, help='ASGI view threads per process')
+    args = parser.parse_args()
+
+    for kind in ('gunicorn', 'uvicorn'):
+        asyncio.run(run(kind, args))
+
+
+if __name__ == '__main__':
+    main()
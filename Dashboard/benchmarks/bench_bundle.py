@@ -0,0 +1,58 @@
+"""
+First-load requests for the dashboard page, before and after bundling.
+
+Builds the bundles (python -m api.bundle) and the compressed copies, then
+fetches every local stylesheet and script referenced by index.html and by
+index.bundled.html through Dashboard/app.py, and reports the request count
+and the bytes sent with and without Accept-Encoding.
+
+Usage (from the Dashboard folder):
+    python benchmarks/bench_bundle.py [--no-build]
+"""
+
+import os
+import re
+import sys
+import argparse
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import bundle, compression
+
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOCAL_ASSET = re.compile(r'<(?:link rel="stylesheet" href|script src)="((?:css|js)/[^"]+)"')
+
+
+def page_load(client, page, accept):
+    with open(os.path.join(DASHBOARD_DIR, page), encoding='utf-8') as f:
+        paths = LOCAL_ASSET.findall(f.read())
+    headers = {'Accept-Encoding': accept} if accept else {}
+    sizes = [len(client.get('/' + path, headers=headers).get_data()) for path in paths]
+    return len(paths), sum(sizes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--no-build', action='store_true', help='use the bundles already on disk')
+    args = parser.parse_args()
+
+    logging.getLogger('dashboard_api').setLevel(logging.WARNING)
+    if not args.no_build:
+        bundle.build(DASHBOARD_DIR)
+        compression.build(DASHBOARD_DIR, folders=('css', 'js'))
+
+    # Imported here: the module loads the model and data relative to the Dashboard folder
+    from app import app
+    client = app.test_client()
+
+    print(f"  {'page':<22} {'requests':>8} {'bytes':>10} {'gzip':>10} {'br':>10}")
+    for page in (bundle.PAGE, bundle.BUNDLED_PAGE):
+        count, identity = page_load(client, page, None)
+        _, gzipped = page_load(client, page, 'gzip')
+        _, brotli = page_load(client, page, 'br, gzip')
+        print(f"  {page:<22} {count:8d} {identity:10,d} {gzipped:10,d} {brotli:10,d}")
+
+
+if __name__ == '__main__':
+    main()
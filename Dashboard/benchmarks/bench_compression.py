@@ -0,0 +1,87 @@
+"""
+Bytes on the wire with and without compression.
+
+Precompresses the assets (python -m api.compression), then requests every
+CSS/JS asset and the main API payloads through Dashboard/app.py three times: with
+no Accept-Encoding, with "gzip" and with "br, gzip". Prints the response body
+sizes per group and the time the per-request compression adds to
+/api/predict_batch.
+
+Usage (from the Dashboard folder):
+    python benchmarks/bench_compression.py [--batch-rows 1000] [--no-build]
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import compression
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DASHBOARD_DIR = os.path.join(BASE_DIR, 'Dashboard')
+
+ACCEPT_HEADERS = [('none', None), ('gzip', 'gzip'), ('br', 'br, gzip')]
+
+
+def wire_bytes(client, method, url, accept, **kwargs):
+    headers = {'Accept-Encoding': accept} if accept else {}
+    response = getattr(client, method)(url, headers=headers, **kwargs)
+    return len(response.get_data())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--batch-rows', type=int, default=1000, help='records in the predict_batch request')
+    parser.add_argument('--repeat', type=int, default=50, help='predict_batch calls timed per encoding')
+    parser.add_argument('--no-build', action='store_true', help='use the .br/.gz files already on disk')
+    args = parser.parse_args()
+
+    logging.getLogger('dashboard_api').setLevel(logging.WARNING)
+    if not args.no_build:
+        compression.build(DASHBOARD_DIR, folders=('css', 'js', 'assets'))
+
+    # Imported here: the module loads the model and data relative to the Dashboard folder
+    from app import app
+    client = app.test_client()
+
+    raw = pd.read_csv(os.path.join(BASE_DIR, 'Data', 'X_test.csv')).drop(columns=['Cluster'])
+    records = (raw.to_dict(orient='records') * (args.batch_rows // len(raw) + 1))[:args.batch_rows]
+
+    groups = {}
+    for path in compression.asset_files(DASHBOARD_DIR, ('css', 'js', 'assets')):
+        url = '/' + os.path.relpath(path, DASHBOARD_DIR).replace(os.sep, '/')
+        groups.setdefault(url.split('/')[1] + '/*', []).append(('get', url, {}))
+    for url in ('/api/data', '/api/feature_importance'):
+        groups[url] = [('get', url, {})]
+    batch_label = f'/api/predict_batch ({args.batch_rows})'
+    groups[batch_label] = [('post', '/api/predict_batch', {'json': records})]
+
+    brotli_note = '' if compression.brotli is not None else ' (brotli not installed: br falls back to gzip)'
+    print(f"Response bytes per group{brotli_note}")
+    print(f"  {'group':<30} {'files':>5} {'none':>10} {'gzip':>10} {'br':>10} {'saved':>7}")
+    totals = [0, 0, 0]
+    for label, requests in groups.items():
+        sizes = [sum(wire_bytes(client, method, url, accept, **kwargs) for method, url, kwargs in requests)
+                 for _, accept in ACCEPT_HEADERS]
+        totals = [total + size for total, size in zip(totals, sizes)]
+        print(f"  {label:<30} {len(requests):5d} {sizes[0]:10,d} {sizes[1]:10,d} {sizes[2]:10,d} "
+              f"{1 - sizes[2] / sizes[0]:7.1%}")
+    print(f"  {'total':<30} {'':5} {totals[0]:10,d} {totals[1]:10,d} {totals[2]:10,d} "
+          f"{1 - totals[2] / totals[0]:7.1%}")
+
+    print(f"\n{batch_label}: milliseconds per request")
+    for name, accept in ACCEPT_HEADERS:
+        began = time.perf_counter()
+        for _ in range(args.repeat):
+            wire_bytes(client, 'post', '/api/predict_batch', accept, json=records)
+        print(f"  {name:<6} {(time.perf_counter() - began) / args.repeat * 1000:8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Random forest scoring: scikit-learn predict_proba against the flattened evaluator.
+
+Fits a forest (--trees, default 200, the notebook's best) to the cleaned
+dataset and times scoring 1, 32 and --rows encoded rows with
+scaler.transform + predict_proba, and with FlatForest on its NumPy
+(level-wise) and numba paths. Probabilities are checked for equality.
+FlatTreeEngine uses the NumPy path only up to NUMPY_MAX_ROWS rows.
+
+Usage (from the Dashboard folder):
+    python benchmarks/bench_forest.py [--trees 200] [--rows 1000] [--repeat 50]
+"""
+
+import os
+import sys
+import pickle
+import argparse
+import timeit
+import logging
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import forest
+from api.encoding import FeatureEncoder
+from api.inference import FlatTreeEngine
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_pickle(name):
+    with open(os.path.join(BASE_DIR, 'Models', name), 'rb') as f:
+        return pickle.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--trees', type=int, default=200, help='trees in the forest')
+    parser.add_argument('--rows', type=int, default=1000, help='rows in the large batch')
+    parser.add_argument('--repeat', type=int, default=50, help='calls per measurement')
+    args = parser.parse_args()
+    logging.getLogger('dashboard_api').setLevel(logging.WARNING)
+
+    from sklearn.ensemble import RandomForestClassifier
+    scaler = load_pickle('scaler.pkl')
+    model_columns = load_pickle('model_columns.pkl')
+    encoder = FeatureEncoder(model_columns)
+    data = pd.read_csv(os.path.join(BASE_DIR, 'Data', 'smartphone_purchased_data_cleaned.csv'))
+    features = encoder.encode_frame(data)
+    model = RandomForestClassifier(n_estimators=args.trees, random_state=42).fit(
+        scaler.transform(pd.DataFrame(features, columns=model_columns)), data['will_purchase'])
+    engine = FlatTreeEngine(model, scaler)
+    print(f"{args.trees} trees, {len(engine.forest.feature):,} nodes; numba "
+          f"{'installed' if forest.NUMBA_AVAILABLE else 'not installed'}")
+
+    paths = {
+        'sklearn': lambda rows: model.predict_proba(
+            scaler.transform(pd.DataFrame(rows, columns=model_columns)))[:, 1]
+    }
+    for backend in ('numpy', 'numba'):
+        if backend == 'numba' and not forest.NUMBA_AVAILABLE:
+            continue
+        paths[f'flat ({backend})'] = (lambda backend: lambda rows: engine.forest.predict_proba(
+            (rows - engine.mean) / engine.scale, backend=backend)[:, 1])(backend)
+
+    batch = np.resize(features, (args.rows, features.shape[1]))
+    for rows in (features[:1], features[:32], batch):
+        print(f"\n  {len(rows)} rows")
+        expected = paths['sklearn'](rows)
+        for label, score in paths.items():
+            score(rows)  # first call compiles the numba path
+            if not np.array_equal(score(rows), expected):
+                print(f"  {label}: probabilities differ from scikit-learn")
+            seconds = timeit.timeit(lambda: score(rows), number=args.repeat) / args.repeat
+            print(f"  {label:<14} {seconds * 1e3:9.3f} ms/call {len(rows) / seconds:12,.0f} rows/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Micro-benchmark for the prediction path.
+
+Compares the original per-request path (DataFrame + get_dummies + reindex,
+then scaler.transform, model.predict and model.predict_proba) against the
+FeatureEncoder with the sklearn engine and with the fused inference engine,
+plus the sklearn engine behind the prediction cache (warm, so every row hits;
+batches above MAX_CACHED_ROWS bypass it).
+
+Usage (from the Dashboard folder):
+    python benchmarks/bench_inference.py [--rows 1000] [--repeat 200]
+"""
+
+import os
+import sys
+import pickle
+import argparse
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.encoding import FeatureEncoder, NUMERIC_DEFAULTS
+from api.inference import SklearnEngine, build_engine
+from api.prediction_cache import CachedEngine, PredictionCache
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_pickle(name):
+    with open(os.path.join(BASE_DIR, 'Models', name), 'rb') as f:
+        return pickle.load(f)
+
+
+def original_path(records, model, scaler, model_columns):
+    """The per-request path used by /api/predict before the encoder and engine"""
+    input_df = pd.DataFrame(records)
+    for field, default in NUMERIC_DEFAULTS.items():
+        input_df[field] = pd.to_numeric(input_df[field], errors='coerce').fillna(default)
+    input_encoded = pd.get_dummies(input_df, columns=['brand'], drop_first=True)
+    input_encoded = input_encoded.reindex(columns=model_columns, fill_value=0)
+    input_scaled = scaler.transform(input_encoded)
+    return model.predict(input_scaled), model.predict_proba(input_scaled)[:, 1]
+
+
+def report(label, seconds, repeat, rows):
+    per_call = seconds / repeat
+    print(f"  {label:<28} {per_call * 1e6:10.1f} us/call {rows / per_call:14,.0f} rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=1000, help='rows in the batch case')
+    parser.add_argument('--repeat', type=int, default=200, help='calls per measurement')
+    args = parser.parse_args()
+
+    model = load_pickle('model.pkl')
+    scaler = load_pickle('scaler.pkl')
+    model_columns = load_pickle('model_columns.pkl')
+    encoder = FeatureEncoder(model_columns)
+    sklearn_engine = SklearnEngine(model, scaler)
+    fused_engine = build_engine(model, scaler)
+    cached_sklearn = CachedEngine(sklearn_engine, PredictionCache(maxsize=4096))
+
+    raw = pd.read_csv(os.path.join(BASE_DIR, 'Data', 'X_test.csv')).drop(columns=['Cluster'])
+    pool = raw.to_dict(orient='records')
+    batch = (pool * (args.rows // len(pool) + 1))[:args.rows]
+
+    print(f"Model: {type(model).__name__}, fused engine: {fused_engine.kind}")
+    for rows, records in [(1, pool[:1]), (len(batch), batch)]:
+        repeat = args.repeat if rows == 1 else max(args.repeat // 10, 5)
+        print(f"\n{rows} row(s) per call, {repeat} calls")
+        features = encoder.encode_many(records)
+        cases = [
+            ('original pandas/sklearn', lambda: original_path(records, model, scaler, model_columns)),
+            ('encoder + sklearn engine', lambda: sklearn_engine.predict(encoder.encode_many(records))),
+            ('encoder + fused engine', lambda: fused_engine.predict(encoder.encode_many(records))),
+            ('fused engine only', lambda: fused_engine.predict(features)),
+            ('encoder + cached sklearn', lambda: cached_sklearn.predict(encoder.encode_many(records))),
+        ]
+        for label, func in cases:
+            func()
+            report(label, timeit.timeit(func, number=repeat), repeat, rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Scaling benchmark for the process-pool inference backend.
+
+Scores --rows encoded rows in-process and through ProcessPoolEngine with 1, 2,
+4, ... workers (up to --max-workers, default the CPU count), then measures
+what a pooled call adds beyond the scoring (the POOL_CALL_SECONDS and
+POOL_ROW_SECONDS constants in api/process_pool.py) and the resulting
+crossover point that INFERENCE_POOL_MIN_ROWS=auto uses. The shipped
+logistic regression is too cheap per row to gain from the pool, so by
+default a RandomForestClassifier is fitted on the bundled test set to stand
+in for a CPU-heavy model; pass --model shipped to use Models/model.pkl.
+
+Usage (from the Dashboard folder):
+    python benchmarks/bench_process_pool.py [--rows 200000] [--trees 200] [--model forest|shipped]
+"""
+
+import os
+import sys
+import time
+import pickle
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.encoding import FeatureEncoder
+from api.inference import build_engine
+from api.process_pool import ProcessPoolEngine, crossover_rows
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_pickle(name):
+    with open(os.path.join(BASE_DIR, 'Models', name), 'rb') as f:
+        return pickle.load(f)
+
+
+def best_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - began)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=200000, help='rows scored per call')
+    parser.add_argument('--trees', type=int, default=200, help='trees in the stand-in forest')
+    parser.add_argument('--model', choices=['forest', 'shipped'], default='forest')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeat', type=int, default=3, help='calls per measurement (best is kept)')
+    args = parser.parse_args()
+
+    scaler = load_pickle('scaler.pkl')
+    encoder = FeatureEncoder(load_pickle('model_columns.pkl'))
+    raw = pd.read_csv(os.path.join(BASE_DIR, 'Data', 'X_test.csv')).drop(columns=['Cluster'])
+    test_features = encoder.encode_many(raw.to_dict(orient='records'))
+    if args.model == 'forest':
+        from sklearn.ensemble import RandomForestClassifier
+        labels = (test_features[:, 0] + np.arange(len(test_features)) % 3 > 40).astype(int)
+        model = RandomForestClassifier(n_estimators=args.trees, random_state=0)
+        model.fit(scaler.transform(pd.DataFrame(test_features, columns=scaler.feature_names_in_)), labels)
+    else:
+        model = load_pickle('model.pkl')
+
+    engine = build_engine(model, scaler)
+    features = np.tile(test_features, (args.rows // len(test_features) + 1, 1))[:args.rows]
+    print(f"{type(model).__name__} ({engine.kind} engine), {args.rows:,} rows per call, "
+          f"{os.cpu_count()} CPUs")
+
+    baseline = best_time(lambda: engine.predict(features), args.repeat)
+    print(f"  in-process           {baseline:8.3f} s {args.rows / baseline:14,.0f} rows/s")
+    workers = 1
+    while workers <= args.max_workers:
+        pooled = ProcessPoolEngine(engine, model, scaler, workers=workers, min_rows=1)
+        pooled.warm()
+        try:
+            seconds = best_time(lambda: pooled.predict(features), args.repeat)
+        finally:
+            pooled.close(wait=True)
+        print(f"  pool, {workers:2d} worker(s)  {seconds:8.3f} s {args.rows / seconds:14,.0f} rows/s"
+              f"  ({baseline / seconds:.2f}x)")
+        workers *= 2
+
+    # A one-worker pool does the same scoring work, so the difference is the pool's own cost
+    pooled = ProcessPoolEngine(engine, model, scaler, workers=1, min_rows=1)
+    pooled.warm()
+    try:
+        call_seconds = best_time(lambda: pooled.predict(features[:1]), args.repeat * 10)
+        row_seconds = (best_time(lambda: pooled.predict(features), args.repeat) - baseline - call_seconds) / args.rows
+    finally:
+        pooled.close(wait=True)
+    print(f"  pool cost per call   {call_seconds * 1e3:8.3f} ms, per row {row_seconds * 1e9:8.1f} ns")
+    crossover = crossover_rows(engine, scaler, args.max_workers)
+    print(f"  crossover with {args.max_workers} worker(s): "
+          f"{f'{crossover:,} rows' if crossover is not None else 'never (stays in-process)'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Exhaustive grid search against successive halving for the purchase forest.
+
+Cleans, encodes and scales Data/smartphone_purchased_data_cleaned.csv with the
+training pipeline's stages (no stage cache), then runs GridSearchCV and
+successive halving (api.train.make_search) over the notebook grid and over a
+larger grid. Prints the wall-clock time, the number of fits, and the cv and
+test accuracy of each winner.
+
+Usage (from the Dashboard folder):
+    python benchmarks/bench_search.py [--cv 3] [--jobs -1] [--factor 3]
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import train
+
+GRIDS = {
+    'notebook': train.MODEL_GRIDS['forest'],
+    'extended': {'n_estimators': [100, 200, 400], 'max_depth': [None, 10, 20], 'min_samples_leaf': [1, 4]}
+}
+
+
+def trees_fitted(searcher, mode):
+    """Trees grown per fold over all candidates (halving's budget is the tree count itself)"""
+    results = searcher.cv_results_
+    if mode == 'halving':
+        return int(sum(results['n_resources']))
+    return sum(params['n_estimators'] for params in results['params'])
+
+
+def run(mode, grid, scaled, encoded, args):
+    searcher = train.make_search('forest', grid, args.cv, args.seed, args.jobs, mode, factor=args.factor)
+    began = time.perf_counter()
+    searcher.fit(scaled['X_train'], encoded['y_train'])
+    seconds = time.perf_counter() - began
+    estimator = searcher.best_estimator_
+    return {
+        'seconds': seconds,
+        'fits': len(searcher.cv_results_['params']) * args.cv,
+        'trees': trees_fitted(searcher, mode) * args.cv,
+        'cv': searcher.best_score_,
+        'test': estimator.score(scaled['X_test'], encoded['y_test'])
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--cv', type=int, default=3, help='cross-validation folds')
+    parser.add_argument('--jobs', type=int, default=-1, help='parallel fits (-1 for all cores)')
+    parser.add_argument('--factor', type=int, default=train.HALVING_FACTOR, help='halving factor')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    logging.getLogger('dashboard_api').setLevel(logging.WARNING)
+    encoded = train.encode_stage(train.clean_stage([train.DEFAULT_DATA]), 0.2, args.seed)
+    scaled = train.scale_stage(encoded)
+
+    print(f"{len(encoded['y_train'])} training rows, {args.cv} folds, jobs={args.jobs}, cpus={os.cpu_count()}")
+    print(f"  {'grid':<9} {'search':<8} {'seconds':>8} {'fits':>5} {'trees':>7} {'cv acc':>7} {'test acc':>8}")
+    for label, grid in GRIDS.items():
+        results = {mode: run(mode, grid, scaled, encoded, args) for mode in train.SEARCH_MODES}
+        for mode, result in results.items():
+            print(f"  {label:<9} {mode:<8} {result['seconds']:8.2f} {result['fits']:5d} {result['trees']:7,d} "
+                  f"{result['cv']:7.4f} {result['test']:8.4f}")
+        print(f"  {label:<9} {'speedup':<8} {results['grid']['seconds'] / results['halving']['seconds']:7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
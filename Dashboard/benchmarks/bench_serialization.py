@@ -0,0 +1,87 @@
+"""
+Serialization cost per endpoint payload.
+
+Builds the payloads the API returns (dataset statistics, segment analysis,
+dashboard data, feature importance and a predict_batch result list) and
+times, per payload: the json module as jsonify() used it (sorted keys,
+compact, after float()/int() conversion of NumPy values), the serializer in
+api.serialization (orjson when installed, NumPy values passed as-is) and
+returning the cached bytes.
+
+Usage (from the Dashboard folder):
+    python benchmarks/bench_serialization.py [--repeat 2000] [--batch-rows 1000]
+"""
+
+import os
+import sys
+import json
+import pickle
+import argparse
+import timeit
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api import batch, serialization
+from api.aggregates import AggregateCache
+from api.encoding import FeatureEncoder
+from api.inference import build_engine
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_pickle(name):
+    with open(os.path.join(BASE_DIR, 'Models', name), 'rb') as f:
+        return pickle.load(f)
+
+
+def stdlib_dumps(obj):
+    return (json.dumps(obj, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=2000, help='calls per measurement')
+    parser.add_argument('--batch-rows', type=int, default=1000, help='records in the predict_batch payload')
+    args = parser.parse_args()
+
+    df = pd.read_csv(os.path.join(BASE_DIR, 'Data', 'smartphone_purchased_data_cleaned.csv'))
+    cache = AggregateCache(df)
+    tallies = cache._tallies
+    model = load_pickle('model.pkl')
+    model_columns = load_pickle('model_columns.pkl')
+    engine = build_engine(model, load_pickle('scaler.pkl'))
+    raw = pd.read_csv(os.path.join(BASE_DIR, 'Data', 'X_test.csv')).drop(columns=['Cluster'])
+    records = (raw.to_dict(orient='records') * (args.batch_rows // len(raw) + 1))[:args.batch_rows]
+    batch_results = {'results': batch.predict_batch(records, engine, FeatureEncoder(model_columns))}
+
+    # Feature importance as the handler builds it: before (float() per value) and now (NumPy values)
+    importance_python = {'feature_importance': {col: float(c) for col, c in zip(model_columns, model.coef_[0])}}
+    importance_numpy = {'feature_importance': dict(zip(model_columns, model.coef_[0]))}
+
+    payloads = [
+        ('/api/data', cache.data_stats(tallies), cache.data_stats(tallies)),
+        ('/api/segment_analysis', cache.segment_analysis(tallies), cache.segment_analysis(tallies)),
+        ('/api/dashboard_data', cache.dashboard_data(tallies), cache.dashboard_data(tallies)),
+        ('/api/feature_importance', importance_python, importance_numpy),
+        (f'/api/predict_batch ({args.batch_rows})', batch_results, batch_results),
+    ]
+
+    backend = 'orjson' if serialization.orjson is not None else 'json module (orjson not installed)'
+    print(f"Serializer: {backend}; microseconds per call")
+    print(f"  {'payload':<30} {'bytes':>8} {'json':>10} {'serializer':>11} {'cached':>8}")
+    for label, python_payload, payload in payloads:
+        body = serialization.dumps(payload, sort_keys=True) + b'\n'
+        cached = {'body': body}
+        repeat = args.repeat if len(body) < 100000 else max(args.repeat // 20, 10)
+        timings = [timeit.timeit(func, number=repeat) / repeat * 1e6 for func in (
+            lambda: stdlib_dumps(python_payload),
+            lambda: serialization.dumps(payload, sort_keys=True) + b'\n',
+            lambda: cached['body'],
+        )]
+        print(f"  {label:<30} {len(body):8d} {timings[0]:10.1f} {timings[1]:11.1f} {timings[2]:8.2f}")
+
+
+if __name__ == '__main__':
+    main()
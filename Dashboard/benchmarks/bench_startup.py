@@ -0,0 +1,97 @@
+"""
+Cold-start benchmark for Dashboard/app.py.
+
+Starts a fresh interpreter per run and measures, for eager loading and for
+DASHBOARD_LAZY_LOAD=1, how long it takes until the module is imported, until
+/api/status answers and until the model and data are ready. A separate run
+with ``python -X importtime`` lists the slowest top-level imports.
+
+Usage (from the Dashboard folder):
+    python benchmarks/bench_startup.py [--repeat 3] [--top 12]
+"""
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child interpreter; prints one JSON line of timings
+PROBE = '''
+import json, logging, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+status = client.get('/api/status').get_json()
+status_at = time.perf_counter()
+app.resource_loader.wait(None)
+ready = time.perf_counter()
+client.get('/api/data')
+data_at = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'status': status_at - start,
+    'status_state': status['loading']['state'],
+    'ready': ready - start,
+    'first_data': data_at - start
+}))
+'''
+
+
+def run_probe(lazy):
+    env = dict(os.environ, DASHBOARD_LAZY_LOAD='1' if lazy else '0')
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=DASHBOARD_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def import_times(lazy, top):
+    """Return (total_us, [(cumulative_us, module)]) for the modules app.py imports directly"""
+    env = dict(os.environ, DASHBOARD_LAZY_LOAD='1' if lazy else '0')
+    # -X importtime nests by a process-wide import depth, so a loader thread importing
+    # concurrently garbles the tree; keep it from starting and time the import alone
+    code = 'import threading; threading.Thread.start = lambda self: None; import app'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=DASHBOARD_DIR,
+                            env=env, capture_output=True, text=True, check=True)
+    total, entries = 0, []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # Each nesting level adds two spaces after the separator's own space
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        if depth == 0 and name.strip() == 'app':
+            total = int(cumulative)
+        elif depth == 1:
+            entries.append((int(cumulative), name.strip()))
+    entries.sort(reverse=True)
+    return total, entries[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=3, help='fresh interpreters per mode')
+    parser.add_argument('--top', type=int, default=12, help='imports to list per mode')
+    args = parser.parse_args()
+
+    for lazy in (False, True):
+        label = 'lazy (DASHBOARD_LAZY_LOAD=1)' if lazy else 'eager (default)'
+        runs = [run_probe(lazy) for _ in range(args.repeat)]
+        best = {key: min(run[key] for run in runs) for key in ('import', 'status', 'ready', 'first_data')}
+        print(f"\n{label}, best of {args.repeat}:")
+        print(f"  import app                  {best['import'] * 1000:8.1f} ms")
+        print(f"  first /api/status           {best['status'] * 1000:8.1f} ms  (state: {runs[-1]['status_state']})")
+        print(f"  model and data ready        {best['ready'] * 1000:8.1f} ms")
+        print(f"  first /api/data             {best['first_data'] * 1000:8.1f} ms")
+
+        total, entries = import_times(lazy, args.top)
+        print(f"  -X importtime for 'import app': {total / 1000:.1f} ms; slowest direct imports:")
+        for cumulative, name in entries:
+            print(f"    {cumulative / 1000:8.1f} ms  {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Concurrent load test for single-row predictions with and without micro-batching.
+
+Each of --clients threads sends --requests one-row predictions back to back
+(encode + predict, as /api/predict does), first straight to the engine and
+then through a MicroBatcher at each --wait-ms setting. Reports throughput and
+p50/p99 latency per case for the sklearn and the fused engine. The prediction
+cache is left out so every request is scored.
+
+Usage (from the Dashboard folder):
+    python benchmarks/load_predict.py [--clients 16] [--requests 200] [--wait-ms 1 2 5] [--max-batch 32]
+"""
+
+import os
+import sys
+import time
+import pickle
+import argparse
+import threading
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.coalescer import MicroBatcher
+from api.encoding import FeatureEncoder
+from api.inference import SklearnEngine, build_engine
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def load_pickle(name):
+    with open(os.path.join(BASE_DIR, 'Models', name), 'rb') as f:
+        return pickle.load(f)
+
+
+def run_load(predict, encoder, pool, clients, requests):
+    """Return (elapsed seconds, per-request latencies) for clients x requests calls"""
+    latencies = [[] for _ in range(clients)]
+    start = threading.Barrier(clients + 1)
+
+    def client(index):
+        records = pool[index::clients] or pool
+        start.wait()
+        for i in range(requests):
+            began = time.perf_counter()
+            predict(encoder.encode_many([records[i % len(records)]]))
+            latencies[index].append(time.perf_counter() - began)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    start.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - began, np.concatenate([np.array(l) for l in latencies])
+
+
+def report(label, elapsed, latencies, extra=''):
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"  {label:<22} {len(latencies) / elapsed:10,.0f} req/s  p50 {p50:7.2f} ms  p99 {p99:7.2f} ms{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--clients', type=int, default=16, help='concurrent request threads')
+    parser.add_argument('--requests', type=int, default=200, help='requests per client')
+    parser.add_argument('--wait-ms', type=float, nargs='+', default=[1, 2, 5], help='batch wait settings to try')
+    parser.add_argument('--max-batch', type=int, default=32, help='rows per batch cap')
+    args = parser.parse_args()
+
+    model = load_pickle('model.pkl')
+    scaler = load_pickle('scaler.pkl')
+    encoder = FeatureEncoder(load_pickle('model_columns.pkl'))
+    raw = pd.read_csv(os.path.join(BASE_DIR, 'Data', 'X_test.csv')).drop(columns=['Cluster'])
+    pool = raw.to_dict(orient='records')
+
+    print(f"Model: {type(model).__name__}, {args.clients} clients x {args.requests} single-row requests")
+    for engine in (SklearnEngine(model, scaler), build_engine(model, scaler)):
+        print(f"\n{engine.kind} engine")
+        run_load(engine.predict, encoder, pool, args.clients, 5)
+        report('per request', *run_load(engine.predict, encoder, pool, args.clients, args.requests))
+        for wait_ms in args.wait_ms:
+            batcher = MicroBatcher(max_wait_ms=wait_ms, max_batch=args.max_batch)
+            elapsed, latencies = run_load(lambda features: batcher.predict(engine, features),
+                                          encoder, pool, args.clients, args.requests)
+            report(f'batched, wait {wait_ms:g} ms', elapsed, latencies,
+                   f"  ({batcher.stats()['mean_batch_rows']:.1f} rows/batch)")
+
+
+if __name__ == '__main__':
+    main()
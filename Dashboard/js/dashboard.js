@@ -413,7 +413,8 @@ function fetchDashboardData() {
     const apiUrl = `${apiBaseUrl}/api/data`;
     console.log(`Fetching data from: ${apiUrl}`);
     
-    return fetch(apiUrl)
+    // Revalidate with the stored ETag; an unchanged payload comes back as an empty 304
+    return fetch(apiUrl, { cache: 'no-cache' })
         .then(response => {
             if (!response.ok) {
                 console.warn(`API responded with status: ${response.status}. Using fallback data.`);
@@ -468,7 +469,7 @@ function fetchDashboardData() {
 // Fetch feature importance
 function fetchFeatureImportance() {
     const apiUrl = `${apiBaseUrl}/api/feature_importance`;
-    return fetch(apiUrl)
+    return fetch(apiUrl, { cache: 'no-cache' })
         .then(response => {
             if (!response.ok) {
                 console.warn(`API feature importance failed with status: ${response.status}. Using fallback data.`);
@@ -57,7 +57,8 @@ function checkApiStatus() {
  * Load main dashboard data
  */
 function loadDashboardData() {
-    fetch(`${apiBaseUrl}/dashboard_data`)
+    // Revalidate with the stored ETag; an unchanged payload comes back as an empty 304
+    fetch(`${apiBaseUrl}/dashboard_data`, { cache: 'no-cache' })
         .then(response => response.json())
         .then(data => {
             // Update stats cards
@@ -79,7 +80,7 @@ function loadDashboardData() {
  * Load feature importance data
  */
 function loadFeatureImportance() {
-    fetch(`${apiBaseUrl}/feature_importance`)
+    fetch(`${apiBaseUrl}/feature_importance`, { cache: 'no-cache' })
         .then(response => response.json())
         .then(data => {
             createFeatureImportanceChart(data.feature_importance);
@@ -0,0 +1,599 @@
+import os
+import pickle
+import threading
+
+import numpy as np
+
+import pandas as pd
+import pytest
+from flask import Flask
+
+from api import bundle, compression, datastore, init_app, routes, serialization
+from api.aggregates import AggregateCache
+from api import registry
+from api import records as records_module
+from api.records import AppendLog
+from api.startup import BackgroundLoader
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BASE_DIR, '..', 'Models')
+DATA_DIR = os.path.join(BASE_DIR, '..', 'Data')
+
+SAMPLE_RECORD = {
+    'age': 32,
+    'income': 72000,
+    'time_on_website': 18.5,
+    'previous_purchases': 2,
+    'marketing_engaged': 1,
+    'search_frequency': 7,
+    'device_age': 2.5,
+    'brand': 'Samsung'
+}
+
+
+def load_pickle(name):
+    with open(os.path.join(MODELS_DIR, name), 'rb') as f:
+        return pickle.load(f)
+
+
+@pytest.fixture
+def client(tmp_path):
+    """Flask test client with the API blueprint wired to the shipped model files"""
+    model = load_pickle('model.pkl')
+    scaler = load_pickle('scaler.pkl')
+    model_columns = load_pickle('model_columns.pkl')
+    data_file = os.path.join(DATA_DIR, 'smartphone_purchased_data_cleaned.csv')
+    df = pd.read_csv(data_file)
+
+    app = Flask(__name__)
+    routes.resource_loader = None
+    model_files = [os.path.join(MODELS_DIR, name) for name in ('model.pkl', 'scaler.pkl', 'model_columns.pkl')]
+    routes.initialize(model, scaler, model_columns, df, model_files=model_files, data_files=[data_file],
+                      records_path=str(tmp_path / 'appended.csv'), registry_root=str(tmp_path / 'registry'))
+    serialization.install(app)
+    compression.install(app)
+    init_app(app)
+    app.config['TESTING'] = True
+    return app.test_client()
+
+
+@pytest.fixture
+def records_token(monkeypatch):
+    """Enable /api/records and return the headers that authorize a request"""
+    monkeypatch.setattr(records_module, 'RECORDS_API_TOKEN', 'test-token')
+    return {records_module.RECORDS_TOKEN_HEADER: 'test-token'}
+
+
+def test_predict_batch_matches_single_predictions(client):
+    records = [dict(SAMPLE_RECORD, brand=brand, age=20 + i)
+               for i, brand in enumerate(['iPhone', 'Samsung', 'Google Pixel', 'Xiaomi'])]
+
+    response = client.post('/api/predict_batch', json={'records': records, 'chunk_size': 3})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['count'] == 4
+    assert body['errors'] == 0
+
+    model = load_pickle('model.pkl')
+    scaler = load_pickle('scaler.pkl')
+    model_columns = load_pickle('model_columns.pkl')
+    for record, result in zip(records, body['results']):
+        encoded = pd.get_dummies(pd.DataFrame([record]), columns=['brand'])
+        encoded = encoded.reindex(columns=model_columns, fill_value=0)
+        expected = model.predict_proba(scaler.transform(encoded))[0, 1]
+        assert result['probability'] == pytest.approx(expected)
+        assert result['prediction'] == int(expected > 0.5)
+
+
+def test_predict_batch_reports_row_errors(client):
+    incomplete = dict(SAMPLE_RECORD)
+    del incomplete['income']
+    records = [SAMPLE_RECORD, incomplete, 'not a record']
+
+    response = client.post('/api/predict_batch', json=records)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['scored'] == 1
+    assert body['errors'] == 2
+    assert 'probability' in body['results'][0]
+    assert body['results'][1]['missing_fields'] == ['income']
+    assert body['results'][2]['error'] == 'Invalid record'
+
+
+def test_predict_batch_rejects_invalid_body(client):
+    response = client.post('/api/predict_batch', json={'records': 'nope'})
+    assert response.status_code == 400
+
+
+def test_compare_brands_matches_single_predictions(client):
+    brands = ['iPhone', 'Samsung', 'Google Pixel', 'Nothing']
+    profile = {k: v for k, v in SAMPLE_RECORD.items() if k != 'brand'}
+
+    response = client.post('/api/compare_brands', json=dict(profile, brands=brands))
+    assert response.status_code == 200
+    results = response.get_json()
+    assert [r['probability'] for r in results] == sorted((r['probability'] for r in results), reverse=True)
+
+    for result in results:
+        single = client.post('/api/predict', json=dict(profile, brand=result['brand'])).get_json()
+        assert result['probability'] == pytest.approx(single['probability'])
+        assert result['prediction'] == single['prediction']
+
+
+def test_compare_brands_profiles_matrix(client):
+    brands = ['iPhone', 'Samsung', 'Xiaomi']
+    profiles = [{k: v for k, v in SAMPLE_RECORD.items() if k != 'brand'},
+                dict(SAMPLE_RECORD, age=58, income=25000, marketing_engaged=0),
+                {'age': 40}]
+
+    response = client.post('/api/compare_brands', json={'profiles': profiles, 'brands': brands})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['brands'] == brands
+    assert body['errors'] == 1
+    assert 'missing_fields' in body['results'][2]
+
+    for profile, result in zip(profiles[:2], body['results'][:2]):
+        assert len(result['probabilities']) == len(brands)
+        for brand, probability in zip(brands, result['probabilities']):
+            single = client.post('/api/predict', json=dict(profile, brand=brand)).get_json()
+            assert probability == pytest.approx(single['probability'])
+        assert result['best_brand'] == brands[result['probabilities'].index(max(result['probabilities']))]
+
+
+def test_data_endpoint_matches_dataframe(client):
+    df = routes.df
+    body = client.get('/api/data').get_json()
+    assert body['total_records'] == len(df)
+    assert body['purchase_rate'] == pytest.approx(df['will_purchase'].mean())
+    assert body['age_groups']['26-35'] == int(((df['age'] >= 26) & (df['age'] <= 35)).sum())
+    assert body['income_groups']['30k-50k'] == int(((df['income'] >= 30000) & (df['income'] < 50000)).sum())
+    high_income = df[df['income'] > df['income'].median()]
+    assert body['high_income_conversion'] == pytest.approx(high_income['will_purchase'].mean())
+    assert body['brand_distribution'] == df['brand'].value_counts().to_dict()
+
+
+def test_segment_analysis_matches_dataframe(client):
+    df = routes.df
+    body = client.get('/api/segment_analysis').get_json()
+    middle = df[(df['income'] >= 30000) & (df['income'] <= 70000)]
+    segment = next(s for s in body['income_segments'] if s['segment'] == 'Middle Income')
+    assert segment['count'] == len(middle)
+    assert segment['avg_age'] == pytest.approx(middle['age'].mean())
+    rates = [s['purchase_rate'] for s in body['brand_segments']]
+    assert rates == sorted(rates, reverse=True)
+
+
+def test_appended_records_update_aggregates(client, tmp_path, records_token):
+    records = [dict(SAMPLE_RECORD, will_purchase=1),
+               dict(SAMPLE_RECORD, brand='Nothing', age='61', marketing_engaged='Yes', will_purchase=0),
+               dict(SAMPLE_RECORD, will_purchase=3)]
+    before = client.get('/api/data').get_json()
+
+    response = client.post('/api/records', json={'records': records}, headers=records_token)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['accepted'] == 2
+    assert body['persisted'] is True
+    assert [error['index'] for error in body['errors']] == [2]
+    assert body['total_records'] == before['total_records'] + 2
+
+    after = client.get('/api/data').get_json()
+    appended = pd.read_csv(tmp_path / 'appended.csv')
+    rebuilt = AggregateCache(pd.concat([routes.df, appended], ignore_index=True))
+    assert after == rebuilt.data_stats()
+    assert after['brand_distribution']['Nothing'] == before['brand_distribution'].get('Nothing', 0) + 1
+
+
+def test_records_ingestion_is_refused_without_the_token(client, tmp_path, monkeypatch):
+    payload = {'records': [dict(SAMPLE_RECORD, will_purchase=1)]}
+    before = client.get('/api/data').get_json()['total_records']
+    # No token configured: ingestion is off
+    assert client.post('/api/records', json=payload).status_code == 403
+    monkeypatch.setattr(records_module, 'RECORDS_API_TOKEN', 'test-token')
+    for headers in ({}, {records_module.RECORDS_TOKEN_HEADER: 'wrong'}):
+        assert client.post('/api/records', json=payload, headers=headers).status_code == 403
+    assert not (tmp_path / 'appended.csv').exists()
+    assert client.get('/api/data').get_json()['total_records'] == before
+
+
+def test_unpersisted_records_are_refused(client, records_token, monkeypatch):
+    def fail(frame):
+        raise OSError('disk full')
+    monkeypatch.setattr(routes.records_log, 'write', fail)
+    before = client.get('/api/data').get_json()['total_records']
+    response = client.post('/api/records', json={'records': [dict(SAMPLE_RECORD, will_purchase=1)]},
+                           headers=records_token)
+    assert response.status_code == 503
+    assert client.get('/api/data').get_json()['total_records'] == before
+
+
+def test_append_log_skips_malformed_rows_without_losing_others(tmp_path):
+    log = AppendLog(str(tmp_path / 'appended.csv'))
+    log.write(pd.DataFrame([dict(SAMPLE_RECORD, will_purchase=1)] * 2))
+    with open(log.path, 'a') as f:
+        f.write('1,2,3,4,5,6,7,8,9,10,11,12,13\n')
+    log.write(pd.DataFrame([dict(SAMPLE_RECORD, will_purchase=0)]))
+    frame = log.read_new()
+    assert list(frame['will_purchase']) == [1, 1, 0]
+    assert log.offset == os.path.getsize(log.path) and log.read_new() is None
+
+
+def test_append_log_picks_up_other_writers(client, tmp_path):
+    # A second log on the same file stands in for another gunicorn worker
+    other_worker = AppendLog(str(tmp_path / 'appended.csv'))
+    frame = pd.DataFrame([dict(SAMPLE_RECORD, will_purchase=1)] * 3)
+    other_worker.write(frame)
+
+    body = client.get('/api/data').get_json()
+    assert body['total_records'] == len(routes.df) + 3
+    assert client.get('/api/status').get_json()['records_count'] == len(routes.df) + 3
+
+
+def test_aggregate_append_matches_rebuild():
+    df = pd.read_csv(os.path.join(DATA_DIR, 'smartphone_purchased_data_cleaned.csv'))
+    head, tail = df.iloc[:700], df.iloc[700:]
+    cache = AggregateCache(head)
+    cache.append(tail)
+    full = AggregateCache(df)
+    for name in ('data', 'segment_analysis', 'dashboard_data'):
+        assert cache.payload(name) == full.payload(name)
+
+    # Many small appends keep only a logarithmic number of sorted income runs
+    chunked = AggregateCache(head)
+    for start in range(0, len(tail), 10):
+        chunked.append(tail.iloc[start:start + 10])
+    assert len(chunked._tallies['income_values'].runs) <= 2 * int(np.log2(len(df)))
+    assert chunked.payload('data') == full.payload('data')
+
+
+def test_column_store_round_trip(tmp_path):
+    csv_path = tmp_path / 'cleaned.csv'
+    df = pd.read_csv(os.path.join(DATA_DIR, 'smartphone_purchased_data_cleaned.csv'))
+    df.to_csv(csv_path, index=False)
+    store_path = datastore.convert_csv(str(csv_path), str(tmp_path / 'store'))
+
+    stored = datastore.load_store(store_path)
+    assert isinstance(stored['age'].to_numpy().base, np.memmap)
+    assert stored['brand'].dtype == 'category'
+    pd.testing.assert_frame_equal(stored.astype({'brand': object}), df)
+    assert AggregateCache(stored).payload('data') == AggregateCache(df).payload('data')
+
+    # Editing the source CSV invalidates the store
+    df.iloc[:10].to_csv(csv_path, index=False)
+    assert datastore.load_store(store_path) is None
+
+
+def test_status_reports_worker_memory(client):
+    body = client.get('/api/status').get_json()
+    assert body['records_count'] == len(routes.df)
+    assert body['worker']['pid'] == os.getpid()
+    if body['worker']['source'] == 'smaps_rollup':
+        assert body['worker']['rss_bytes'] >= body['worker']['private_bytes'] > 0
+
+
+def test_status_answers_while_loading(client):
+    release = threading.Event()
+    routes.resource_loader = BackgroundLoader(release.wait).start(background=True)
+    try:
+        status = client.get('/api/status').get_json()
+        assert status['loading']['state'] == 'loading'
+        assert status['loading']['ready'] is False
+
+        # API requests wait for the loader instead of failing
+        threading.Timer(0.2, release.set).start()
+        assert client.get('/api/data').status_code == 200
+        assert client.get('/api/status').get_json()['loading']['ready'] is True
+    finally:
+        release.set()
+        routes.resource_loader = None
+
+
+def test_repeated_predictions_hit_the_cache(client):
+    profile = dict(SAMPLE_RECORD, age=44)
+    first = client.post('/api/predict', json=profile).get_json()
+    # Same model input spelled differently: numbers as strings
+    second = client.post('/api/predict', json=dict(profile, age='44', income='72000')).get_json()
+    assert second['probability'] == first['probability']
+
+    stats = client.get('/api/status').get_json()['prediction_cache']
+    assert stats['hits'] == 1 and stats['misses'] == 1
+
+    profile.pop('brand')
+    client.post('/api/compare_brands', json=dict(profile, brands=['Samsung', 'iPhone']))
+    stats = client.get('/api/status').get_json()['prediction_cache']
+    assert stats['hits'] == 2 and stats['misses'] == 2
+
+
+def test_model_registry_hot_swaps_published_version(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(registry, 'CHECK_INTERVAL', 0)
+    before = client.post('/api/predict', json=SAMPLE_RECORD).get_json()
+    status = client.get('/api/status').get_json()['model']
+    assert status['version'].startswith('files-') and status['registry'] is None
+
+    # Publish a retrained version: same features, different coefficients
+    model = load_pickle('model.pkl')
+    model.coef_ = model.coef_ * 0.5
+    source = tmp_path / 'retrained'
+    source.mkdir()
+    with open(source / 'model.pkl', 'wb') as f:
+        pickle.dump(model, f)
+    for name in ('scaler.pkl', 'model_columns.pkl'):
+        (source / name).write_bytes(open(os.path.join(MODELS_DIR, name), 'rb').read())
+    routes.model_registry.publish('v2', [str(source / name) for name in registry.ARTIFACT_FILES])
+
+    # The old version keeps serving while v2 loads in the background
+    client.get('/api/status')
+    for _ in range(100):
+        if routes.model_registry.active.version == 'v2':
+            break
+        threading.Event().wait(0.05)
+    after = client.post('/api/predict', json=SAMPLE_RECORD).get_json()
+    assert after['metadata']['model_version'] == 'v2'
+    assert after['probability'] != before['probability']
+    status = client.get('/api/status').get_json()['model']
+    assert status['version'] == 'v2' and status['reloads'] == 1 and status['source'] == 'registry'
+
+
+def asgi_request(app, method, path, body=b'', headers=()):
+    """Drive an ASGI app for one request without a server; return (status, headers, body)"""
+    import asyncio
+    scope = {'type': 'http', 'method': method, 'path': path, 'query_string': b'', 'http_version': '1.1',
+             'headers': [(b'content-type', b'application/json')] + list(headers), 'client': ('127.0.0.1', 5000)}
+    # Deliver the body in two parts, as a slow client would
+    incoming = [{'type': 'http.request', 'body': body[:5], 'more_body': True},
+                {'type': 'http.request', 'body': body[5:], 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent[0]['status'], dict(sent[0]['headers']), b''.join(m.get('body', b'') for m in sent[1:])
+
+
+def test_asgi_app_matches_flask_responses(client):
+    import json
+    from api.asgi import DashboardASGI
+
+    app = DashboardASGI(client.application, threads=2)
+    status, headers, body = asgi_request(app, 'POST', '/api/predict', json.dumps(SAMPLE_RECORD).encode())
+    assert status == 200
+    assert headers[b'content-type'] == b'application/json'
+    expected = client.post('/api/predict', json=SAMPLE_RECORD).get_json()
+    assert json.loads(body)['probability'] == expected['probability']
+
+    status, headers, body = asgi_request(app, 'GET', '/css/styles.css')
+    with open(os.path.join(BASE_DIR, 'css', 'styles.css'), 'rb') as f:
+        assert (status, body) == (200, f.read())
+    assert headers[b'content-type'].startswith(b'text/css')
+    assert asgi_request(app, 'GET', '/css/../app.py')[0] == 404
+    app.executor.shutdown()
+
+
+def test_asgi_static_files_answer_conditional_requests(client):
+    from api.asgi import DashboardASGI
+
+    app = DashboardASGI(client.application, threads=1)
+    status, headers, _ = asgi_request(app, 'GET', '/css/styles.css')
+    assert status == 200
+    assert headers[b'etag'] and headers[b'last-modified']
+    status, _, body = asgi_request(app, 'GET', '/css/styles.css', headers=[(b'if-none-match', headers[b'etag'])])
+    assert (status, body) == (304, b'')
+    status, _, body = asgi_request(app, 'GET', '/css/styles.css',
+                                   headers=[(b'if-modified-since', headers[b'last-modified'])])
+    assert (status, body) == (304, b'')
+    app.executor.shutdown()
+
+
+def test_asgi_streams_ndjson_in_both_directions(client):
+    import json
+    import asyncio
+    from api.asgi import DashboardASGI
+
+    app = DashboardASGI(client.application, threads=1)
+    raw = pd.read_csv(os.path.join(DATA_DIR, 'X_test.csv')).drop(columns=['Cluster'])
+    lines = [(json.dumps(record) + '\n').encode() for record in raw.iloc[:3].to_dict(orient='records')]
+    incoming = [{'type': 'http.request', 'body': line, 'more_body': True} for line in lines]
+    incoming.append({'type': 'http.request', 'body': b'', 'more_body': False})
+    events = []
+
+    async def receive():
+        events.append('receive')
+        return incoming.pop(0)
+
+    async def send(message):
+        events.append(message)
+
+    scope = {'type': 'http', 'method': 'POST', 'path': '/api/predict_stream', 'query_string': b'chunk_size=1',
+             'http_version': '1.1', 'headers': [(b'content-type', b'application/x-ndjson')]}
+    asyncio.run(app(scope, receive, send))
+    app.executor.shutdown()
+
+    # The first result goes out before the client has finished sending
+    first_body = next(i for i, event in enumerate(events) if event != 'receive' and event.get('body'))
+    assert first_body < len(events) - 1 - events[::-1].index('receive')
+    body = b''.join(event.get('body', b'') for event in events if event != 'receive')
+    assert [result['index'] for result in map(json.loads, body.splitlines())] == [0, 1, 2]
+
+
+def test_predict_stream_matches_batch(client):
+    import json
+    raw = pd.read_csv(os.path.join(DATA_DIR, 'X_test.csv')).drop(columns=['Cluster'])
+    records = raw.iloc[:8].to_dict(orient='records')
+    lines = [json.dumps(record) for record in records]
+    lines.insert(3, '{not json')
+    lines.insert(5, '')
+    response = client.post('/api/predict_stream?chunk_size=3', data='\n'.join(lines) + '\n',
+                           content_type='application/x-ndjson')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.is_streamed
+    streamed = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    # Encoded like every other endpoint (api.serialization), one compact object per line
+    from api import serialization
+    assert response.get_data().splitlines() == [serialization.dumps(result) for result in streamed]
+
+    # Parsed like every other request body too, NaN literals included
+    from api.batch import read_ndjson
+    parsed = list(read_ndjson([b'{"age": NaN, "income": 1}\n', '{"age": 2}']))
+    assert parsed[0][0]['income'] == 1 and np.isnan(parsed[0][0]['age']) and parsed[1] == ({'age': 2}, None)
+
+    expected = client.post('/api/predict_batch', json=records).get_json()['results']
+    assert [result['index'] for result in streamed] == list(range(9))
+    assert streamed[3]['error'] == 'Invalid JSON'
+    del streamed[3]
+    for got, want in zip(streamed, expected):
+        assert (got['prediction'], got['probability']) == (want['prediction'], want['probability'])
+
+    assert client.post('/api/predict_stream?chunk_size=0', data='').status_code == 400
+
+
+def test_json_provider_encodes_numpy_like_stdlib(client):
+    import json
+    from decimal import Decimal
+    payload = {'b': np.float64(0.1) * 3, 'a': np.arange(3), 'c': [np.int64(7), np.bool_(True)], 'd': 1.5}
+    expected = json.dumps({'a': [0, 1, 2], 'b': 0.1 * 3, 'c': [7, True], 'd': 1.5},
+                          sort_keys=True, separators=(',', ':')).encode()
+    assert serialization.dumps(payload, sort_keys=True) == expected
+    # Types orjson rejects fall back to the json module
+    assert serialization.dumps({'x': Decimal('2.5')}) == b'{"x":"2.5"}'
+    assert serialization.loads(b'{"x": NaN}')['x'] != 0
+
+    with client.application.app_context():
+        from flask import jsonify
+        assert jsonify(payload).get_data() == expected + b'\n'
+
+    first = client.get('/api/feature_importance')
+    assert first.status_code == 200 and 'feature_importance' in first.get_json()
+    assert routes.active_model().payloads['feature_importance'] == first.get_data()
+    assert client.get('/api/feature_importance').get_data() == first.get_data()
+
+
+def test_insight_endpoints_answer_conditional_requests(client, records_token):
+    for url in ('/api/data', '/api/segment_analysis', '/api/feature_importance'):
+        first = client.get(url)
+        assert first.status_code == 200
+        etag = first.headers['ETag']
+        assert first.headers['Cache-Control'] == 'no-cache'
+        assert first.headers['Last-Modified']
+
+        revalidated = client.get(url, headers={'If-None-Match': etag})
+        assert revalidated.status_code == 304
+        assert revalidated.get_data() == b''
+        assert revalidated.headers['ETag'] == etag
+        assert client.get(url, headers={'If-None-Match': '"stale"'}).status_code == 200
+
+    # Dated by the files behind the payload, so every worker sends the same Last-Modified
+    from werkzeug.http import http_date
+    data_file = os.path.join(DATA_DIR, 'smartphone_purchased_data_cleaned.csv')
+    assert client.get('/api/data').headers['Last-Modified'] == http_date(os.path.getmtime(data_file))
+    assert client.get('/api/feature_importance').headers['Last-Modified'] == http_date(max(
+        os.path.getmtime(os.path.join(MODELS_DIR, name)) for name in ('model.pkl', 'scaler.pkl', 'model_columns.pkl')))
+
+    # New records change the payload, so the old tag no longer matches
+    etag = client.get('/api/data').headers['ETag']
+    client.post('/api/records', json={'records': [dict(SAMPLE_RECORD, will_purchase=1)]}, headers=records_token)
+    refreshed = client.get('/api/data', headers={'If-None-Match': etag})
+    assert refreshed.status_code == 200
+    assert refreshed.headers['ETag'] != etag
+    assert refreshed.headers['Last-Modified'] == http_date(max(
+        os.path.getmtime(data_file), os.path.getmtime(routes.records_log.path)))
+
+
+def test_compression_negotiates_assets_and_api_responses(client, tmp_path):
+    import gzip
+    css = tmp_path / 'css'
+    css.mkdir()
+    source = b'.card { color: #333; padding: 4px; }\n' * 200
+    (css / 'site.css').write_bytes(source)
+    (css / 'tiny.css').write_bytes(b'p{}')
+    compression.build(str(tmp_path), folders=('css',))
+    assert (css / 'site.css.gz').exists() and not (css / 'tiny.css.gz').exists()
+
+    app = client.application
+    with app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        response = compression.send_asset(str(css), 'site.css')
+        response.direct_passthrough = False
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.mimetype == 'text/css'
+        assert gzip.decompress(response.get_data()) == source
+    with app.test_request_context():
+        response = compression.send_asset(str(css), 'site.css')
+        response.direct_passthrough = False
+        assert 'Content-Encoding' not in response.headers
+        assert response.get_data() == source
+
+    records = [dict(SAMPLE_RECORD, age=20 + i % 40) for i in range(200)]
+    plain = client.post('/api/predict_batch', json=records)
+    compressed = client.post('/api/predict_batch', json=records, headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert gzip.decompress(compressed.get_data()) == plain.get_data()
+    assert len(compressed.get_data()) < len(plain.get_data()) // 4
+
+    # A compressed cached payload keeps a (weak) validator that still revalidates
+    first = client.get('/api/segment_analysis', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['Content-Encoding'] == 'gzip'
+    assert first.headers['ETag'].startswith('W/')
+    revalidated = client.get('/api/segment_analysis',
+                             headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['ETag']})
+    assert revalidated.status_code == 304
+
+
+def test_compressed_payloads_evict_least_recently_used(client, monkeypatch):
+    from collections import OrderedDict
+    from flask import Response
+    monkeypatch.setattr(compression, 'MAX_COMPRESSED_PAYLOADS', 2)
+    monkeypatch.setattr(compression, '_compressed_payloads', OrderedDict())
+    for etag in ('a', 'b', 'a', 'c'):
+        with client.application.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+            response = Response(b'{"value": 1}' * 200, mimetype='application/json')
+            response.set_etag(etag)
+            compression.compress_response(response)
+    # 'a' was used again after 'b', so 'b' is the one evicted
+    assert [etag for etag, _ in compression._compressed_payloads] == ['a', 'c']
+
+
+def test_bundle_rewrites_page_runs(client, tmp_path):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'js').mkdir()
+    (tmp_path / 'css' / 'a.css').write_text("@import url('fonts.css');\n.a { color: red; }\n")
+    (tmp_path / 'css' / 'b.css').write_text('.b { color: blue; }\n')
+    (tmp_path / 'js' / 'one.js').write_text('const shared = 1;\nfunction one() { return shared }\n')
+    (tmp_path / 'js' / 'two.js').write_text('window.two = 2\n')
+    (tmp_path / 'js' / 'three.js').write_text('const shared = 3;\n')
+    (tmp_path / 'js' / 'late.js').write_text('window.late = 1;\n')
+    (tmp_path / 'index.html').write_text(
+        '<head>\n<link rel="stylesheet" href="css/a.css">\n<!-- comment -->\n'
+        '<link rel="stylesheet" href="css/b.css">\n<script src="js/missing.js"></script>\n</head>\n<body>\n'
+        '<script src="js/one.js"></script>\n<script src="js/two.js"></script>\n<script src="js/three.js"></script>\n'
+        '<!-- inline --><script>window.inline = 1;</script><!-- end -->\n<script src="js/late.js"></script>\n</body>\n')
+
+    bundles = bundle.build(str(tmp_path))
+    assert sorted(bundles.values()) == [['css/a.css', 'css/b.css'], ['js/late.js'],
+                                        ['js/one.js', 'js/two.js'], ['js/three.js']]
+    page = (tmp_path / 'index.bundled.html').read_text()
+    assert '<script src="js/missing.js"></script>' in page
+    assert '<script>window.inline = 1;</script>' in page
+    assert 'css/a.css' not in page and 'js/one.js' not in page
+    # Order on the page is the order of the original tags
+    order = [page.index(path) for path in bundles]
+    css_path, late_path = (next(p for p, group in bundles.items() if group == g) for g in
+                           (['css/a.css', 'css/b.css'], ['js/late.js']))
+    assert page.index(css_path) == min(order) and page.index(late_path) == max(order)
+    css = (tmp_path / css_path).read_text()
+    assert css.startswith("@import url('fonts.css');") and css.index('.a') < css.index('.b')
+    assert bundle.page_template(str(tmp_path)) == 'index.bundled.html'
+
+    with client.application.test_request_context():
+        response = compression.send_asset(str(tmp_path), css_path)
+        assert response.headers['Cache-Control'] == f'public, max-age={compression.IMMUTABLE_MAX_AGE}, immutable'
+
+    # A rebuild after an edit replaces the old bundle file
+    (tmp_path / 'css' / 'b.css').write_text('.b { color: green; }\n')
+    rebuilt = bundle.build(str(tmp_path))
+    assert css_path not in rebuilt and not (tmp_path / css_path).exists()
@@ -0,0 +1,542 @@
+import os
+import sys
+import pickle
+import subprocess
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeClassifier
+
+from api.coalescer import MicroBatcher
+from api.encoding import FeatureEncoder, NUMERIC_DEFAULTS
+from api import prediction_cache
+from api import forest
+from api.inference import FlatTreeEngine, LinearEngine, build_engine
+from api.prediction_cache import CachedEngine, PredictionCache
+from api.process_pool import ProcessPoolEngine
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BASE_DIR, '..', 'Models')
+DATA_DIR = os.path.join(BASE_DIR, '..', 'Data')
+
+
+def load_pickle(name):
+    with open(os.path.join(MODELS_DIR, name), 'rb') as f:
+        return pickle.load(f)
+
+
+@pytest.fixture(scope='module')
+def model_columns():
+    return load_pickle('model_columns.pkl')
+
+
+@pytest.fixture(scope='module')
+def encoder(model_columns):
+    return FeatureEncoder(model_columns)
+
+
+def pandas_encode(input_df, model_columns, drop_first=True):
+    """Reference encoding: the pd.to_numeric/get_dummies/reindex path used by /api/predict"""
+    input_df = input_df.copy()
+    for field, default in NUMERIC_DEFAULTS.items():
+        input_df[field] = pd.to_numeric(input_df[field], errors='coerce').fillna(default)
+    input_df['brand'] = input_df['brand'].astype(str)
+    encoded = pd.get_dummies(input_df, columns=['brand'], drop_first=drop_first)
+    return encoded.reindex(columns=model_columns, fill_value=0).to_numpy(dtype=np.float64)
+
+
+def test_encoder_matches_pandas_on_test_set(encoder, model_columns):
+    raw = pd.read_csv(os.path.join(DATA_DIR, 'X_test.csv'))
+    expected = pandas_encode(raw, model_columns)
+    actual = encoder.encode_many(raw.to_dict(orient='records'))
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_encoder_matches_pandas_on_messy_single_rows(encoder, model_columns):
+    records = [
+        {'age': '45', 'income': 'n/a', 'time_on_website': None, 'previous_purchases': True,
+         'marketing_engaged': '1', 'search_frequency': ' 8 ', 'device_age': 'old', 'brand': 'iPhone'},
+        {'age': 22, 'income': 31000.5, 'time_on_website': '1e1', 'previous_purchases': 0,
+         'marketing_engaged': 0, 'search_frequency': '', 'device_age': 1.5, 'brand': 'Unknown'},
+        {'age': 60, 'income': 120000, 'time_on_website': 30, 'previous_purchases': 4,
+         'marketing_engaged': 1, 'search_frequency': 12, 'device_age': 4, 'brand': 'Google Pixel'},
+    ]
+    for record in records:
+        # A single-row get_dummies(drop_first=True) drops the only brand level,
+        # so compare against the batch form which keeps the brand slot
+        expected = pandas_encode(pd.DataFrame([record]), model_columns, drop_first=False)
+        np.testing.assert_array_equal(encoder.encode(record), expected)
+
+
+def test_encoder_replaces_non_finite_values_with_defaults(encoder, model_columns):
+    record = {'age': '1e999', 'income': float('inf'), 'time_on_website': '-inf', 'previous_purchases': 10 ** 400,
+              'marketing_engaged': 'nan', 'search_frequency': 'Infinity', 'device_age': 3, 'brand': 'iPhone'}
+    expected = encoder.encode({'device_age': 3, 'brand': 'iPhone'})
+    np.testing.assert_array_equal(encoder.encode(record), expected)
+    np.testing.assert_array_equal(encoder.encode_frame(pd.DataFrame([record], dtype=object)), expected)
+
+
+def test_encoder_brand_slots(encoder, model_columns):
+    assert 'Google Pixel' not in encoder.brand_slots
+    for brand, slot in encoder.brand_slots.items():
+        assert model_columns[slot] == f'brand_{brand}'
+
+
+def reference_predict(model, scaler, features, model_columns):
+    scaled = scaler.transform(pd.DataFrame(features, columns=model_columns))
+    return model.predict(scaled), model.predict_proba(scaled)[:, 1]
+
+
+def test_linear_engine_matches_sklearn(encoder, model_columns):
+    model = load_pickle('model.pkl')
+    scaler = load_pickle('scaler.pkl')
+    engine = build_engine(model, scaler)
+    assert isinstance(engine, LinearEngine)
+
+    raw = pd.read_csv(os.path.join(DATA_DIR, 'X_test.csv'))
+    features = encoder.encode_many(raw.to_dict(orient='records'))
+    labels, probabilities = engine.predict(features)
+    expected_labels, expected_probabilities = reference_predict(model, scaler, features, model_columns)
+    np.testing.assert_array_equal(labels, expected_labels)
+    np.testing.assert_allclose(probabilities, expected_probabilities, rtol=1e-12, atol=1e-12)
+
+
+def test_tree_engine_matches_sklearn(encoder, model_columns, monkeypatch):
+    data = pd.read_csv(os.path.join(DATA_DIR, 'X_test.csv'))
+    features = encoder.encode_many(data.to_dict(orient='records'))
+    target = (data['Cluster'] > 0).astype(int)
+    scaler = StandardScaler().fit(pd.DataFrame(features, columns=model_columns))
+    scaled = scaler.transform(pd.DataFrame(features, columns=model_columns))
+    model = RandomForestClassifier(n_estimators=25, random_state=0).fit(scaled, target)
+
+    engine = build_engine(model, scaler)
+    assert isinstance(engine, FlatTreeEngine)
+    labels, probabilities = engine.predict(features)
+    np.testing.assert_array_equal(labels, model.predict(scaled))
+    np.testing.assert_array_equal(probabilities, model.predict_proba(scaled)[:, 1])
+
+    # Without numba, small batches take the level-wise NumPy path and large ones predict_proba
+    monkeypatch.setattr(forest, 'FOREST_BACKEND', 'numpy')
+    for rows in (features[:engine.numpy_max_rows], features):
+        np.testing.assert_array_equal(engine.predict(rows)[1], model.predict_proba(scaler.transform(
+            pd.DataFrame(rows, columns=model_columns)))[:, 1])
+
+
+@pytest.mark.parametrize('backend', ['numpy', 'numba'])
+@pytest.mark.parametrize('estimator', [RandomForestClassifier(n_estimators=60, random_state=0),
+                                       ExtraTreesClassifier(n_estimators=30, min_samples_leaf=3, random_state=0),
+                                       DecisionTreeClassifier(random_state=0)])
+def test_flat_forest_matches_predict_proba_exactly(encoder, model_columns, estimator, backend):
+    if backend == 'numba' and not forest.NUMBA_AVAILABLE:
+        pytest.skip('numba is not installed')
+    data = pd.read_csv(os.path.join(DATA_DIR, 'smartphone_purchased_data_cleaned.csv'))
+    scaler = load_pickle('scaler.pkl')
+    training = scaler.transform(pd.DataFrame(encoder.encode_frame(data), columns=model_columns))
+    model = estimator.fit(training, data['will_purchase'])
+
+    X_test_scaled = pd.read_csv(os.path.join(DATA_DIR, 'X_test_scaled.csv'))[list(model_columns)].to_numpy()
+    flat = forest.FlatForest.from_model(model)
+    for rows in (X_test_scaled, X_test_scaled[:1], training):
+        np.testing.assert_array_equal(flat.predict_proba(rows, backend=backend), model.predict_proba(rows))
+    np.testing.assert_array_equal(flat.predict(X_test_scaled), model.predict(X_test_scaled))
+
+
+def test_numba_is_imported_only_by_a_forest_that_uses_it():
+    script = ("import sys; from api import registry; loaded = 'numba' in sys.modules; "
+              "from api.registry import ModelBundle; from sklearn.ensemble import RandomForestClassifier; "
+              "from sklearn.preprocessing import StandardScaler; import numpy as np; X = np.eye(4); "
+              "bundle = ModelBundle(RandomForestClassifier(n_estimators=3, random_state=0).fit(X, [0, 1, 0, 1]), "
+              "StandardScaler().fit(X), list('abcd'), 'v'); "
+              "print(loaded, 'numba' in sys.modules, bundle.engine.kind)")
+    output = subprocess.run([sys.executable, '-c', script], cwd=os.path.dirname(os.path.abspath(__file__)),
+                            check=True, capture_output=True, text=True).stdout.split()
+    assert output == ['False', str(forest.NUMBA_AVAILABLE), 'flat_trees']
+
+
+class CountingEngine:
+    """Wraps an engine and records how many rows it was asked to score"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.kind = engine.kind
+        self.classes = engine.classes
+        self.rows = 0
+        self.calls = 0
+
+    def predict(self, features):
+        self.rows += len(features)
+        self.calls += 1
+        return self.engine.predict(features)
+
+
+def test_cached_engine_matches_and_skips_repeats(encoder):
+    engine = CountingEngine(build_engine(load_pickle('model.pkl'), load_pickle('scaler.pkl')))
+    cache = PredictionCache(maxsize=8)
+    cached = CachedEngine(engine, cache)
+    raw = pd.read_csv(os.path.join(DATA_DIR, 'X_test.csv'))
+    features = encoder.encode_many(raw.iloc[:6].to_dict(orient='records'))
+
+    expected_labels, expected_probabilities = engine.engine.predict(features)
+    for _ in range(2):
+        labels, probabilities = cached.predict(features)
+        np.testing.assert_array_equal(labels, expected_labels)
+        np.testing.assert_array_equal(probabilities, expected_probabilities)
+    assert engine.rows == 6
+    assert (cache.hits, cache.misses) == (6, 6)
+
+    # Four new rows push the four least recently used out of the 8-entry cache
+    cached.predict(encoder.encode_many(raw.iloc[6:10].to_dict(orient='records')))
+    assert cache.evictions == 2 and len(cache._entries) == 8
+
+
+def test_prediction_cache_ttl_and_file_invalidation(tmp_path, monkeypatch):
+    model_file = tmp_path / 'model.pkl'
+    model_file.write_bytes(b'v1')
+    monkeypatch.setattr(prediction_cache, 'FILE_CHECK_INTERVAL', 0)
+    cache = PredictionCache(maxsize=4, model_files=[str(model_file)])
+    cache.store([b'a'], [1], [0.9])
+    assert cache.lookup([b'a']) == [(1, 0.9)]
+
+    model_file.write_bytes(b'version 2')
+    assert cache.lookup([b'a']) == [None]
+    assert cache.invalidations == 1
+
+    expiring = PredictionCache(maxsize=4, ttl=0.0)
+    expiring.store([b'a'], [1], [0.9])
+    assert expiring.lookup([b'a']) == [None]
+
+
+def run_concurrently(batcher, engine, rows):
+    """Send each row from its own thread at once; return the per-thread results"""
+    results = [None] * len(rows)
+    start = threading.Barrier(len(rows))
+
+    def worker(i):
+        start.wait()
+        try:
+            results[i] = batcher.predict(engine, rows[i])
+        except Exception as error:
+            results[i] = error
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(rows))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_micro_batcher_coalesces_concurrent_requests(encoder):
+    engine = CountingEngine(build_engine(load_pickle('model.pkl'), load_pickle('scaler.pkl')))
+    raw = pd.read_csv(os.path.join(DATA_DIR, 'X_test.csv'))
+    features = encoder.encode_many(raw.iloc[:16].to_dict(orient='records'))
+    rows = [features[i:i + 1] for i in range(len(features))]
+
+    batcher = MicroBatcher(max_wait_ms=50, max_batch=8)
+    results = run_concurrently(batcher, engine, rows)
+    expected_labels, expected_probabilities = engine.engine.predict(features)
+    for i, (labels, probabilities) in enumerate(results):
+        np.testing.assert_array_equal(labels, expected_labels[i:i + 1])
+        np.testing.assert_array_equal(probabilities, expected_probabilities[i:i + 1])
+    assert engine.rows == 16
+    assert engine.calls == batcher.batches < 16
+    assert batcher.stats()['mean_batch_rows'] <= 8
+
+    # Disabled (the default) calls the engine directly
+    direct = MicroBatcher(max_wait_ms=0)
+    direct.predict(engine, rows[0])
+    assert direct.batches == 0 and engine.calls == batcher.batches + 1
+
+
+def test_micro_batcher_propagates_engine_errors():
+    class FailingEngine:
+        def predict(self, features):
+            raise ValueError('bad input')
+
+    results = run_concurrently(MicroBatcher(max_wait_ms=20), FailingEngine(), [np.zeros((1, 3))] * 4)
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_process_pool_engine_matches_in_process(encoder):
+    model = load_pickle('model.pkl')
+    scaler = load_pickle('scaler.pkl')
+    engine = build_engine(model, scaler)
+    pooled = ProcessPoolEngine(engine, model, scaler, workers=2, min_rows=50)
+    raw = pd.read_csv(os.path.join(DATA_DIR, 'X_test.csv'))
+    features = encoder.encode_many(raw.to_dict(orient='records'))
+    try:
+        expected_labels, expected_probabilities = engine.predict(features)
+        labels, probabilities = pooled.predict(features)
+        np.testing.assert_array_equal(labels, expected_labels)
+        np.testing.assert_array_equal(probabilities, expected_probabilities)
+
+        # Small calls are scored in-process
+        pooled.predict(features[:5])
+        assert (pooled.pooled_calls, pooled.local_calls) == (1, 1)
+    finally:
+        pooled.close(wait=True)
+
+    # After close (a model swap) calls still succeed, in-process
+    labels, _ = pooled.predict(features)
+    np.testing.assert_array_equal(labels, expected_labels)
+    assert pooled.local_calls == 2
+
+
+def test_process_pool_threshold_comes_from_the_crossover_point(encoder):
+    import time
+    from api import batch
+    from api.process_pool import crossover_rows
+    model = load_pickle('model.pkl')
+    scaler = load_pickle('scaler.pkl')
+    engine = build_engine(model, scaler)
+    # Copying a row to a worker costs more than scoring it with the linear engine
+    pooled = ProcessPoolEngine(engine, model, scaler, workers=4)
+    assert pooled.min_rows is None and not pooled.shards_calls
+    assert crossover_rows(engine, scaler, workers=1) is None
+
+    class SlowEngine:
+        kind = 'slow'
+        classes = engine.classes
+
+        def __init__(self):
+            self.calls = []
+
+        def predict(self, features):
+            self.calls.append(len(features))
+            time.sleep(len(features) * 1e-6)
+            return engine.predict(features)
+
+    slow = SlowEngine()
+    rows = crossover_rows(slow, scaler, workers=4)
+    assert rows is not None and rows < 5000
+
+    # An engine that shards its calls is given the whole batch in one call
+    slow.calls.clear()
+    slow.shards_calls = True
+    records = pd.read_csv(os.path.join(DATA_DIR, 'X_test.csv')).drop(columns=['Cluster']).to_dict(orient='records')
+    batch.predict_batch(records * 3, slow, encoder, chunk_size=100)
+    assert slow.calls == [len(records) * 3]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_score_file_streams_in_input_order(tmp_path, encoder, workers):
+    from api.score import score_file
+    raw = pd.read_csv(os.path.join(DATA_DIR, 'X_test.csv'))
+    raw.insert(0, 'customer_id', range(len(raw)))
+    source = tmp_path / 'customers.csv'
+    raw.to_csv(source, index=False)
+
+    output = tmp_path / 'scores.csv'
+    rows, _ = score_file(str(source), str(output), chunk_rows=7, workers=workers, keep=['customer_id'],
+                         models_dir=os.path.join(BASE_DIR, '..', 'Models'))
+    scores = pd.read_csv(output)
+    engine = build_engine(load_pickle('model.pkl'), load_pickle('scaler.pkl'))
+    labels, probabilities = engine.predict(encoder.encode_many(raw.to_dict(orient='records')))
+    assert rows == len(raw)
+    assert list(scores.columns) == ['customer_id', 'probability', 'prediction']
+    assert scores['customer_id'].tolist() == list(range(len(raw)))
+    np.testing.assert_allclose(scores['probability'], probabilities, rtol=1e-12)
+    np.testing.assert_array_equal(scores['prediction'], labels)
+
+
+def test_train_pipeline_reuses_upstream_stages(tmp_path, monkeypatch):
+    from api import train
+    data = os.path.join(DATA_DIR, 'smartphone_purchased_data.csv')
+    options = dict(model='logistic', cv=2, cache_dir=str(tmp_path / 'cache'), output_dir=str(tmp_path / 'out'))
+    first = train.train([data], grid={'C': [0.1, 1.0]}, **options)
+    assert not any(first['cached'].values())
+
+    # Only the search depends on the grid, so every stage before it is read back
+    computed = []
+    original_search = train.search_stage
+    monkeypatch.setattr(train, 'search_stage', lambda *args: computed.append(1) or original_search(*args))
+    second = train.train([data], grid={'C': [10.0]}, **options)
+    assert second['cached'] == {'clean': True, 'encode': True, 'scale': True, 'search': False}
+    assert second['stages']['scale'] == first['stages']['scale'] and computed == [1]
+    third = train.train([data], grid={'C': [10.0]}, **options)
+    assert all(third['cached'].values()) and computed == [1]
+
+    model, scaler, model_columns = (pickle.load(open(path, 'rb')) for path in third['artifacts'])
+    assert model.C == 10.0 and list(scaler.feature_names_in_) == list(model_columns)
+    # Cleaning the raw survey reproduces the cleaned dataset the dashboard loads
+    cleaned = pd.read_csv(os.path.join(DATA_DIR, 'smartphone_purchased_data_cleaned.csv'))
+    pd.testing.assert_frame_equal(train.clean_frame(pd.read_csv(data)), cleaned, check_dtype=False)
+    encoder = FeatureEncoder(model_columns)
+    raw = pd.read_csv(os.path.join(DATA_DIR, 'X_test.csv')).drop(columns=['Cluster'])
+    labels, probabilities = build_engine(model, scaler).predict(encoder.encode_many(raw.to_dict(orient='records')))
+    expected = pd.DataFrame(pandas_encode(raw, model_columns), columns=model_columns)
+    np.testing.assert_allclose(probabilities, model.predict_proba(scaler.transform(expected))[:, 1], rtol=1e-9)
+    assert not [name for name in os.listdir(tmp_path / 'out') if '.tmp' in name]
+
+
+def test_partly_replaced_model_files_are_not_loaded(tmp_path):
+    import shutil
+    from api.registry import ARTIFACT_FILES, IncompleteArtifactSet, ModelRegistry, load_bundle
+    from api.train import write_artifacts
+    model, scaler, model_columns = (load_pickle(name) for name in ARTIFACT_FILES)
+    paths = write_artifacts(model, scaler, model_columns, str(tmp_path / 'out'))
+    registry = ModelRegistry(str(tmp_path / 'registry'), fallback_files=paths)
+    registry.initialize(*(load_pickle(name) for name in ARTIFACT_FILES))
+    served = registry.active
+
+    # A reload between the renames of the next write sees a new model.pkl with the old set file
+    newer = write_artifacts(model.set_params(random_state=7), scaler, model_columns, str(tmp_path / 'next'))
+    shutil.copy2(newer[0], paths[0])
+    with pytest.raises(IncompleteArtifactSet):
+        load_bundle(paths, 'files')
+    registry._reload()
+    assert registry.active is served and registry.last_error is None
+
+    # Once the set file lands the whole set loads
+    shutil.copy2(os.path.join(tmp_path, 'next', 'artifact_set.json'), os.path.join(tmp_path, 'out'))
+    assert registry._current_signature() != registry._signature
+    registry._reload()
+    assert registry.active is not served and registry.active.model.random_state == 7
+
+
+def test_train_halving_search_grows_the_tree_budget(tmp_path):
+    from api import train
+    options = dict(model='forest', grid={'n_estimators': [9, 27], 'max_depth': [None, 3, 5]}, cv=2,
+                   cache_dir=str(tmp_path / 'cache'), output_dir=str(tmp_path / 'out'))
+    halving = train.train(search='halving', **options)
+    # Three candidates on 9 trees, then the best third on all 27
+    assert halving['search']['rounds'] == 2 and halving['search']['candidates'] == 4
+    assert halving['best_params']['n_estimators'] == 27 and halving['best_params']['max_depth'] in (None, 3, 5)
+    model = pickle.load(open(halving['artifacts'][0], 'rb'))
+    assert model.n_estimators == 27 and model.max_depth == halving['best_params']['max_depth']
+
+    grid = train.train(**options)
+    assert grid['stages']['scale'] == halving['stages']['scale']
+    assert grid['stages']['search'] != halving['stages']['search'] and grid['search']['candidates'] == 6
+    with pytest.raises(ValueError):
+        train.halving_resource('logistic', 'n_estimators')
+
+
+def test_online_learner_updates_and_publishes_versions(tmp_path, encoder, model_columns):
+    from api import online
+    from api.records import AppendLog, clean_records
+    from api.registry import ModelRegistry, load_bundle
+    options = dict(registry_root=str(tmp_path / 'registry'), records_path=str(tmp_path / 'appended.csv'),
+                   state_path=str(tmp_path / 'online' / 'state.pkl'), batch_size=32)
+    learner = online.OnlineLearner(**options)
+    served = pickle.load(open(os.path.join(MODELS_DIR, 'model.pkl'), 'rb'))
+    raw = pd.read_csv(os.path.join(DATA_DIR, 'X_test.csv')).drop(columns=['Cluster'])
+    features = encoder.encode_many(raw.to_dict(orient='records'))
+    # The warm start serves exactly the probabilities of the shipped logistic regression
+    before = LinearEngine(learner.model, learner.scaler).predict(features)[1]
+    scaler = pickle.load(open(os.path.join(MODELS_DIR, 'scaler.pkl'), 'rb'))
+    np.testing.assert_allclose(before, served.predict_proba(scaler.transform(
+        pd.DataFrame(features, columns=model_columns)))[:, 1], rtol=1e-12)
+    assert learner.step() is None
+
+    # Moving the running scaler re-expresses the weights without changing a prediction
+    learner.update_scaler(features[:50])
+    np.testing.assert_allclose(LinearEngine(learner.model, learner.scaler).predict(features)[1], before, rtol=1e-9)
+
+    cleaned = pd.read_csv(os.path.join(DATA_DIR, 'smartphone_purchased_data_cleaned.csv'))
+    frame, _ = clean_records(cleaned.head(100).to_dict(orient='records'))
+    AppendLog(options['records_path']).write(frame)
+    version = learner.step()
+    registry = ModelRegistry(options['registry_root'])
+    assert version.startswith(online.VERSION_PREFIX) and registry.published_version() == version
+    bundle = load_bundle([os.path.join(registry.root, version, name) for name in online.ARTIFACT_FILES], version)
+    assert bundle.engine.kind == 'linear' and bundle.scaler.n_samples_seen_ == 500 + 50 + 100
+    assert not np.allclose(bundle.engine.predict(features)[1], before)
+
+    # A restarted learner resumes after the records it has already learned
+    resumed = online.OnlineLearner(**options)
+    assert resumed.version == version and resumed.records == 100 and resumed.step() is None
+    for _ in range(online.KEEP_VERSIONS + 1):
+        AppendLog(options['records_path']).write(frame.head(10))
+        resumed.step()
+    assert len(os.listdir(registry.root)) == online.KEEP_VERSIONS + 1  # the versions plus CURRENT
+
+    # Stopped between publishing and saving: the restarted learner takes its state from the version
+    with open(options['state_path'], 'rb') as f:
+        saved = f.read()
+    AppendLog(options['records_path']).write(frame.head(10))
+    version = resumed.step()
+    with open(options['state_path'], 'wb') as f:
+        f.write(saved)
+    restarted = online.OnlineLearner(**options)
+    assert restarted.step() is None
+    assert restarted.version == version and restarted.records == resumed.records
+    assert restarted.records_log.offset == resumed.records_log.offset
+
+    # A published forest is left alone: the learner pauses and keeps the records for later
+    forest = RandomForestClassifier(n_estimators=5, random_state=0).fit(
+        np.zeros((4, len(model_columns))), [0, 1, 0, 1])
+    forest_dir = str(tmp_path / 'forest')
+    paths = [os.path.join(forest_dir, name) for name in online.ARTIFACT_FILES]
+    os.makedirs(forest_dir)
+    for obj, path in zip((forest, bundle.scaler, model_columns), paths):
+        with open(path, 'wb') as f:
+            pickle.dump(obj, f)
+    registry.publish('forest', paths)
+    AppendLog(options['records_path']).write(frame.head(10))
+    assert restarted.step() is None and restarted.paused and registry.published_version() == 'forest'
+    assert restarted.status()['offset'] == resumed.records_log.offset
+
+
+def test_artifacts_round_trip_memory_mapped(tmp_path, encoder, model_columns):
+    from api import artifacts
+    from api.registry import ModelRegistry
+    raw = pd.read_csv(os.path.join(DATA_DIR, 'X_test.csv')).drop(columns=['Cluster'])
+    features = pd.DataFrame(encoder.encode_many(raw.to_dict(orient='records')), columns=model_columns)
+    scaler = pickle.load(open(os.path.join(MODELS_DIR, 'scaler.pkl'), 'rb'))
+    logistic = pickle.load(open(os.path.join(MODELS_DIR, 'model.pkl'), 'rb'))
+    rng = np.random.RandomState(0)
+    forest = RandomForestClassifier(n_estimators=15, random_state=0).fit(
+        scaler.transform(features), rng.randint(0, 2, len(features)))
+
+    registry = ModelRegistry(str(tmp_path / 'registry'))
+    for version, model in (('logistic', logistic), ('forest', forest)):
+        path = artifacts.export_artifacts(model, scaler, model_columns, os.path.join(registry.root, version))
+        loaded, loaded_scaler, loaded_columns = artifacts.load_artifacts(path)
+        assert list(loaded_columns) == list(model_columns)
+        # Same probabilities as the unpickled objects, from read-only mapped arrays
+        np.testing.assert_array_equal(loaded.predict_proba(loaded_scaler.transform(features)),
+                                      model.predict_proba(scaler.transform(features)))
+        weights = loaded.coef_ if version == 'logistic' else loaded.threshold
+        assert isinstance(weights, np.memmap) and not weights.flags.writeable
+        registry.activate(version)
+        bundle = registry._load_target()
+        assert bundle.version == version and bundle.files[-1].endswith(artifacts.MANIFEST_FILE)
+    np.testing.assert_array_equal(bundle.model.feature_importances_, forest.feature_importances_)
+    assert not [name for name in os.listdir(registry.root) if '.tmp' in name]
+    with pytest.raises(ValueError):
+        artifacts.export_artifacts(object(), scaler, model_columns, str(tmp_path / 'unsupported'))
+
+
+def test_artifacts_keep_the_model_class_and_scaler_counts(tmp_path, encoder, model_columns):
+    import json
+    from api import artifacts, online
+    from sklearn.preprocessing import StandardScaler
+    raw = pd.read_csv(os.path.join(DATA_DIR, 'X_test.csv')).drop(columns=['Cluster'])
+    features = pd.DataFrame(encoder.encode_many(raw.to_dict(orient='records')), columns=model_columns)
+    # Per-feature counts: the scaler skips NaNs column by column
+    features.iloc[:7, 0] = np.nan
+    scaler = StandardScaler().fit(features)
+    labels = np.arange(len(features)) % 2
+    sgd = online.make_classifier().fit(scaler.transform(features.fillna(0)), labels)
+
+    path = artifacts.export_artifacts(sgd, scaler, model_columns, str(tmp_path / 'sgd'))
+    loaded, loaded_scaler, _ = artifacts.load_artifacts(path)
+    assert type(loaded) is type(sgd) and loaded.get_params() == sgd.get_params()
+    np.testing.assert_array_equal(loaded_scaler.n_samples_seen_, scaler.n_samples_seen_)
+    assert loaded_scaler.n_samples_seen_[0] == len(features) - 7
+    # Warm-started updates go on from the saved counts
+    loaded_scaler.partial_fit(features.fillna(0).head(10))
+    np.testing.assert_array_equal(loaded_scaler.n_samples_seen_, scaler.n_samples_seen_ + 10)
+
+    # A flattened forest is recorded as the forest it came from, not as FlatForest
+    forest = RandomForestClassifier(n_estimators=3, random_state=0).fit(scaler.transform(features.fillna(0)), labels)
+    flat, _, _ = artifacts.load_artifacts(artifacts.export_artifacts(forest, scaler, model_columns,
+                                                                     str(tmp_path / 'forest')))
+    path = artifacts.export_artifacts(flat, scaler, model_columns, str(tmp_path / 'again'))
+    with open(os.path.join(path, artifacts.MANIFEST_FILE)) as f:
+        assert json.load(f)['model_type'] == 'RandomForestClassifier'
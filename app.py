@@ -6,30 +6,47 @@ import os
 import json
 import numpy as np
 import pandas as pd
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
 import joblib
 
+from Dashboard.api import bundle, compression, http_cache, serialization
+from Dashboard.api.aggregates import AggregateCache
+from Dashboard.api.datastore import DEFAULT_STORE_PATH, META_FILE, load_store
+from Dashboard.api.records import AppendLog
+
 app = Flask(__name__, static_folder='Dashboard')
 CORS(app)  # Enable CORS for all routes
+compression.install(app)
 
 # Load the model and related files
 model = joblib.load('Models/model.pkl')
 scaler = joblib.load('Models/scaler.pkl')
 model_columns = joblib.load('Models/model_columns.pkl')
 
-# Load the dataset
-df = pd.read_csv('Data/smartphone_purchased_data_cleaned.csv')
+# Load the dataset, memory-mapping the column store when the dashboard has built one
+df = load_store()
+data_file = os.path.join(DEFAULT_STORE_PATH, META_FILE)
+if df is None:
+    data_file = 'Data/smartphone_purchased_data_cleaned.csv'
+    df = pd.read_csv(data_file)
+
+# Tally dashboard aggregates once; /api/dashboard_data serves the cached JSON,
+# dated by the data file so every worker sends the same Last-Modified
+aggregate_cache = AggregateCache(df, modified_at=http_cache.files_modified_at([data_file]))
+
+# Records ingested by the dashboard API are folded in from the shared append log
+records_log = AppendLog()
 
 @app.route('/')
 def index():
     """Serve the main dashboard page"""
-    return send_from_directory('Dashboard', 'index.html')
+    return send_from_directory('Dashboard', bundle.page_template())
 
 @app.route('/<path:path>')
 def serve_static(path):
-    """Serve static files from the Dashboard folder"""
-    return send_from_directory('Dashboard', path)
+    """Serve static files from the Dashboard folder (precompressed .br/.gz when built)"""
+    return compression.send_asset('Dashboard', path)
 
 @app.route('/api/status')
 def status():
@@ -109,30 +126,8 @@ def serve_docs(filename):
 @app.route('/api/dashboard_data')
 def dashboard_data():
     """Get general dashboard statistics"""
-    return jsonify({
-        "total_records": len(df),
-        "purchase_rate": float(df['Purchased'].mean()),
-        "age_distribution": {
-            "18-25": int(df[(df['Age'] >= 18) & (df['Age'] <= 25)].shape[0]),
-            "26-35": int(df[(df['Age'] > 25) & (df['Age'] <= 35)].shape[0]),
-            "36-45": int(df[(df['Age'] > 35) & (df['Age'] <= 45)].shape[0]),
-            "46+": int(df[df['Age'] > 45].shape[0])
-        },
-        "gender_distribution": {
-            "Male": int(df[df['Gender'] == 'Male'].shape[0]),
-            "Female": int(df[df['Gender'] == 'Female'].shape[0])
-        },
-        "purchase_by_gender": {
-            "Male": float(df[df['Gender'] == 'Male']['Purchased'].mean()),
-            "Female": float(df[df['Gender'] == 'Female']['Purchased'].mean())
-        },
-        "purchase_by_age_group": {
-            "18-25": float(df[(df['Age'] >= 18) & (df['Age'] <= 25)]['Purchased'].mean()),
-            "26-35": float(df[(df['Age'] > 25) & (df['Age'] <= 35)]['Purchased'].mean()),
-            "36-45": float(df[(df['Age'] > 35) & (df['Age'] <= 45)]['Purchased'].mean()),
-            "46+": float(df[df['Age'] > 45]['Purchased'].mean())
-        }
-    })
+    records_log.sync(aggregate_cache)
+    return http_cache.conditional_response(aggregate_cache.payload('dashboard_data'), aggregate_cache.modified_at)
 
 @app.route('/api/feature_importance')
 def feature_importance():
@@ -152,7 +147,9 @@ def feature_importance():
         # Fallback if feature importances not available
         feature_importance = {col: 1.0/len(model_columns) for col in model_columns}
     
-    return jsonify({"feature_importance": feature_importance})
+    # The model is loaded once, so the ETag only changes when the app restarts with new files
+    body = serialization.dumps({"feature_importance": feature_importance}, sort_keys=True) + b'\n'
+    return http_cache.conditional_response(body, os.path.getmtime('Models/model.pkl'))
 
 @app.route('/api/predict', methods=['POST'])
 def predict():
@@ -0,0 +1,38 @@
+"""
+Gunicorn settings for the Smartphone Purchase Prediction Dashboard.
+
+With preload_app the master imports the app once (model pickles, scaler,
+dataset, cached aggregates) and the workers are forked from it, sharing those
+pages copy-on-write instead of each loading a private copy. Per-worker memory
+is reported under "worker" in /api/status.
+
+    gunicorn --config gunicorn.conf.py --chdir Dashboard app:app
+    gunicorn --config gunicorn.conf.py --chdir Dashboard 'api.app:create_app()'
+"""
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+timeout = 120
+
+# Load the model and data once in the master (set GUNICORN_PRELOAD=0 to disable).
+# DASHBOARD_LAZY_LOAD=1 loads on a background thread after import instead, which
+# must happen in each worker because threads do not survive the fork
+preload_app = (os.environ.get('GUNICORN_PRELOAD', '1') != '0'
+               and os.environ.get('DASHBOARD_LAZY_LOAD', '0') != '1')
+
+
+def pre_fork(server, worker):
+    """Freeze the loaded objects just before each worker is forked"""
+    if preload_app:
+        # Frozen objects are skipped by the cyclic collector, so a collection in
+        # a worker does not write to their headers and un-share the pages they
+        # live on. Runs before every fork so respawned workers benefit too.
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker {worker.pid} forked (preload_app={preload_app}, "
+                    f"{gc.get_freeze_count()} objects shared from the master)")